@@ -6,7 +6,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[],
-    hiddenimports=[],
+    hiddenimports=['orjson', 'msgpack', 'brotli', 'PIL.Image'],  # optional encoders and Pillow, imported in try blocks
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -6,7 +6,8 @@ a = Analysis(
     pathex=[],
     binaries=[('ngrok.exe', '.')],
     datas=[('c:/Users/DELL/OneDrive/Desktop/antigravity/firstproject/.venv/Lib/site-packages/customtkinter', 'customtkinter')],
-    hiddenimports=[],
+    # short_api is imported by worker processes as 'short_api:app'; the encoders are optional imports
+    hiddenimports=['short_api', 'orjson', 'msgpack', 'brotli', 'PIL.Image'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
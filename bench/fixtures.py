@@ -0,0 +1,207 @@
+"""Fixture pages for the offline benchmark.
+
+Recorded pages in bench/fixtures/ (see `python -m bench.fixtures record`)
+are used when present. Otherwise pages are synthesized with the same
+structure and roughly the same size as the real ones, so extraction
+costs are comparable.
+"""
+import argparse
+import json
+import os
+import random
+from typing import Dict, List, Optional
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+RECORDED = ("search.html", "hashtag.html", "watch.html", "transcript.xml")
+
+API_KEY = "AIzaSyStandInKeyForBenchmarks000000000"
+CLIENT_VERSION = "2.20240726.00.00"
+PAGE_SIZE = 20
+
+_WORDS = ("cat", "dog", "funny", "shorts", "wow", "jump", "daily", "vlog", "cooking", "fast",
+          "music", "dance", "trick", "fail", "win", "slow", "motion", "tiny", "huge", "best")
+
+
+def video_id(n: int) -> str:
+    return f"bench{n:06d}"[:11].ljust(11, "x")
+
+
+def _sentence(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(n))
+
+
+def _padding(rng: random.Random, size: int) -> str:
+    """Inline-script noise standing in for the player JS and CSS that real pages carry."""
+    chunk = "".join(f"var _{i}=function(a){{return a.split('').reverse().join('')+\"{rng.choice(_WORDS)}\"}};" for i in range(200))
+    return (chunk * (size // len(chunk) + 1))[:size]
+
+
+def _ytcfg() -> str:
+    return ('<script>ytcfg.set({"INNERTUBE_API_KEY":"%s","INNERTUBE_CLIENT_VERSION":"%s",'
+            '"INNERTUBE_CONTEXT_CLIENT_VERSION":"%s"});</script>' % (API_KEY, CLIENT_VERSION, CLIENT_VERSION))
+
+
+def _page(blobs: Dict[str, dict], pad: int, seed: int) -> str:
+    rng = random.Random(seed)
+    scripts = "".join(f"<script>var {name} = {json.dumps(obj)};</script>" for name, obj in blobs.items())
+    return ("<!DOCTYPE html><html><head><title>YouTube</title>" + _ytcfg() +
+            f"<script>{_padding(rng, pad)}</script></head><body>{scripts}</body></html>")
+
+
+def continuation_item(token: str) -> dict:
+    return {"continuationItemRenderer": {"continuationEndpoint": {"continuationCommand": {"token": token, "request": "CONTINUATION_REQUEST_TYPE_SEARCH"}}}}
+
+
+def listing_items(start: int, count: int, shorts: bool) -> List[dict]:
+    rng = random.Random(start)
+    items = []
+    for n in range(start, start + count):
+        if shorts:
+            items.append({"richItemRenderer": {"content": {"shortsLockupViewModel": {
+                "entityId": f"shorts-shelf-item-{video_id(n)}",
+                "onTap": {"innertubeCommand": {"reelWatchEndpoint": {"videoId": video_id(n)}}},
+                "overlayMetadata": {"primaryText": {"content": _sentence(rng, 5)}, "secondaryText": {"content": "1.2M views"}},
+            }}}})
+        else:
+            items.append({"videoRenderer": {
+                "videoId": video_id(n),
+                "title": {"runs": [{"text": _sentence(rng, 6)}]},
+                "ownerText": {"runs": [{"text": _sentence(rng, 2)}]},
+                "viewCountText": {"simpleText": f"{rng.randint(1000, 9_000_000):,} views"},
+                "thumbnail": {"thumbnails": [{"url": f"https://i.ytimg.com/vi/{video_id(n)}/hq2.jpg", "width": 405, "height": 720}]},
+            }})
+    return items
+
+
+def listing_page(shorts: bool, pages: int = 5) -> str:
+    items = listing_items(0, PAGE_SIZE, shorts) + ([continuation_item("page-1")] if pages > 1 else [])
+    data = {"contents": {"twoColumnSearchResultsRenderer": {"primaryContents": {"sectionListRenderer": {"contents": [
+        {"itemSectionRenderer": {"contents": items}}]}}}}}
+    return _page({"ytInitialData": data}, pad=350_000, seed=1)
+
+
+def continuation_response(token: str, shorts: bool, pages: int = 5) -> dict:
+    n = int(token.rsplit("-", 1)[1])
+    items = listing_items(n * PAGE_SIZE, PAGE_SIZE, shorts)
+    if n + 1 < pages:
+        items.append(continuation_item(f"page-{n + 1}"))
+    return {"onResponseReceivedCommands": [{"appendContinuationItemsAction": {"continuationItems": items}}]}
+
+
+def player_response(v_id: str, base_url: str) -> dict:
+    rng = random.Random(v_id)
+    return {
+        "playabilityStatus": {"status": "OK"},
+        "videoDetails": {
+            "videoId": v_id, "title": _sentence(rng, 7), "author": _sentence(rng, 2),
+            "lengthSeconds": str(rng.randint(10, 59)), "viewCount": str(rng.randint(1000, 9_000_000)),
+            "shortDescription": _sentence(rng, 60), "keywords": [rng.choice(_WORDS) for _ in range(15)],
+        },
+        "microformat": {"playerMicroformatRenderer": {
+            "publishDate": "2024-05-01T10:00:00-07:00", "uploadDate": "2024-05-01T10:00:00-07:00",
+            "ownerChannelName": _sentence(rng, 2), "lengthSeconds": "42",
+        }},
+        "captions": {"playerCaptionsTracklistRenderer": {"captionTracks": [
+            {"baseUrl": f"{base_url}/api/timedtext?v={v_id}&lang=en", "name": {"runs": [{"text": "English"}]},
+             "languageCode": "en", "kind": "asr", "isTranslatable": False},
+        ]}},
+        "streamingData": {"formats": [{"itag": 18, "mimeType": "video/mp4"} for _ in range(3)]},
+    }
+
+
+def watch_page(v_id: str, base_url: str) -> str:
+    rng = random.Random(v_id)
+    data = {"engagementPanels": [{"engagementPanelRenderer": {"targetId": "engagement-panel-structured-description", "content": {
+        "structuredDescriptionContentRenderer": {"items": [{"videoDescriptionHeaderRenderer": {
+            "description": {"runs": [{"text": _sentence(rng, 60)}]}}}]}}}}],
+        "overlay": {"reelPlayerOverlayRenderer": {"filler": [_sentence(rng, 30) for _ in range(400)]}}}
+    return _page({"ytInitialPlayerResponse": player_response(v_id, base_url), "ytInitialData": data}, pad=550_000, seed=2)
+
+
+def transcript_xml(v_id: str) -> str:
+    rng = random.Random(v_id)
+    lines = "".join(f'<text start="{i * 2.5}" dur="2.5">{_sentence(rng, 8)}</text>' for i in range(24))
+    return f'<?xml version="1.0" encoding="utf-8" ?><transcript>{lines}</transcript>'
+
+
+def transcript_json3(v_id: str) -> dict:
+    """Same captions as transcript_xml, in the `fmt=json3` shape the watch-page caption path asks for."""
+    rng = random.Random(v_id)
+    return {"events": [{"tStartMs": i * 2500, "dDurationMs": 2500, "segs": [{"utf8": _sentence(rng, 8)}]}
+                       for i in range(24)]}
+
+
+def thumbnail_bytes(v_id: str, variant: str) -> bytes:
+    """Stand-in JPEG body (not a decodable image) of roughly a real thumbnail's size."""
+    rng = random.Random(f"{v_id}/{variant}")
+    return b"\xff\xd8\xff\xe0" + rng.randbytes(24_000) + b"\xff\xd9"
+
+
+# --- youtube-search-python (innertube JSON and suggestions, for the /ysp scenarios) ---
+
+def ysp_search_response(pages: int = 5) -> dict:
+    items = [{"itemSectionRenderer": {"contents": listing_items(0, PAGE_SIZE, shorts=False)}}]
+    if pages > 1:
+        items.append(continuation_item("page-1"))
+    return {"contents": {"twoColumnSearchResultsRenderer": {"primaryContents": {"sectionListRenderer": {"contents": items}}}}}
+
+
+def ysp_hashtag_tile(tag: str) -> dict:
+    """Search response for "#tag": the hashtag tile whose browse params the library reads."""
+    tile = {"hashtagTileRenderer": {"onTapCommand": {"browseEndpoint": {"browseId": "FEhashtag", "params": f"hashtag-{tag}"}}}}
+    return {"contents": {"twoColumnSearchResultsRenderer": {"primaryContents": {"sectionListRenderer": {"contents": [
+        {"itemSectionRenderer": {"contents": [tile]}}]}}}}}
+
+
+def ysp_hashtag_browse(pages: int = 5) -> dict:
+    items = [{"richItemRenderer": {"content": item}} for item in listing_items(0, PAGE_SIZE, shorts=False)]
+    if pages > 1:
+        items.append(continuation_item("page-1"))
+    return {"contents": {"twoColumnBrowseResultsRenderer": {"tabs": [{"tabRenderer": {"content": {
+        "richGridRenderer": {"contents": items}}}}]}}}
+
+
+def suggestions_jsonp(query: str) -> str:
+    rng = random.Random(query)
+    suggestions = [[f"{query} {_sentence(rng, 2)}", 0, [512]] for _ in range(10)]
+    return "window.google.ac.h(%s)" % json.dumps([query, suggestions, {"k": 1}])
+
+
+def recorded(name: str) -> Optional[str]:
+    path = os.path.join(FIXTURE_DIR, name)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+    return None
+
+
+def record(video: str, query: str, hashtag: str) -> None:
+    """Saves live pages as fixtures (needs network access to YouTube)."""
+    from http_client import client
+    from short_api import transcript_api
+
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    pages = {
+        "search.html": client.get(f"https://www.youtube.com/results?search_query={query}&sp=EgIQCQ==").text,
+        "hashtag.html": client.get(f"https://www.youtube.com/hashtag/{hashtag}/shorts").text,
+        "watch.html": client.get(f"https://www.youtube.com/shorts/{video}").text,
+    }
+    try:
+        track = transcript_api.list(video).find_transcript(["en", "ar"])
+        pages["transcript.xml"] = client.get(track._url).text
+    except Exception as e:
+        print(f"No transcript recorded: {e}")
+    for name, body in pages.items():
+        with open(os.path.join(FIXTURE_DIR, name), "w", encoding="utf-8") as f:
+            f.write(body)
+        print(f"Recorded {name} ({len(body) // 1024} KB)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record live YouTube pages as benchmark fixtures.")
+    parser.add_argument("command", choices=["record"])
+    parser.add_argument("--video", default="ZbGkwtCibbM")
+    parser.add_argument("--query", default="cats")
+    parser.add_argument("--hashtag", default="cats")
+    args = parser.parse_args()
+    record(args.video, args.query, args.hashtag)
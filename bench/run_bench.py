@@ -0,0 +1,278 @@
+"""Offline benchmark for the Shorts API.
+
+Starts the local YouTube stand-in, points the API at it, serves the API
+with uvicorn on a free port and measures end-to-end latency percentiles
+and throughput per endpoint, plus microbenchmarks for the watch-page and
+listing extractors. Results are written as JSON reports that can be
+compared with --compare.
+
+    python -m bench.run_bench --latency-ms 80 --concurrency 4
+    python -m bench.run_bench --compare bench/reports/a.json bench/reports/b.json
+
+The /ysp/* endpoints call youtube-search-python, whose upstream URLs are
+hardcoded; its requests are redirected to the stand-in as well, and the
+/ysp scenarios are skipped when the library isn't installed.
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from metrics import percentile
+
+REPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reports")
+
+CORE_SCENARIOS = {
+    "search_ids": "/search?query=cats&limit=40&depth=ids",
+    "search_basic": "/search?query=cats&limit=10&depth=basic",
+    "search_full": "/search?query=cats&limit=10",
+    "fetch_full": "/fetch?hashtag=cats&limit=10",
+}
+YSP_SCENARIOS = {
+    "ysp_search_videos": "/ysp/search/videos?query=cats&limit=5",
+    "ysp_suggestions": "/ysp/suggestions?query=cats",
+    "ysp_hashtag": "/ysp/hashtag?tag=cats&limit=5",
+}
+
+
+def summarize(latencies: List[float], errors: int, wall: float, videos: int) -> dict:
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / wall, 3) if wall else 0.0,
+        "videos_per_s": round(videos / wall, 3) if wall else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return "unknown"
+
+
+def run_scenario(base: str, path: str, requests_n: int, concurrency: int, reset_cache) -> dict:
+    import requests
+
+    latencies, errors, videos = [], 0, 0
+    lock = threading.Lock()
+    local = threading.local()
+
+    def one(_):
+        nonlocal errors, videos
+        session = getattr(local, "session", None) or requests.Session()
+        local.session = session
+        if reset_cache:
+            reset_cache()
+        started = time.perf_counter()
+        try:
+            res = session.get(base + path, timeout=120)
+            elapsed = time.perf_counter() - started
+            ok = res.status_code == 200
+            body = res.json() if ok and res.headers.get("content-type", "").startswith("application/json") else None
+            # /ysp/suggestions answers with a JSON string, not an object
+            count = body.get("count", 0) if isinstance(body, dict) else 0
+        except Exception:
+            ok, elapsed, count = False, 0.0, 0
+        with lock:
+            if ok:
+                latencies.append(elapsed)
+                videos += count
+            else:
+                errors += 1
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests_n)))
+    return summarize(latencies, errors, time.perf_counter() - wall_start, videos)
+
+
+def micro(fn, arg, iterations: int) -> dict:
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn(arg)
+        timings.append(time.perf_counter() - started)
+    return {
+        "iterations": iterations,
+        "bytes": len(arg),
+        "mean_ms": round(sum(timings) / len(timings) * 1000, 3),
+        "p50_ms": round(percentile(timings, 50) * 1000, 3),
+        "min_ms": round(min(timings) * 1000, 3),
+    }
+
+
+def redirect_ysp(base_url: str) -> bool:
+    """Sends youtube-search-python's requests to the stand-in. False if the library isn't installed."""
+    try:
+        import httpx
+        from youtubesearchpython.core import hashtag
+        from youtubesearchpython.core.constants import userAgent
+        from youtubesearchpython.core.requests import RequestCore
+    except ImportError:
+        return False
+
+    def local(url: str) -> str:
+        return re.sub(r"^https://(www\.youtube\.com|clients1\.google\.com)", base_url, url)
+
+    # Same requests the library makes, minus its proxy settings
+    def post(self):
+        return httpx.post(local(self.url), headers={"User-Agent": userAgent}, json=self.data, timeout=self.timeout)
+
+    def get(self):
+        return httpx.get(local(self.url), headers={"User-Agent": userAgent}, timeout=self.timeout)
+
+    RequestCore.syncPostRequest = post
+    RequestCore.syncGetRequest = get
+    # The hashtag lookups use urllib directly
+    urlopen = hashtag.urlopen
+
+    def hashtag_urlopen(request, *args, **kwargs):
+        request.full_url = local(request.full_url)
+        return urlopen(request, *args, **kwargs)
+
+    hashtag.urlopen = hashtag_urlopen
+    return True
+
+
+def run(args) -> dict:
+    from bench.stand_in import StandInServer
+
+    stand_in = StandInServer(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms).start()
+
+    # Settings are read at import time: configure before importing the API
+    data_dir = tempfile.mkdtemp(prefix="shorts-bench-")
+    os.environ.update({
+        "YOUTUBE_BASE_URL": stand_in.base_url,
+        "THUMBNAIL_BASE_URL": stand_in.base_url + "/vi",
+        "DATA_DIR": data_dir,
+        "RATE_LIMIT_RATE": str(args.rate_limit),
+        "RATE_LIMIT_BURST": str(args.rate_limit),
+    })
+    import youtube_transcript_api._transcripts as yta
+    yta.WATCH_URL = stand_in.base_url + "/watch?v={video_id}"
+    yta.INNERTUBE_API_URL = stand_in.base_url + "/youtubei/v1/player?key={api_key}"
+    ysp_offline = redirect_ysp(stand_in.base_url)
+
+    import uvicorn
+    import page_extractor
+    import short_api
+    from bench import fixtures
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(short_api.app, host="127.0.0.1", port=port, log_level="error"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    base = f"http://127.0.0.1:{port}"
+
+    def reset_cache():
+        short_api.metadata_cache.invalidate()
+        short_api.transcript_store.invalidate()
+        short_api.ysp_cache.invalidate()
+        short_api.thumbnail_cache.invalidate()
+
+    scenarios = dict(CORE_SCENARIOS)
+    if ysp_offline:
+        scenarios.update(YSP_SCENARIOS)
+    else:
+        print("BENCH: youtube-search-python not installed, skipping /ysp scenarios")
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "cache": args.cache,
+            "enrich_workers": short_api.settings.ENRICH_WORKERS,
+        },
+        "scenarios": {},
+        "micro": {},
+    }
+    try:
+        for name, path in scenarios.items():
+            print(f"BENCH: {name} ({args.requests} requests, concurrency {args.concurrency})")
+            reset_cache()
+            report["scenarios"][name] = run_scenario(
+                base, path, args.requests, args.concurrency, reset_cache if args.cache == "cold" else None)
+            print(f"       {report['scenarios'][name]}")
+
+        watch = fixtures.recorded("watch.html") or fixtures.watch_page(fixtures.video_id(0), stand_in.base_url)
+        search = fixtures.recorded("search.html") or fixtures.listing_page(shorts=False)
+        report["micro"]["extract_watch_page"] = micro(page_extractor.extract_watch_page, watch, args.micro_iterations)
+        report["micro"]["extract_listing"] = micro(page_extractor.extract_listing, search, args.micro_iterations)
+        print(f"BENCH: micro {report['micro']}")
+        report["meta"]["upstream_requests"] = stand_in.requests
+    finally:
+        server.should_exit = True
+        stand_in.stop()
+    return report
+
+
+def compare(old_path: str, new_path: str) -> None:
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"{'metric':45} {'old':>10} {'new':>10} {'change':>8}")
+    for section in ("scenarios", "micro"):
+        for name, metrics in new.get(section, {}).items():
+            for key, value in metrics.items():
+                before = old.get(section, {}).get(name, {}).get(key)
+                if not isinstance(value, (int, float)) or not isinstance(before, (int, float)):
+                    continue
+                change = f"{(value - before) / before * 100:+.1f}%" if before else "n/a"
+                print(f"{section + '.' + name + '.' + key:45} {before:>10} {value:>10} {change:>8}")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Offline benchmark for the Shorts API.")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Injected upstream latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--requests", type=int, default=20, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent clients per scenario")
+    parser.add_argument("--cache", choices=["cold", "warm"], default="cold", help="Clear caches before every request or not")
+    parser.add_argument("--rate-limit", type=float, default=1000.0, help="Upstream token-bucket rate used during the run")
+    parser.add_argument("--micro-iterations", type=int, default=50)
+    parser.add_argument("--output", help="Report path (default: bench/reports/<timestamp>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two reports and exit")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    report = run(args)
+    path = args.output or os.path.join(REPORT_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"BENCH: report written to {path}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""Local stand-in for the parts of youtube.com the scrapers talk to.
+
+Serves search/hashtag pages, innertube continuations, watch pages, the
+innertube player endpoint, timedtext captions and thumbnails from bench
+fixtures, plus the innertube search/browse calls and suggestions endpoint
+that youtube-search-python makes, with configurable injected latency so runs
+are repeatable offline.
+"""
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from bench import fixtures
+
+
+class StandInServer:
+    def __init__(self, latency_ms: float = 50.0, jitter_ms: float = 10.0, pages: int = 5, port: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.pages = pages
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._httpd.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+        self._thread = None
+
+        # Static pages are built once; watch pages once per video id
+        self._search = fixtures.recorded("search.html") or fixtures.listing_page(shorts=False, pages=pages)
+        self._hashtag = fixtures.recorded("hashtag.html") or fixtures.listing_page(shorts=True, pages=pages)
+        self._watch_recorded = fixtures.recorded("watch.html")
+        self._transcript_recorded = fixtures.recorded("transcript.xml")
+        self._watch_cache = {}
+
+    def start(self) -> "StandInServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _delay(self) -> None:
+        delay = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    def _watch(self, v_id: str) -> str:
+        if self._watch_recorded:
+            return self._watch_recorded
+        page = self._watch_cache.get(v_id)
+        if page is None:
+            page = self._watch_cache[v_id] = fixtures.watch_page(v_id, self.base_url)
+        return page
+
+    def route(self, method: str, path: str, query: dict, body: bytes):
+        """Returns (status, content type, body text or bytes)."""
+        if method == "GET" and path == "/results":
+            return 200, "text/html", self._search
+        if method == "GET" and re.fullmatch(r"/hashtag/[^/]+/shorts", path):
+            return 200, "text/html", self._hashtag
+        m = re.fullmatch(r"/shorts/([\w-]{11})", path)
+        if method == "GET" and (m or path == "/watch"):
+            return 200, "text/html", self._watch(m.group(1) if m else query.get("v", [""])[0])
+        if method == "POST" and path in ("/youtubei/v1/search", "/youtubei/v1/browse"):
+            request = json.loads(body or b"{}")
+            token = request.get("continuation", "")
+            if not token and request.get("query"):
+                # youtube-search-python: a search, or the "#tag" lookup before a hashtag browse
+                term = request["query"]
+                data = fixtures.ysp_hashtag_tile(term[1:]) if term.startswith("#") else fixtures.ysp_search_response(self.pages)
+                return 200, "application/json", json.dumps(data)
+            if not token and request.get("browseId") == "FEhashtag":
+                return 200, "application/json", json.dumps(fixtures.ysp_hashtag_browse(self.pages))
+            if not re.fullmatch(r"page-\d+", token):
+                return 400, "application/json", '{"error": "bad continuation"}'
+            return 200, "application/json", json.dumps(fixtures.continuation_response(token, path.endswith("browse"), self.pages))
+        if method == "POST" and path == "/youtubei/v1/player":
+            v_id = json.loads(body or b"{}").get("videoId", "")
+            return 200, "application/json", json.dumps(fixtures.player_response(v_id, self.base_url))
+        if method == "GET" and path == "/api/timedtext":
+            v_id = query.get("v", [""])[0]
+            if query.get("fmt") == ["json3"]:
+                return 200, "application/json", json.dumps(fixtures.transcript_json3(v_id))
+            return 200, "text/xml", self._transcript_recorded or fixtures.transcript_xml(v_id)
+        m = re.fullmatch(r"/vi/([\w-]{11})/(\w+)\.jpg", path)
+        if method == "GET" and m:
+            # Like most Shorts: no maxresdefault
+            if m.group(2) == "maxresdefault":
+                return 404, "text/plain", "not found"
+            return 200, "image/jpeg", fixtures.thumbnail_bytes(m.group(1), m.group(2))
+        if method == "GET" and path == "/complete/search":
+            return 200, "text/javascript", fixtures.suggestions_jsonp(query.get("q", [""])[0])
+        return 404, "text/plain", "not found"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real thing
+
+            def _serve(self, method: str) -> None:
+                url = urlparse(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                with server._lock:
+                    server.requests += 1
+                server._delay()
+                status, ctype, text = server.route(method, url.path, parse_qs(url.query), body)
+                binary = isinstance(text, bytes)
+                payload = text if binary else text.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", ctype if binary else f"{ctype}; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self._serve("GET")
+
+            def do_POST(self):
+                self._serve("POST")
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
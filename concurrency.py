@@ -0,0 +1,200 @@
+"""Concurrency primitives shared by the scrapers."""
+import contextvars
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import settings
+from resilience import DeadlineExceeded
+
+
+def _check_wait(wait: float, max_wait: Optional[float]) -> None:
+    if max_wait is not None and wait > max_wait:
+        raise DeadlineExceeded(f"Rate limit wait of {wait:.1f}s would pass the deadline")
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, up to `burst` stored."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, max_wait: Optional[float] = None) -> float:
+        """Blocks until a token is available. Returns the time spent waiting.
+
+        Raises DeadlineExceeded (without taking a token) if that would take longer than `max_wait`.
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            _check_wait(waited + delay, max_wait)
+            time.sleep(delay)
+            waited += delay
+
+
+class SharedTokenBucket:
+    """TokenBucket whose state lives in SQLite, so several worker processes share one budget.
+
+    Uses wall-clock time (monotonic clocks aren't comparable across
+    processes) and BEGIN IMMEDIATE so refill-and-take is atomic.
+    """
+
+    def __init__(self, path: str, key: str, rate: float, burst: int):
+        self.key = key
+        self.rate = rate
+        self.burst = burst
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, updated REAL)")
+
+    def _take(self) -> float:
+        """Takes a token if one is available. Returns 0, or how long to wait for the next one."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = self._db.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (self.key,)).fetchone()
+                tokens = float(self.burst) if row is None else min(self.burst, row[0] + max(0.0, now - row[1]) * self.rate)
+                delay = 0.0
+                if tokens >= 1:
+                    tokens -= 1
+                else:
+                    delay = (1 - tokens) / self.rate
+                self._db.execute("INSERT OR REPLACE INTO buckets VALUES (?, ?, ?)", (self.key, tokens, now))
+                self._db.execute("COMMIT")
+                return delay
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def acquire(self, max_wait: Optional[float] = None) -> float:
+        waited = 0.0
+        while True:
+            delay = self._take()
+            if not delay:
+                return waited
+            _check_wait(waited + delay, max_wait)
+            time.sleep(delay)
+            waited += delay
+
+
+class HostRateLimiter:
+    """One TokenBucket per upstream host, created on first use.
+
+    With `shared_path` the buckets are SharedTokenBucket rows in that
+    SQLite file, so every worker process draws from the same budget.
+    """
+
+    def __init__(self, rate: float, burst: int, shared_path: Optional[str] = None):
+        self.rate = rate
+        self.burst = burst
+        self.shared_path = shared_path
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, host: str) -> TokenBucket:
+        with self._lock:
+            b = self._buckets.get(host)
+            if b is None:
+                if self.shared_path:
+                    b = SharedTokenBucket(self.shared_path, host, self.rate, self.burst)
+                else:
+                    b = TokenBucket(self.rate, self.burst)
+                self._buckets[host] = b
+            return b
+
+    def acquire(self, url_or_host: str, max_wait: Optional[float] = None) -> float:
+        """Waits for a token for the host; raises DeadlineExceeded if that would take over `max_wait` seconds."""
+        host = urlparse(url_or_host).hostname if "://" in url_or_host else url_or_host
+        return self.bucket(host or url_or_host).acquire(max_wait)
+
+
+# Shared across every scraper in the process (and across worker processes in serve mode)
+rate_limiter = HostRateLimiter(
+    settings.RATE_LIMIT_RATE, settings.RATE_LIMIT_BURST,
+    shared_path=os.path.join(settings.DATA_DIR, "rate_limit.sqlite3") if settings.RATE_LIMIT_SHARED else None,
+)
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one execution.
+
+    The first caller runs the function; callers arriving while it is in
+    flight wait for and share its result (or exception).
+    """
+
+    def __init__(self):
+        self._calls: Dict[object, _Call] = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"executed": self.executed, "coalesced": self.coalesced, "in_flight": len(self._calls)}
+
+
+class ContextThreadPoolExecutor(ThreadPoolExecutor):
+    """ThreadPoolExecutor whose tasks run in a copy of the submitter's contextvars.
+
+    Per-request state kept in contextvars (timings, deadlines) follows
+    work fanned out to the pool.
+    """
+
+    def submit(self, fn, /, *args, **kwargs):
+        return super().submit(contextvars.copy_context().run, fn, *args, **kwargs)
@@ -0,0 +1,204 @@
+"""Response encoding: negotiated body format and br/gzip compression.
+
+Bodies are JSON via orjson when installed, or MessagePack when the client
+prefers it in `Accept` (and msgpack is installed). Compression follows
+`Accept-Encoding`: brotli first, then gzip. Streaming responses are
+compressed chunk by chunk with a flush after each one, so NDJSON lines
+still arrive as they are produced. orjson, msgpack and brotli are all
+optional; without them the API falls back to the json module and gzip.
+"""
+import contextvars
+import json
+import zlib
+from typing import Dict, Optional
+
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Already compressed (images) or must not be buffered by proxies (SSE)
+UNCOMPRESSED_TYPES = ("image/", "video/", "audio/", "text/event-stream")
+
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+# Accept header of the current request, set by CompressionMiddleware
+_accept: contextvars.ContextVar[str] = contextvars.ContextVar("accept", default="")
+
+
+def dumps(obj) -> str:
+    """Compact JSON text (orjson when available)."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def _qvalues(header: str) -> Dict[str, float]:
+    """Parses `a;q=0.5, b` into {"a": 0.5, "b": 1.0}."""
+    values = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, val = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(val)
+                except ValueError:
+                    q = 0.0
+        values[name.strip().lower()] = q
+    return values
+
+
+def prefers_msgpack(accept: str) -> bool:
+    if msgpack is None or not accept:
+        return False
+    q = _qvalues(accept)
+    packed = max((q.get(t, 0.0) for t in MSGPACK_TYPES), default=0.0)
+    return packed > 0 and packed >= q.get("application/json", 0.0)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    q = _qvalues(accept_encoding)
+    wildcard = q.get("*", 0.0)
+    for name in (("br",) if brotli is not None else ()) + ("gzip",):
+        if q.get(name, wildcard) > 0:
+            return name
+    return None
+
+
+class NegotiatedResponse(JSONResponse):
+    """Default response class: orjson-encoded JSON, or MessagePack when the client asks for it."""
+
+    def __init__(self, content, status_code: int = 200, headers=None, **kwargs):
+        headers = dict(headers or {})
+        headers.setdefault("Vary", "Accept")
+        super().__init__(content, status_code, headers, **kwargs)
+
+    def render(self, content) -> bytes:
+        if prefers_msgpack(_accept.get()):
+            self.media_type = MSGPACK_TYPES[0]
+            return msgpack.packb(content, use_bin_type=True)
+        if orjson is not None:
+            return orjson.dumps(content)
+        return super().render(content)
+
+
+class _Compressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._c = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._c = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        """Compresses and flushes, so the client can decode everything sent so far."""
+        if self.encoding == "br":
+            return self._c.process(data) + self._c.flush()
+        return self._c.compress(data) + self._c.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self.encoding == "br":
+            return self._c.process(data) + self._c.finish()
+        return self._c.compress(data) + self._c.flush()
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware: records the Accept header for NegotiatedResponse and compresses bodies."""
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        token = _accept.set(headers.get("accept", ""))
+        try:
+            encoding = choose_encoding(headers.get("accept-encoding", ""))
+            if encoding is None:
+                await self.app(scope, receive, send)
+            else:
+                await self.app(scope, receive, _CompressingSend(self, send, encoding))
+        finally:
+            _accept.reset(token)
+
+
+class _CompressingSend:
+    def __init__(self, owner: CompressionMiddleware, send, encoding: str):
+        self.owner = owner
+        self.send = send
+        self.encoding = encoding
+        self.start = None
+        self.compressor = None
+        self.passthrough = False
+        # Sized responses are collected and compressed in one go (they may still
+        # arrive in several chunks, e.g. through BaseHTTPMiddleware)
+        self.buffer: Optional[list] = None
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            # Hold the headers until the first body chunk tells us whether to compress
+            self.start = message
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more = message.get("more_body", False)
+        if self.start is not None and self.compressor is None:
+            headers = MutableHeaders(raw=self.start["headers"])
+            length = headers.get("content-length")
+            size = int(length) if length is not None else (None if more else len(body))
+            uncompressible = headers.get("content-type", "").startswith(UNCOMPRESSED_TYPES)
+            if "content-encoding" not in headers and not uncompressible:
+                headers.add_vary_header("Accept-Encoding")
+            if ("content-encoding" in headers or uncompressible
+                    or (size is not None and size < self.owner.minimum_size)):
+                self.passthrough = True
+                await self.send(self.start)
+                await self.send(message)
+                return
+            self.compressor = _Compressor(self.encoding, self.owner.gzip_level, self.owner.brotli_quality)
+            headers["Content-Encoding"] = self.encoding
+            if size is None:
+                del headers["Content-Length"]
+                await self.send(self.start)
+                self.start = None
+            else:
+                self.buffer = []
+
+        if self.buffer is not None:
+            self.buffer.append(body)
+            if more:
+                return
+            body = self.compressor.finish(b"".join(self.buffer))
+            headers = MutableHeaders(raw=self.start["headers"])
+            headers["Content-Length"] = str(len(body))
+            await self.send(self.start)
+            await self.send({"type": "http.response.body", "body": body, "more_body": False})
+            return
+
+        body = self.compressor.chunk(body) if more else self.compressor.finish(body)
+        await self.send({"type": "http.response.body", "body": body, "more_body": more})
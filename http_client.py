@@ -0,0 +1,184 @@
+"""Shared, pooled HTTP client used by every upstream scraper.
+
+One keep-alive connection pool per host is reused across watch pages,
+search pages and transcript requests, so a batch of Shorts pays for the
+TCP+TLS handshake once instead of once per video.
+"""
+import threading
+import time
+from importlib.util import find_spec
+from typing import Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import settings
+from concurrency import rate_limiter
+from metrics import RECENT_UPSTREAM, UPSTREAM_BYTES, UPSTREAM_ERRORS, UPSTREAM_RESPONSES
+from resilience import upstream_guard
+
+# urllib3/httpx decode "br" bodies when brotli is installed
+ACCEPT_ENCODING = "gzip, deflate, br" if find_spec("brotli") else "gzip, deflate"
+
+# Robust headers
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
+    "Accept-Encoding": ACCEPT_ENCODING,
+    "Connection": "keep-alive"
+}
+
+
+def record_response(url: str, res, streamed: bool = False, elapsed: float = 0.0) -> None:
+    host = urlparse(url).hostname or "unknown"
+    UPSTREAM_RESPONSES.inc(host=host, status=res.status_code)
+    RECENT_UPSTREAM.record(elapsed, error=res.status_code == 429 or res.status_code >= 500)
+    if not streamed:
+        UPSTREAM_BYTES.inc(len(res.content), host=host)
+
+
+def clamp_timeout(timeout, left: Optional[float]):
+    """Caps a float or (connect, read) timeout at the time left before the request deadline."""
+    if left is None:
+        return timeout
+    left = max(left, 0.1)
+    if isinstance(timeout, tuple):
+        return tuple(left if t is None else min(t, left) for t in timeout)
+    if timeout is None or isinstance(timeout, (int, float)):
+        return left if timeout is None else min(timeout, left)
+    return timeout
+
+
+class PacedAdapter(HTTPAdapter):
+    """HTTPAdapter that takes a rate-limit token for the target host before each send,
+    and retries / fails fast through the shared upstream guard.
+
+    Mounting it on the session means third-party code handed the session
+    (e.g. YouTubeTranscriptApi) is paced exactly like our own calls.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+
+    def send(self, request, **kwargs):
+        def attempt(left):
+            return self._send_once(request, left, **{**kwargs, "timeout": clamp_timeout(kwargs.get("timeout"), left)})
+        return upstream_guard.call(request.url, attempt, (requests.ConnectionError, requests.Timeout))
+
+    def _send_once(self, request, left: Optional[float] = None, **kwargs):
+        # Pacing waits count against the deadline like the request itself
+        rate_limiter.acquire(request.url, max_wait=left)
+        with self._lock:
+            self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            res = super().send(request, **kwargs)
+            record_response(request.url, res, streamed=kwargs.get("stream", False), elapsed=time.perf_counter() - started)
+            return res
+        except Exception as e:
+            UPSTREAM_ERRORS.inc(host=urlparse(request.url).hostname or "unknown", error=type(e).__name__)
+            RECENT_UPSTREAM.record(error=True)
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+class HttpClient:
+    """Thin wrapper around a pooled requests.Session (and optionally an HTTP/2 httpx client)."""
+
+    def __init__(self, pool_size: int, connect_timeout: float, read_timeout: float, http2: bool = False):
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+
+        self.adapter = PacedAdapter(pool_connections=8, pool_maxsize=pool_size)
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+
+        self.h2_client = None
+        self._h2_errors = ()
+        if http2:
+            try:
+                import httpx
+                # Raises ImportError itself when h2 isn't installed
+                self.h2_client = httpx.Client(
+                    http2=True,
+                    headers=HEADERS,
+                    follow_redirects=True,
+                    timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                    limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+                )
+                self._h2_errors = (httpx.TransportError,)
+            except ImportError:
+                print("HTTP: HTTP/2 requested but 'httpx[http2]' is not installed, using HTTP/1.1 pool")
+
+    def get(self, url: str, timeout: Optional[float] = None, **kwargs):
+        """GET through the shared pool. Returns a requests/httpx response (same .text/.status_code API)."""
+        if self.h2_client is not None:
+            def attempt(left):
+                rate_limiter.acquire(url, max_wait=left)
+                started = time.perf_counter()
+                res = self.h2_client.get(url, timeout=clamp_timeout(timeout, left) or self.h2_client.timeout, **kwargs)
+                record_response(url, res, elapsed=time.perf_counter() - started)
+                return res
+            return upstream_guard.call(url, attempt, self._h2_errors)
+        return self.session.get(url, timeout=timeout or self.timeout, **kwargs)
+
+    def post_json(self, url: str, payload: dict, timeout: Optional[float] = None):
+        """POST a JSON body (innertube API calls) through the shared pool."""
+        headers = {"Content-Type": "application/json", "Accept": "application/json"}
+        if self.h2_client is not None:
+            def attempt(left):
+                rate_limiter.acquire(url, max_wait=left)
+                started = time.perf_counter()
+                res = self.h2_client.post(url, json=payload, headers=headers,
+                                          timeout=clamp_timeout(timeout, left) or self.h2_client.timeout)
+                record_response(url, res, elapsed=time.perf_counter() - started)
+                return res
+            return upstream_guard.call(url, attempt, self._h2_errors)
+        return self.session.post(url, json=payload, headers=headers, timeout=timeout or self.timeout)
+
+    def stats(self) -> dict:
+        """Connection pool counters for the HTTP/1.1 session (and HTTP/2 client if enabled)."""
+        requests_made = new_conns = idle = 0
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            requests_made += pool.num_requests
+            new_conns += pool.num_connections
+            idle += sum(1 for c in list(pool.pool.queue) if c is not None) if pool.pool else 0
+
+        stats = {
+            "pool_size": self.pool_size,
+            "hosts": len(pools),
+            "requests": requests_made,
+            "new_connections": new_conns,
+            "reuse_rate": round(1 - new_conns / requests_made, 3) if requests_made else None,
+            "idle_connections": idle,
+            "in_flight": self.adapter.in_flight,
+            "open_connections": idle + self.adapter.in_flight,
+            "http2": self.h2_client is not None,
+        }
+        if self.h2_client is not None:
+            try:
+                stats["http2_open_connections"] = len(self.h2_client._transport._pool.connections)
+            except AttributeError:
+                stats["http2_open_connections"] = None
+        return stats
+
+
+# Single client for the whole app
+client = HttpClient(
+    pool_size=settings.HTTP_POOL_SIZE,
+    connect_timeout=settings.HTTP_CONNECT_TIMEOUT,
+    read_timeout=settings.HTTP_READ_TIMEOUT,
+    http2=settings.HTTP2,
+)
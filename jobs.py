@@ -0,0 +1,207 @@
+"""Background harvest jobs with results persisted in SQLite.
+
+Jobs are claimed atomically (queued -> running), so a job is only ever
+executed once, even with several worker processes sharing the database.
+Jobs left "running" by a stopped process are re-queued on startup, and
+the results already saved are skipped when they resume.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, Optional
+
+import settings
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobStore:
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._db.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, kind TEXT, params TEXT, status TEXT, total INTEGER, done INTEGER,"
+            " error TEXT, created_at REAL, started_at REAL, finished_at REAL);"
+            "CREATE TABLE IF NOT EXISTS job_results ("
+            " job_id TEXT, seq INTEGER, video_id TEXT, payload TEXT, PRIMARY KEY (job_id, video_id));"
+            "CREATE INDEX IF NOT EXISTS job_results_seq ON job_results (job_id, seq);"
+        )
+        self._db.commit()
+
+    def _exec(self, sql: str, args=()) -> sqlite3.Cursor:
+        with self._lock:
+            cur = self._db.execute(sql, args)
+            self._db.commit()
+            return cur
+
+    def _query(self, sql: str, args=()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._db.execute(sql, args).fetchall()
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> dict:
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        return job
+
+    def create(self, kind: str, params: dict) -> dict:
+        job_id = uuid.uuid4().hex[:12]
+        self._exec(
+            "INSERT INTO jobs (id, kind, params, status, total, done, created_at) VALUES (?, ?, ?, ?, NULL, 0, ?)",
+            (job_id, kind, json.dumps(params), QUEUED, time.time()),
+        )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        rows = self._query("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        return self._to_dict(rows[0]) if rows else None
+
+    def list(self, limit: int = 50) -> List[dict]:
+        return [self._to_dict(r) for r in self._query("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,))]
+
+    def claim(self, job_id: str) -> bool:
+        """queued -> running. False if someone else got it (or it was cancelled)."""
+        cur = self._exec("UPDATE jobs SET status = ?, started_at = ? WHERE id = ? AND status = ?",
+                         (RUNNING, time.time(), job_id, QUEUED))
+        return cur.rowcount == 1
+
+    def requeue_interrupted(self) -> List[str]:
+        self._exec("UPDATE jobs SET status = ? WHERE status = ?", (QUEUED, RUNNING))
+        return self.queued_ids()
+
+    def queued_ids(self) -> List[str]:
+        return [r["id"] for r in self._query("SELECT id FROM jobs WHERE status = ? ORDER BY created_at", (QUEUED,))]
+
+    def release(self, job_ids: Iterable[str]) -> None:
+        """running -> queued for jobs this process is giving up (another worker resumes them)."""
+        for job_id in job_ids:
+            self._exec("UPDATE jobs SET status = ? WHERE id = ? AND status = ?", (QUEUED, job_id, RUNNING))
+
+    def set_total(self, job_id: str, total: int) -> None:
+        self._exec("UPDATE jobs SET total = ? WHERE id = ?", (total, job_id))
+
+    def finish(self, job_id: str, status: str, error: Optional[str] = None) -> None:
+        self._exec("UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ? AND status = ?",
+                   (status, error, time.time(), job_id, RUNNING))
+
+    def cancel(self, job_id: str) -> bool:
+        cur = self._exec("UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND status IN (?, ?)",
+                         (CANCELLED, time.time(), job_id, QUEUED, RUNNING))
+        return cur.rowcount == 1
+
+    def is_cancelled(self, job_id: str) -> bool:
+        rows = self._query("SELECT status FROM jobs WHERE id = ?", (job_id,))
+        return not rows or rows[0]["status"] == CANCELLED
+
+    def add_result(self, job_id: str, seq: int, video: dict) -> None:
+        with self._lock:
+            self._db.execute("INSERT OR IGNORE INTO job_results VALUES (?, ?, ?, ?)",
+                             (job_id, seq, video["video_id"], json.dumps(video, ensure_ascii=False)))
+            self._db.execute("UPDATE jobs SET done = (SELECT COUNT(*) FROM job_results WHERE job_id = ?) WHERE id = ?",
+                             (job_id, job_id))
+            self._db.commit()
+
+    def result_ids(self, job_id: str) -> set:
+        return {r["video_id"] for r in self._query("SELECT video_id FROM job_results WHERE job_id = ?", (job_id,))}
+
+    def results(self, job_id: str, offset: int, limit: int) -> List[dict]:
+        rows = self._query("SELECT payload FROM job_results WHERE job_id = ? ORDER BY seq LIMIT ? OFFSET ?",
+                           (job_id, limit, offset))
+        return [json.loads(r["payload"]) for r in rows]
+
+
+class JobRunner:
+    """Executes queued jobs on a bounded worker pool.
+
+    `execute(job, store)` does the actual harvest; it should call
+    store.add_result as videos arrive and raise JobCancelled once
+    should_stop(job_id) is true.
+
+    resume=False leaves "running" jobs alone at startup (another worker
+    process may own them). poll_interval > 0 periodically picks up jobs
+    queued by other processes or released by a worker that shut down.
+    """
+
+    def __init__(self, store: JobStore, workers: int, execute: Callable[[dict, JobStore], None],
+                 resume: bool = True, poll_interval: float = 0):
+        self.store = store
+        self.workers = workers
+        self.execute = execute
+        self.resume = resume
+        self.poll_interval = poll_interval
+        self._pool = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._pending = set()  # submitted to this process's pool and not finished yet
+
+    def start(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                return
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+            self._stopping.clear()
+        job_ids = self.store.requeue_interrupted() if self.resume else self.store.queued_ids()
+        for job_id in job_ids:
+            print(f"JOBS: Resuming {job_id}")
+            self.submit(job_id)
+        if self.poll_interval > 0:
+            threading.Thread(target=self._poll, name="job-poll", daemon=True).start()
+
+    def shutdown(self) -> None:
+        """Stops taking jobs. Running ones stop at their next should_stop check and release themselves."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+            self._stopping.set()
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def should_stop(self, job_id: str) -> bool:
+        return self._stopping.is_set() or self.store.is_cancelled(job_id)
+
+    def submit(self, job_id: str) -> None:
+        self.start()
+        with self._lock:
+            if job_id in self._pending or self._pool is None:
+                return
+            self._pending.add(job_id)
+            self._pool.submit(self._run, job_id)
+
+    def _poll(self) -> None:
+        while not self._stopping.wait(self.poll_interval):
+            for job_id in self.store.queued_ids():
+                self.submit(job_id)
+
+    def _run(self, job_id: str) -> None:
+        try:
+            if not self.store.claim(job_id):
+                return
+            try:
+                self.execute(self.store.get(job_id), self.store)
+                if not self._stopping.is_set():
+                    self.store.finish(job_id, DONE)
+            except JobCancelled:
+                pass
+            except Exception as e:
+                print(f"JOB ERROR ({job_id}): {e}")
+                self.store.finish(job_id, FAILED, str(e))
+            if self._stopping.is_set():
+                # Hand the job back for the next worker / next start, only now that nothing here writes to it
+                self.store.release([job_id])
+        finally:
+            with self._lock:
+                self._pending.discard(job_id)
+
+
+job_store = JobStore(os.path.join(settings.DATA_DIR, "jobs.sqlite3"))
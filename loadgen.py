@@ -0,0 +1,170 @@
+"""Load generator: replays a weighted mix of API calls against a running server.
+
+Used by the control panel's dashboard to size WORKERS / ENRICH_WORKERS
+before going online, and usable on its own:
+
+    python loadgen.py --mix fetch=2,search=2,ysp=1 --concurrency 8 --duration 60
+
+Search terms rotate through a small pool, so the mix hits both cached
+and uncached videos like real traffic does.
+"""
+import argparse
+import itertools
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from metrics import RecentWindow
+
+DEFAULT_URL = "http://localhost:7861"
+DEFAULT_MIX = {"fetch": 2, "search": 2, "ysp": 1}
+TERMS = ("cats", "dogs", "cooking", "football", "music", "travel", "gaming", "funny")
+
+# kind -> path templates ({term} is filled per request)
+SCENARIOS = {
+    "fetch": ("/fetch?hashtag={term}&limit=5",),
+    "search": ("/search?query={term}&limit=5", "/search?query={term}&limit=20&depth=ids"),
+    "ysp": ("/ysp/search/videos?query={term}&limit=5", "/ysp/suggestions?query={term}", "/ysp/hashtag?tag={term}&limit=5"),
+}
+
+
+def parse_mix(text: str) -> Dict[str, int]:
+    """`fetch=2, search=1` -> {"fetch": 2, "search": 1}. Raises ValueError on unknown kinds or bad weights."""
+    mix = {}
+    for part in text.split(","):
+        if not part.strip():
+            continue
+        kind, _, weight = part.partition("=")
+        kind = kind.strip().lower()
+        if kind not in SCENARIOS:
+            raise ValueError(f"Unknown kind '{kind}' (use {', '.join(SCENARIOS)})")
+        mix[kind] = int(weight) if weight.strip() else 1
+        if mix[kind] < 0:
+            raise ValueError(f"Negative weight for '{kind}'")
+    if not any(mix.values()):
+        raise ValueError("Mix is empty")
+    return mix
+
+
+class LoadGenerator:
+    """`concurrency` threads sending requests back to back until stopped (or `duration` passes)."""
+
+    def __init__(self, base_url: str, mix: Dict[str, int], concurrency: int, duration: Optional[float] = None,
+                 on_update: Optional[Callable[[dict], None]] = None, interval: float = 1.0, timeout: float = 60.0):
+        self.base_url = base_url.rstrip("/")
+        self.kinds = [k for k, w in mix.items() if w > 0]
+        self.weights = [mix[k] for k in self.kinds]
+        self.concurrency = max(1, concurrency)
+        self.duration = duration
+        self.on_update = on_update
+        self.interval = interval
+        self.timeout = timeout
+        self.window = RecentWindow(window=10.0)
+        self.by_kind = {k: RecentWindow(window=10.0) for k in self.kinds}
+        self.totals = {"sent": 0, "errors": 0}
+        self.started_at: Optional[float] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    @property
+    def running(self) -> bool:
+        return any(t.is_alive() for t in self._threads)
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self.started_at = time.monotonic()
+        self._threads = [threading.Thread(target=self._worker, name=f"loadgen-{i}", daemon=True)
+                         for i in range(self.concurrency)]
+        self._threads.append(threading.Thread(target=self._reporter, name="loadgen-report", daemon=True))
+        for t in self._threads:
+            t.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _done(self) -> bool:
+        if self._stop.is_set():
+            return True
+        return self.duration is not None and time.monotonic() - self.started_at >= self.duration
+
+    def _worker(self) -> None:
+        import requests
+        session = requests.Session()
+        terms = itertools.cycle(random.sample(TERMS, len(TERMS)))
+        while not self._done():
+            kind = random.choices(self.kinds, self.weights)[0]
+            path = random.choice(SCENARIOS[kind]).format(term=next(terms))
+            started = time.perf_counter()
+            try:
+                res = session.get(self.base_url + path, timeout=self.timeout)
+                error = res.status_code >= 400
+                res.close()
+            except requests.RequestException:
+                error = True
+            elapsed = time.perf_counter() - started
+            if error:
+                # A failed request can leave the keep-alive connection broken; don't let it fail the next one
+                session.close()
+                session = requests.Session()
+            self.window.record(elapsed, error)
+            self.by_kind[kind].record(elapsed, error)
+            with self._lock:
+                self.totals["sent"] += 1
+                self.totals["errors"] += error
+        session.close()
+
+    def _reporter(self) -> None:
+        while not self._stop.wait(self.interval):
+            if self.on_update:
+                self.on_update(self.summary())
+            if self._done():
+                break
+        # Let the workers' last requests land before the final report
+        for t in self._threads:
+            if t is not threading.current_thread():
+                t.join()
+        if self.on_update:
+            self.on_update({**self.summary(), "finished": True})
+
+    def summary(self) -> dict:
+        with self._lock:
+            totals = dict(self.totals)
+        return {
+            **totals,
+            "elapsed_s": round(time.monotonic() - self.started_at, 1) if self.started_at else 0.0,
+            "concurrency": self.concurrency,
+            "recent": self.window.summary(),
+            "by_kind": {k: w.summary() for k, w in self.by_kind.items()},
+            "finished": False,
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay a mix of API calls against a running server.")
+    parser.add_argument("--url", default=DEFAULT_URL)
+    parser.add_argument("--mix", default=",".join(f"{k}={w}" for k, w in DEFAULT_MIX.items()),
+                        help="Weighted kinds, e.g. fetch=2,search=2,ysp=1")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    args = parser.parse_args()
+
+    def report(s: dict) -> None:
+        recent = s["recent"]
+        print(f"LOADGEN: {s['elapsed_s']:>6}s sent={s['sent']} errors={s['errors']} "
+              f"rps={recent['per_s']} p95={recent['p95_ms']}ms")
+
+    gen = LoadGenerator(args.url, parse_mix(args.mix), args.concurrency, args.duration, on_update=report)
+    gen.start()
+    try:
+        while gen.running:
+            time.sleep(0.2)
+    except KeyboardInterrupt:
+        gen.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Local full-text index (SQLite FTS5) over every video we have enriched.
+
+Titles, channels, descriptions and transcripts are upserted as videos
+pass through enrichment, so "which Shorts we've seen mention X" is
+answered from disk in milliseconds without touching YouTube. Fields
+missing from an update (projected away, or not fetched) keep their
+previous values, and rows whose text didn't change don't touch the FTS
+index at all.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+
+import settings
+
+TEXT_COLUMNS = ("title", "channel_name", "description", "transcript")
+# bm25 weights, in TEXT_COLUMNS order: a hit in the title counts most
+RANK_WEIGHTS = (10.0, 4.0, 2.0, 1.0)
+DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}")
+
+SORTS = {
+    "relevance": "rank",
+    "date": "v.publish_date DESC",
+    "views": "v.views DESC",
+}
+
+
+def fts_query(text: str, mode: str = "all") -> str:
+    """Turns free text into an FTS5 query: every word quoted, so user input can't inject syntax."""
+    words = [w.replace('"', '""') for w in text.split()]
+    if not words:
+        return ""
+    if mode == "phrase":
+        return '"%s"' % " ".join(words)
+    return (" OR " if mode == "any" else " ").join(f'"{w}"' for w in words)
+
+
+class LocalIndex:
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._db.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        cols = ", ".join(TEXT_COLUMNS)
+        new_cols = ", ".join(f"new.{c}" for c in TEXT_COLUMNS)
+        old_cols = ", ".join(f"old.{c}" for c in TEXT_COLUMNS)
+        changed = " OR ".join(f"old.{c} IS NOT new.{c}" for c in TEXT_COLUMNS)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS videos ("
+            " id INTEGER PRIMARY KEY, video_id TEXT UNIQUE, title TEXT, channel_name TEXT, description TEXT,"
+            " transcript TEXT, publish_date TEXT, views INTEGER, duration INTEGER, indexed_at REAL);"
+            "CREATE INDEX IF NOT EXISTS videos_channel ON videos (channel_name COLLATE NOCASE);"
+            "CREATE INDEX IF NOT EXISTS videos_date ON videos (publish_date);"
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS videos_fts USING fts5({cols},"
+            " content='videos', content_rowid='id', tokenize='unicode61 remove_diacritics 2');"
+            # Keep the external-content FTS table in step with videos
+            f"CREATE TRIGGER IF NOT EXISTS videos_ai AFTER INSERT ON videos BEGIN"
+            f" INSERT INTO videos_fts(rowid, {cols}) VALUES (new.id, {new_cols}); END;"
+            f"CREATE TRIGGER IF NOT EXISTS videos_ad AFTER DELETE ON videos BEGIN"
+            f" INSERT INTO videos_fts(videos_fts, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); END;"
+            f"CREATE TRIGGER IF NOT EXISTS videos_au AFTER UPDATE ON videos WHEN {changed} BEGIN"
+            f" INSERT INTO videos_fts(videos_fts, rowid, {cols}) VALUES ('delete', old.id, {old_cols});"
+            f" INSERT INTO videos_fts(rowid, {cols}) VALUES (new.id, {new_cols}); END;"
+        )
+        self._db.commit()
+
+    def add(self, record: dict) -> None:
+        """Upserts one video. `record` holds only real values (no placeholders); absent keys keep the stored value."""
+        date = record.get("publish_date")
+        row = {
+            "video_id": record["video_id"],
+            "title": record.get("title"),
+            "channel_name": record.get("channel_name"),
+            "description": record.get("description"),
+            "transcript": record.get("transcript"),
+            "publish_date": date[:10] if date and DATE_RE.match(date) else None,
+            "views": int(record["views"]) if str(record.get("views", "")).isdigit() else None,
+            "duration": record.get("duration") if isinstance(record.get("duration"), int) else None,
+            "indexed_at": time.time(),
+        }
+        columns = [c for c in row if c not in ("video_id", "indexed_at")]
+        updates = ", ".join(f"{c} = COALESCE(excluded.{c}, {c})" for c in columns)
+        changed = " OR ".join(f"(excluded.{c} IS NOT NULL AND excluded.{c} IS NOT {c})" for c in columns)
+        with self._lock:
+            self._db.execute(
+                f"INSERT INTO videos ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})"
+                f" ON CONFLICT(video_id) DO UPDATE SET {updates}, indexed_at = excluded.indexed_at WHERE {changed}",
+                tuple(row.values()),
+            )
+            self._db.commit()
+
+    def search(self, q: str = "", mode: str = "all", channel: Optional[str] = None,
+               published_after: Optional[str] = None, published_before: Optional[str] = None,
+               sort: str = "relevance", limit: int = 20, offset: int = 0, full: bool = False) -> List[dict]:
+        """Ranked matches for `q` (or, without q, every indexed video) after filters."""
+        match = fts_query(q, mode)
+        where, args = [], []
+        if match:
+            where.append("videos_fts MATCH ?")
+            args.append(match)
+        if channel:
+            where.append("v.channel_name = ? COLLATE NOCASE")
+            args.append(channel)
+        if published_after:
+            where.append("v.publish_date >= ?")
+            args.append(published_after)
+        if published_before:
+            where.append("v.publish_date <= ?")
+            args.append(published_before)
+
+        extra = ", v.description, v.transcript" if full else ""
+        if match:
+            weights = ", ".join(map(str, RANK_WEIGHTS))
+            sql = (f"SELECT v.video_id, v.title, v.channel_name, v.publish_date, v.views, v.duration{extra},"
+                   f" bm25(videos_fts, {weights}) AS rank, snippet(videos_fts, -1, '[', ']', '…', 12) AS snippet"
+                   f" FROM videos_fts JOIN videos v ON v.id = videos_fts.rowid")
+            order = SORTS.get(sort, "rank")
+        else:
+            sql = (f"SELECT v.video_id, v.title, v.channel_name, v.publish_date, v.views, v.duration{extra}"
+                   f" FROM videos v")
+            order = SORTS["date"] if sort == "relevance" else SORTS.get(sort, SORTS["date"])
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {order} LIMIT ? OFFSET ?"
+        with self._lock:
+            rows = self._db.execute(sql, (*args, limit, offset)).fetchall()
+        results = []
+        for r in rows:
+            item = dict(r)
+            if "rank" in item:
+                # bm25 is "lower is better"; flip it so clients can read it as a score
+                item["score"] = round(-item.pop("rank"), 6)
+            results.append(item)
+        return results
+
+    def stats(self) -> dict:
+        with self._lock:
+            count = self._db.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+        return {"videos": count}
+
+
+local_index = LocalIndex(os.path.join(settings.DATA_DIR, "local_index.sqlite3")) if settings.LOCAL_INDEX else None
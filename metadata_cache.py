@@ -0,0 +1,169 @@
+"""Two-tier cache for watch-page metadata: in-process LRU in front of SQLite.
+
+Fields are split by how fast they go stale. "Static" fields (title,
+channel, publish date, thumbnail, description, duration) and the view counts
+(`views` text and numeric `view_count`) carry their own timestamps, so a lookup
+that doesn't need views can still be served long after the view count has expired.
+
+Several worker processes can share the SQLite file. Invalidation bumps a
+generation counter there; each process polls it (at most once a second)
+and drops its in-memory tier when it changes.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+import settings
+
+GENERATION_CHECK_INTERVAL = 1.0
+
+STATIC_FIELDS = ("title", "channel_name", "publish_date", "thumbnail", "full_description", "duration")
+VOLATILE_FIELDS = ("views", "view_count")
+
+
+class MetadataCache:
+    def __init__(self, path: str, max_entries: int, static_ttl: float, views_ttl: float):
+        self.path = path
+        self.max_entries = max_entries
+        self.static_ttl = static_ttl
+        self.views_ttl = views_ttl
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stale": 0, "evictions": 0}
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS metadata ("
+            " video_id TEXT PRIMARY KEY, static TEXT, static_at REAL, views TEXT, views_at REAL)"
+        )
+        self._db.execute("CREATE TABLE IF NOT EXISTS cache_state (key TEXT PRIMARY KEY, value INTEGER)")
+        self._db.commit()
+        self._generation = self._read_generation()
+        self._generation_checked = time.time()
+
+    # --- INTERNAL HELPERS ---
+
+    def _read_generation(self) -> int:
+        row = self._db.execute("SELECT value FROM cache_state WHERE key = 'generation'").fetchone()
+        return row[0] if row else 0
+
+    def _sync_generation(self, now: float) -> None:
+        """Drops the memory tier if another process invalidated the cache."""
+        if now - self._generation_checked < GENERATION_CHECK_INTERVAL:
+            return
+        self._generation_checked = now
+        generation = self._read_generation()
+        if generation != self._generation:
+            self._generation = generation
+            self._lru.clear()
+
+    def _remember(self, v_id: str, entry: dict) -> None:
+        self._lru[v_id] = entry
+        self._lru.move_to_end(v_id)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def _load(self, v_id: str) -> Optional[dict]:
+        row = self._db.execute(
+            "SELECT static, static_at, views, views_at FROM metadata WHERE video_id = ?", (v_id,)
+        ).fetchone()
+        if not row:
+            return None
+        try:
+            views = json.loads(row[2])
+        except (TypeError, ValueError):
+            views = None
+        if not isinstance(views, dict):
+            # Stored before view_count existed (bare views text): treat the view counts as expired
+            return {"static": json.loads(row[0]), "static_at": row[1], "views": {"views": row[2]}, "views_at": 0.0}
+        return {"static": json.loads(row[0]), "static_at": row[1], "views": views, "views_at": row[3]}
+
+    def _fresh(self, entry: dict, fields: Iterable[str], now: float) -> bool:
+        fields = set(fields)
+        if fields & set(STATIC_FIELDS) and now - entry["static_at"] > self.static_ttl:
+            return False
+        if fields & set(VOLATILE_FIELDS) and now - entry["views_at"] > self.views_ttl:
+            return False
+        return True
+
+    # --- PUBLIC API ---
+
+    def get(self, v_id: str, fields: Iterable[str] = STATIC_FIELDS + VOLATILE_FIELDS) -> Optional[dict]:
+        """Returns cached metadata if every requested field is still fresh, else None."""
+        now = time.time()
+        with self._lock:
+            self._sync_generation(now)
+            entry = self._lru.get(v_id)
+            tier = "memory_hits"
+            if entry is None:
+                entry = self._load(v_id)
+                tier = "disk_hits"
+            if entry is None:
+                self.counters["misses"] += 1
+                return None
+            self._remember(v_id, entry)
+            if not self._fresh(entry, fields, now):
+                self.counters["stale"] += 1
+                return None
+            self.counters[tier] += 1
+            return {**entry["static"], **entry["views"]}
+
+    def put(self, v_id: str, data: dict) -> None:
+        now = time.time()
+        entry = {
+            "static": {k: data.get(k) for k in STATIC_FIELDS},
+            "static_at": now,
+            "views": {k: data.get(k) for k in VOLATILE_FIELDS},
+            "views_at": now,
+        }
+        with self._lock:
+            self._remember(v_id, entry)
+            self._db.execute(
+                "INSERT OR REPLACE INTO metadata (video_id, static, static_at, views, views_at) VALUES (?, ?, ?, ?, ?)",
+                (v_id, json.dumps(entry["static"]), now, json.dumps(entry["views"]), now),
+            )
+            self._db.commit()
+
+    def invalidate(self, v_id: Optional[str] = None) -> int:
+        """Drops one video (or everything when v_id is None). Returns rows removed from disk."""
+        with self._lock:
+            if v_id is None:
+                self._lru.clear()
+                cur = self._db.execute("DELETE FROM metadata")
+            else:
+                self._lru.pop(v_id, None)
+                cur = self._db.execute("DELETE FROM metadata WHERE video_id = ?", (v_id,))
+            self._db.execute(
+                "INSERT INTO cache_state VALUES ('generation', 1)"
+                " ON CONFLICT(key) DO UPDATE SET value = value + 1"
+            )
+            self._db.commit()
+            self._generation = self._read_generation()
+            return cur.rowcount
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.counters["memory_hits"] + self.counters["disk_hits"]
+            lookups = hits + self.counters["misses"] + self.counters["stale"]
+            disk_entries = self._db.execute("SELECT COUNT(*) FROM metadata").fetchone()[0]
+            return {
+                **self.counters,
+                "hit_rate": round(hits / lookups, 3) if lookups else None,
+                "memory_entries": len(self._lru),
+                "disk_entries": disk_entries,
+            }
+
+
+metadata_cache = MetadataCache(
+    os.path.join(settings.DATA_DIR, "metadata_cache.sqlite3"),
+    max_entries=settings.CACHE_MAX_ENTRIES,
+    static_ttl=settings.CACHE_STATIC_TTL,
+    views_ttl=settings.CACHE_VIEWS_TTL,
+)
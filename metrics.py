@@ -0,0 +1,233 @@
+"""Minimal Prometheus-style metrics and per-request stage timing.
+
+Stage timings are recorded with `span("stage")`. Each span feeds a
+process-wide histogram (exported on /metrics) and, when called inside an
+API request, that request's Server-Timing header.
+"""
+import bisect
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _fmt_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = ('%s="%s"' % (k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for k, v in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_labels(labels), 0.0)
+
+    def items(self) -> List[Tuple[LabelKey, float]]:
+        with self._lock:
+            return list(self._values.items())
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_fmt_labels(k)} {v}" for k, v in self.items()]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [bucket counts..., +Inf count, sum]
+        self._series: Dict[LabelKey, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = _labels(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            series[idx] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items()}
+        for key, values in series.items():
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_fmt_labels(key, ('le', repr(bound)))} {cumulative}")
+            cumulative += values[len(self.buckets)]
+            lines.append(f"{self.name}_bucket{_fmt_labels(key, ('le', '+Inf'))} {cumulative}")
+            lines.append(f"{self.name}_sum{_fmt_labels(key)} {values[-1]}")
+            lines.append(f"{self.name}_count{_fmt_labels(key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[object] = []
+        # Callables returning (name, type, help, [(labels, value), ...]) at scrape time
+        self._collectors: List[Callable[[], Iterable[tuple]]] = []
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        metric = Counter(name, help_text)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, fn: Callable[[], Iterable[tuple]]) -> None:
+        self._collectors.append(fn)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines += metric.render()
+        for collector in self._collectors:
+            try:
+                for name, kind, help_text, samples in collector():
+                    lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+                    lines += [f"{name}{_fmt_labels(_labels(labels))} {value}" for labels, value in samples]
+            except Exception as e:
+                lines.append(f"# collector error: {e}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+STAGE_SECONDS = registry.histogram("shorts_stage_duration_seconds", "Time spent per pipeline stage.")
+REQUEST_SECONDS = registry.histogram("shorts_http_request_duration_seconds", "API request latency by route.")
+REQUESTS_TOTAL = registry.counter("shorts_http_requests_total", "API requests by route and status code.")
+UPSTREAM_RESPONSES = registry.counter("shorts_upstream_responses_total", "Upstream responses by host and status code.")
+UPSTREAM_ERRORS = registry.counter("shorts_upstream_errors_total", "Upstream requests that failed without a response.")
+UPSTREAM_BYTES = registry.counter("shorts_upstream_bytes_total", "Decoded upstream response body bytes by host.")
+FALLBACK_REGEX = registry.counter("shorts_fallback_regex_total", "Watch-page fields recovered with the regex fallback.")
+UPSTREAM_RETRIES = registry.counter("shorts_upstream_retries_total", "Upstream requests retried after a 429/5xx or network error.")
+BREAKER_REJECTED = registry.counter("shorts_breaker_rejected_total", "Upstream requests refused because the host's circuit was open.")
+
+# --- RECENT ACTIVITY (control panel dashboard) ---
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile: the smallest value with at least pct% of values at or below it."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+class RecentWindow:
+    """Events of the last `window` seconds: rate, p95 latency and error share, for live displays."""
+
+    def __init__(self, window: float = 30.0):
+        self.window = window
+        self._events: deque = deque()  # (finished_at, seconds, error)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float = 0.0, error: bool = False) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._events.append((now, seconds, error))
+            self._trim(now)
+
+    def _trim(self, now: float) -> None:
+        while self._events and self._events[0][0] < now - self.window:
+            self._events.popleft()
+
+    def snapshot(self) -> dict:
+        """Raw window contents, mergeable with other processes' snapshots by merge_windows()."""
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            events = list(self._events)
+        return {
+            "window_s": self.window,
+            # Before a full window has passed, rates cover only the time actually observed
+            "span_s": round(min(self.window, now - events[0][0]), 3) if events else 0.0,
+            "latencies_ms": [round(e[1] * 1000, 1) for e in events],
+            "errors": sum(1 for e in events if e[2]),
+        }
+
+    def summary(self) -> dict:
+        return merge_windows([self.snapshot()])
+
+
+def merge_windows(snapshots: List[dict]) -> dict:
+    """Rate, p95 and error share over several RecentWindow snapshots (one per worker process)."""
+    latencies = [ms for s in snapshots for ms in s["latencies_ms"]]
+    errors = sum(s["errors"] for s in snapshots)
+    return {
+        "window_s": max((s["window_s"] for s in snapshots), default=0.0),
+        "count": len(latencies),
+        "per_s": round(sum(len(s["latencies_ms"]) / max(s["span_s"], 1.0) for s in snapshots), 3),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "error_rate": round(errors / len(latencies), 3) if latencies else None,
+    }
+
+
+# API requests (minus admin/metrics polling) and upstream calls (429/5xx and network errors count as errors)
+RECENT_REQUESTS = RecentWindow()
+RECENT_UPSTREAM = RecentWindow()
+
+# --- PER-REQUEST TIMINGS (Server-Timing) ---
+
+# stage -> [total seconds, count] for the current API request
+_request_timings: ContextVar[Optional[Dict[str, List[float]]]] = ContextVar("request_timings", default=None)
+
+
+def begin_request() -> Dict[str, List[float]]:
+    timings: Dict[str, List[float]] = {}
+    _request_timings.set(timings)
+    return timings
+
+
+def server_timing_header(timings: Dict[str, List[float]], total: float) -> str:
+    parts = [f'{stage.replace(".", "_")};dur={t * 1000:.1f};desc="x{int(n)}"' for stage, (t, n) in timings.items()]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+@contextmanager
+def span(stage: str):
+    """Times a block into the stage histogram and the current request's Server-Timing."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            entry = timings.setdefault(stage, [0.0, 0])
+            entry[0] += elapsed
+            entry[1] += 1
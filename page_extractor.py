@@ -0,0 +1,283 @@
+"""Single-pass extraction of watch-page metadata.
+
+The watch page embeds two JSON blobs, `ytInitialPlayerResponse` and
+`ytInitialData`. Each is located once and decoded with
+JSONDecoder.raw_decode, which stops at the matching closing brace, so
+the blob is never cut short the way a non-greedy `\\{.*?\\};` regex is.
+Regexes are only used as a fallback for fields the JSON doesn't carry.
+"""
+import html as html_lib
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+_decoder = json.JSONDecoder()
+
+_BLOB_MARKERS = {
+    name: re.compile(r'(?:var\s+|window\[["\'])%s(?:["\']\])?\s*=\s*' % name)
+    for name in ("ytInitialPlayerResponse", "ytInitialData")
+}
+
+# Legacy regex cascade, kept as a fallback per field
+FALLBACK_PATTERNS = {
+    "title": [r'<meta name="title" content="(.*?)">', r'<title>(.*?)</title>'],
+    "channel_name": [r'"ownerName":"(.*?)"', r'"author":"(.*?)"', r'itemprop="name" content="(.*?)"'],
+    # Display text ("1.2M views") as the API has always returned it; view_count is the exact number
+    "views": [r'"shortViewCountText":\{"simpleText":"(.*?)"\}', r'"viewCount":"(\d+)"'],
+    "view_count": [r'"viewCount":"(\d+)"'],
+    "publish_date": [r'"publishDate":"(.*?)"', r'itemprop="datePublished" content="(.*?)"'],
+}
+
+
+@dataclass
+class WatchPage:
+    fields: Dict[str, Any] = field(default_factory=dict)
+    player_response: Dict[str, Any] = field(default_factory=dict)
+    initial_data: Dict[str, Any] = field(default_factory=dict)
+    # Fields that had to be recovered with the regex fallback
+    fallbacks: List[str] = field(default_factory=list)
+    # Caption tracks listed in the player response; None if the page had no player response
+    caption_tracks: Optional[List[dict]] = None
+
+
+def find_json_blob(html: str, name: str) -> Optional[dict]:
+    """Returns the JSON object assigned to `name` in the page, or None."""
+    for m in _BLOB_MARKERS[name].finditer(html):
+        start = m.end()
+        if html.startswith("{", start):
+            try:
+                obj, _ = _decoder.raw_decode(html, start)
+                return obj
+            except ValueError:
+                continue
+    return None
+
+
+def _text(node: Any) -> Optional[str]:
+    """Flattens YouTube's {"simpleText"} / {"runs": [...]} / {"content"} text nodes."""
+    if not isinstance(node, dict):
+        return node if isinstance(node, str) else None
+    if "simpleText" in node:
+        return node["simpleText"]
+    if "runs" in node:
+        return "".join(r.get("text", "") for r in node["runs"])
+    return node.get("content")
+
+
+def _find_text(node: Any, key: str) -> Optional[str]:
+    """Text of the first `key` text node anywhere under `node` (depth-first)."""
+    if isinstance(node, dict):
+        if key in node:
+            return _text(node[key])
+        children = node.values()
+    elif isinstance(node, list):
+        children = node
+    else:
+        return None
+    for child in children:
+        found = _find_text(child, key)
+        if found:
+            return found
+    return None
+
+
+def _panel_description(initial_data: dict) -> Optional[str]:
+    for panel in initial_data.get("engagementPanels", []):
+        rend = panel.get("engagementPanelRenderer", {})
+        if rend.get("targetId") != "engagement-panel-structured-description":
+            continue
+        items = rend.get("content", {}).get("structuredDescriptionContentRenderer", {}).get("items", [])
+        for item in items:
+            if "videoDescriptionHeaderRenderer" in item:
+                return _text(item["videoDescriptionHeaderRenderer"].get("description"))
+            if "expandableVideoDescriptionBodyRenderer" in item:
+                return _text(item["expandableVideoDescriptionBodyRenderer"].get("attributedDescriptionBodyText"))
+    return None
+
+
+def regex_fallback(html: str, name: str) -> Optional[str]:
+    for pattern in FALLBACK_PATTERNS[name]:
+        m = re.search(pattern, html)
+        if m:
+            value = html_lib.unescape(m.group(1))
+            return value.replace(" - YouTube", "").strip() if name == "title" else value
+    return None
+
+
+def extract_watch_page(html: str) -> WatchPage:
+    """Extracts title, channel, views, view count, publish date, description and duration from a watch page."""
+    page = WatchPage(
+        player_response=find_json_blob(html, "ytInitialPlayerResponse") or {},
+        initial_data=find_json_blob(html, "ytInitialData") or {},
+    )
+    details = page.player_response.get("videoDetails", {})
+    micro = page.player_response.get("microformat", {}).get("playerMicroformatRenderer", {})
+
+    length = details.get("lengthSeconds") or micro.get("lengthSeconds")
+    view_count = details.get("viewCount") or micro.get("viewCount")
+    candidates = {
+        "title": details.get("title") or _text(micro.get("title")),
+        "channel_name": details.get("author") or micro.get("ownerChannelName"),
+        "views": _find_text(page.initial_data, "shortViewCountText") or view_count,
+        "view_count": int(view_count) if str(view_count).isdigit() else None,
+        "publish_date": micro.get("publishDate") or micro.get("uploadDate"),
+        "full_description": details.get("shortDescription") or _text(micro.get("description")) or _panel_description(page.initial_data),
+        "duration": int(length) if str(length).isdigit() else None,
+    }
+    page.fields = {k: v for k, v in candidates.items() if v not in (None, "")}
+    # Only a playable page's track list is complete
+    if details and page.player_response.get("playabilityStatus", {}).get("status", "OK") == "OK":
+        page.caption_tracks = caption_tracks(page.player_response)
+
+    for name in FALLBACK_PATTERNS:
+        if name not in page.fields:
+            value = regex_fallback(html, name)
+            if value:
+                page.fields[name] = int(value) if name == "view_count" else value
+                page.fallbacks.append(name)
+    return page
+
+
+# --- CAPTIONS ---
+
+def caption_tracks(player_response: dict) -> List[dict]:
+    """[{"url", "language", "auto"}] for every caption track the player offers."""
+    renderer = player_response.get("captions", {}).get("playerCaptionsTracklistRenderer", {})
+    tracks = []
+    for track in renderer.get("captionTracks", []):
+        if track.get("baseUrl") and track.get("languageCode"):
+            tracks.append({
+                "url": track["baseUrl"],
+                "language": track["languageCode"],
+                "auto": track.get("kind") == "asr",
+            })
+    return tracks
+
+
+def choose_caption_track(tracks: List[dict], languages: Sequence[str]) -> Optional[dict]:
+    """First track in `languages` order, preferring manual captions over auto-generated ones."""
+    for lang in languages:
+        matches = [t for t in tracks if t["language"] == lang]
+        if matches:
+            return min(matches, key=lambda t: t["auto"])
+    return None
+
+
+def parse_json3(data: dict) -> List[dict]:
+    """Timed segments [{"start", "duration", "text"}] (seconds) from a `fmt=json3` caption file."""
+    segments = []
+    for event in data.get("events", []):
+        text = "".join(seg.get("utf8", "") for seg in event.get("segs", [])).replace("\n", " ").strip()
+        if text:
+            segments.append({
+                "start": event.get("tStartMs", 0) / 1000,
+                "duration": event.get("dDurationMs", 0) / 1000,
+                "text": text,
+            })
+    return segments
+
+
+# --- LISTING PAGES (search results / hashtag feeds) ---
+
+@dataclass
+class ListingPage:
+    items: List[dict] = field(default_factory=list)
+    # Token for the next page, None when the feed is exhausted
+    continuation: Optional[str] = None
+
+
+def _listing_item(key: str, node: dict) -> Optional[dict]:
+    if key in ("videoRenderer", "reelItemRenderer", "gridVideoRenderer", "compactVideoRenderer"):
+        v_id = node.get("videoId")
+        title = _text(node.get("title")) or _text(node.get("headline"))
+    elif key == "shortsLockupViewModel":
+        v_id = node.get("onTap", {}).get("innertubeCommand", {}).get("reelWatchEndpoint", {}).get("videoId")
+        title = _text(node.get("overlayMetadata", {}).get("primaryText"))
+    else:
+        return None
+    if not v_id:
+        return None
+    item = {"video_id": v_id}
+    if title:
+        item["title"] = title
+    return item
+
+
+def _continuation_token(node: Any) -> Optional[str]:
+    if isinstance(node, dict):
+        if "continuationCommand" in node:
+            return node["continuationCommand"].get("token")
+        for value in node.values():
+            token = _continuation_token(value)
+            if token:
+                return token
+    elif isinstance(node, list):
+        for value in node:
+            token = _continuation_token(value)
+            if token:
+                return token
+    return None
+
+
+def _walk_listing(node: Any, page: ListingPage) -> None:
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key == "continuationItemRenderer":
+                page.continuation = _continuation_token(value) or page.continuation
+                continue
+            item = _listing_item(key, value) if isinstance(value, dict) else None
+            if item:
+                page.items.append(item)
+            else:
+                _walk_listing(value, page)
+    elif isinstance(node, list):
+        for value in node:
+            _walk_listing(value, page)
+
+
+def _dedupe(page: ListingPage) -> ListingPage:
+    seen = set()
+    page.items = [it for it in page.items if not (it["video_id"] in seen or seen.add(it["video_id"]))]
+    return page
+
+
+def parse_listing(data: dict) -> ListingPage:
+    """Parses ytInitialData or an innertube search/browse continuation response."""
+    page = ListingPage()
+    _walk_listing(data, page)
+    return _dedupe(page)
+
+
+def extract_listing(html: str) -> ListingPage:
+    """Returns the listing items ({"video_id", "title"?}) in page order, plus the continuation token."""
+    data = find_json_blob(html, "ytInitialData")
+    page = parse_listing(data) if data else ListingPage()
+    if not page.items:
+        # Layout we don't know: fall back to bare IDs
+        page.items = [{"video_id": v} for v in re.findall(r'"videoId":"([^"]{11})"', html)]
+        _dedupe(page)
+    return page
+
+
+def extract_innertube_config(html: str) -> dict:
+    """Pulls the API key and web client version the page was rendered with (needed for continuations)."""
+    config = {}
+    key_m = re.search(r'"INNERTUBE_API_KEY":"([^"]+)"', html)
+    ver_m = re.search(r'"INNERTUBE_CLIENT_VERSION":"([^"]+)"', html) or re.search(r'"INNERTUBE_CONTEXT_CLIENT_VERSION":"([^"]+)"', html)
+    if key_m:
+        config["api_key"] = key_m.group(1)
+    if ver_m:
+        config["client_version"] = ver_m.group(1)
+    return config
+
+
+# --- VIDEO IDS ---
+
+VIDEO_ID_RE = re.compile(r'(?:v=|shorts/|youtu\.be/|^)([A-Za-z0-9_-]{11})(?:[?&#/]|$)')
+
+
+def normalize_video_id(raw: str) -> Optional[str]:
+    """Accepts a bare video ID or any watch/shorts/youtu.be URL."""
+    m = VIDEO_ID_RE.search(raw.strip())
+    return m.group(1) if m else None
@@ -0,0 +1,216 @@
+"""Retries, per-host circuit breaking and request deadlines for upstream calls.
+
+Every upstream request (ours and youtube_transcript_api's, which shares
+our session) goes through `upstream_guard.call`:
+
+- 429 and 5xx responses and network errors are retried with jittered
+  exponential backoff, honouring Retry-After.
+- Consecutive failures open the host's circuit: further requests fail
+  fast with CircuitOpenError until a single probe succeeds again.
+- A deadline set for the current API request (a contextvar, so it follows
+  work into the enrichment pool) caps timeouts, backoff sleeps and
+  rate-limit waits, and requests that can't start before it passes fail
+  with DeadlineExceeded.
+"""
+import contextvars
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Tuple, Type
+from urllib.parse import urlparse
+
+import settings
+from metrics import BREAKER_REJECTED, UPSTREAM_RETRIES
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class DeadlineExceeded(Exception):
+    """The current request's deadline passed before the upstream call could be made."""
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(f"Circuit open for {host}, retry in {retry_in:.0f}s")
+        self.host = host
+        self.retry_in = retry_in
+
+
+def failure_reason(exc: BaseException) -> str:
+    """Short label for why an upstream fetch didn't happen (used in partial markers)."""
+    if isinstance(exc, DeadlineExceeded):
+        return "deadline"
+    if isinstance(exc, CircuitOpenError):
+        return "circuit_open"
+    return "upstream_error"
+
+
+# --- DEADLINES ---
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("deadline", default=None)
+
+
+def set_deadline(seconds: Optional[float]) -> None:
+    """Sets the deadline for the rest of the current context (no-op for None/0)."""
+    if seconds:
+        _deadline.set(time.monotonic() + seconds)
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]):
+    """Sets the deadline (None/0 = none) for the duration of the block."""
+    token = _deadline.set(time.monotonic() + seconds if seconds else None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline, or None if there is none."""
+    expires = _deadline.get()
+    return None if expires is None else expires - time.monotonic()
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+# --- CIRCUIT BREAKER ---
+
+class _HostState:
+    __slots__ = ("failures", "opened_at", "probing")
+
+    def __init__(self):
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+
+
+class CircuitBreaker:
+    """Per-host breaker: opens after `failure_threshold` consecutive failures, half-opens after `reset_timeout`."""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._hosts: Dict[str, _HostState] = {}
+        self._lock = threading.Lock()
+
+    def before(self, host: str) -> None:
+        """Raises CircuitOpenError unless a request to `host` may go out now."""
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None or state.opened_at is None:
+                return
+            retry_in = state.opened_at + self.reset_timeout - time.monotonic()
+            if retry_in <= 0 and not state.probing:
+                # Half-open: let exactly one request through to test the water
+                state.probing = True
+                return
+        BREAKER_REJECTED.inc(host=host)
+        raise CircuitOpenError(host, max(retry_in, 0.0))
+
+    def success(self, host: str) -> None:
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is not None:
+                state.failures, state.opened_at, state.probing = 0, None, False
+
+    def abandon(self, host: str) -> None:
+        """A probe ended without a verdict (e.g. an unexpected error): allow another one."""
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is not None:
+                state.probing = False
+
+    def failure(self, host: str) -> None:
+        with self._lock:
+            state = self._hosts.setdefault(host, _HostState())
+            state.failures += 1
+            if state.probing or state.failures >= self.failure_threshold:
+                if state.opened_at is None or state.probing:
+                    print(f"BREAKER: Opening circuit for {host} after {state.failures} failure(s)")
+                state.opened_at = time.monotonic()
+                state.probing = False
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                host: {
+                    "state": "closed" if s.opened_at is None else
+                             "half_open" if s.probing or now - s.opened_at >= self.reset_timeout else "open",
+                    "failures": s.failures,
+                }
+                for host, s in self._hosts.items()
+            }
+
+
+# --- RETRIES ---
+
+def _retry_after(res) -> float:
+    try:
+        return float(res.headers.get("Retry-After", 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class UpstreamGuard:
+    def __init__(self, breaker: CircuitBreaker, attempts: int, base_delay: float, max_delay: float):
+        self.breaker = breaker
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff(self, attempt: int) -> float:
+        """Full jitter: uniform in [0, min(max_delay, base * 2^attempt)]."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def call(self, url: str, send: Callable[[Optional[float]], object], network_errors: Tuple[Type[BaseException], ...]):
+        """Runs `send(time_left)` with retries. Returns the last response, even a failed one."""
+        host = urlparse(url).hostname or "unknown"
+        for attempt in range(self.attempts):
+            left = remaining()
+            if left is not None and left <= 0:
+                raise DeadlineExceeded(f"Deadline passed before requesting {host}")
+            self.breaker.before(host)
+            last = attempt == self.attempts - 1
+            try:
+                res = send(left)
+            except network_errors:
+                if expired():
+                    # Timed out because we capped the timeout at our own deadline: not the host's fault
+                    self.breaker.abandon(host)
+                    raise DeadlineExceeded(f"Deadline passed while waiting for {host}")
+                self.breaker.failure(host)
+                if last:
+                    raise
+                delay = self.backoff(attempt)
+            except BaseException:
+                self.breaker.abandon(host)
+                raise
+            else:
+                if res.status_code not in RETRY_STATUSES:
+                    self.breaker.success(host)
+                    return res
+                self.breaker.failure(host)
+                if last:
+                    return res
+                wait = _retry_after(res)
+                if wait > self.max_delay:
+                    # Told to come back much later: don't hold the caller that long
+                    return res
+                delay = max(self.backoff(attempt), wait)
+                res.close()
+
+            left = remaining()
+            if left is not None and delay >= left:
+                raise DeadlineExceeded(f"No time left to retry {host}")
+            UPSTREAM_RETRIES.inc(host=host)
+            time.sleep(delay)
+
+
+breaker = CircuitBreaker(settings.BREAKER_FAILURES, settings.BREAKER_RESET)
+upstream_guard = UpstreamGuard(breaker, settings.RETRY_ATTEMPTS, settings.RETRY_BASE_DELAY, settings.RETRY_MAX_DELAY)
@@ -0,0 +1,100 @@
+"""In-process response cache with stale-while-revalidate for the /ysp endpoints.
+
+Entries are keyed by endpoint and normalized parameters. Within its TTL an
+entry is served as-is. Past the TTL, but within the stale window, it is still
+served immediately while a single background refresh replaces it. Only
+entries older than TTL + stale window block on upstream.
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Tuple
+
+import settings
+
+HIT, STALE, MISS = "HIT", "STALE", "MISS"
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a search query."""
+    return " ".join(query.split()).casefold()
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int, stale_ttl: float, refresh_workers: int = 2):
+        self.max_entries = max_entries
+        self.stale_ttl = stale_ttl
+        self._lru = OrderedDict()  # key -> (stored_at, value)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix="swr")
+        self.counters = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "refresh_errors": 0, "evictions": 0}
+
+    def _store(self, key: Tuple, value) -> None:
+        with self._lock:
+            self._lru[key] = (time.time(), value)
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def _refresh(self, key: Tuple, fn: Callable) -> None:
+        try:
+            self._store(key, fn())
+            with self._lock:
+                self.counters["refreshes"] += 1
+        except Exception as e:
+            # Keep serving the stale copy; the next request past TTL retries
+            print(f"CACHE: Refresh failed for {key[0]}: {e}")
+            with self._lock:
+                self.counters["refresh_errors"] += 1
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def get_or_fetch(self, key: Tuple, ttl: float, fn: Callable):
+        """Returns (value, HIT|STALE|MISS). fn() is called inline only on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None:
+                age = now - entry[0]
+                if age <= ttl:
+                    self._lru.move_to_end(key)
+                    self.counters["hits"] += 1
+                    return entry[1], HIT
+                if age <= ttl + self.stale_ttl:
+                    self._lru.move_to_end(key)
+                    self.counters["stale_hits"] += 1
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        self._pool.submit(self._refresh, key, fn)
+                    return entry[1], STALE
+            self.counters["misses"] += 1
+
+        value = fn()
+        self._store(key, value)
+        return value, MISS
+
+    def invalidate(self, endpoint: Optional[str] = None) -> int:
+        """Drops every entry (or only one endpoint's). Returns the number removed."""
+        with self._lock:
+            keys = [k for k in self._lru if endpoint is None or k[0] == endpoint]
+            for k in keys:
+                del self._lru[k]
+            return len(keys)
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.counters["hits"] + self.counters["stale_hits"]
+            lookups = hits + self.counters["misses"]
+            return {
+                **self.counters,
+                "hit_rate": round(hits / lookups, 3) if lookups else None,
+                "entries": len(self._lru),
+                "refreshing": len(self._refreshing),
+            }
+
+
+ysp_cache = ResponseCache(settings.YSP_CACHE_MAX_ENTRIES, stale_ttl=settings.YSP_CACHE_STALE_TTL)
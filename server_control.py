@@ -0,0 +1,183 @@
+"""Multi-process serve mode: a supervisor that runs N uvicorn workers on one socket.
+
+The supervisor binds the listening socket once and hands it to each worker
+process, like `uvicorn --workers` does, but workers can be added or
+removed while serving and each one is stopped gracefully (in-flight
+requests finish) through its own stop event. That works the same on
+Windows, where terminate() is not graceful.
+
+Workers share state through the SQLite files in DATA_DIR: metadata
+cache, transcript store, jobs, the dashboard's activity snapshots and
+(RATE_LIMIT_SHARED) the upstream rate-limit buckets.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from typing import List, Optional
+
+import uvicorn
+
+import settings
+
+APP = "short_api:app"
+
+
+def _serve_worker(config: uvicorn.Config, sock, stop_event) -> None:
+    """Worker process entry point: serve on the inherited socket until stop_event is set."""
+    server = uvicorn.Server(config)
+
+    def watch_stop():
+        stop_event.wait()
+        server.should_exit = True
+
+    threading.Thread(target=watch_stop, daemon=True).start()
+    server.run(sockets=[sock])
+
+
+class _Worker:
+    __slots__ = ("process", "stop_event")
+
+    def __init__(self, process, stop_event):
+        self.process = process
+        self.stop_event = stop_event
+
+
+class ServerSupervisor:
+    def __init__(self, host: str = "0.0.0.0", port: int = 7861, workers: int = settings.SERVE_WORKERS,
+                 log_level: str = "error"):
+        self.host = host
+        self.port = port
+        self.target_workers = max(1, workers)
+        self.log_level = log_level
+        self._ctx = multiprocessing.get_context("spawn")
+        self._config: Optional[uvicorn.Config] = None
+        self._sock = None
+        self._workers: List[_Worker] = []
+        self._lock = threading.Lock()
+        self._monitor_stop = threading.Event()
+
+    # --- INTERNAL HELPERS ---
+
+    def _spawn(self) -> _Worker:
+        stop_event = self._ctx.Event()
+        process = self._ctx.Process(target=_serve_worker, args=(self._config, self._sock, stop_event), daemon=False)
+        process.start()
+        return _Worker(process, stop_event)
+
+    def _retire(self, workers: List[_Worker], timeout: float) -> None:
+        for w in workers:
+            w.stop_event.set()
+        deadline = time.time() + timeout
+        for w in workers:
+            w.process.join(max(0.0, deadline - time.time()))
+            if w.process.is_alive():
+                print(f"SERVE: Worker {w.process.pid} did not stop in time, terminating")
+                w.process.terminate()
+                w.process.join(5)
+
+    def _monitor(self) -> None:
+        """Replaces workers that died unexpectedly."""
+        while not self._monitor_stop.wait(2.0):
+            with self._lock:
+                for i, w in enumerate(self._workers):
+                    if not w.process.is_alive() and not w.stop_event.is_set():
+                        print(f"SERVE: Worker {w.process.pid} exited ({w.process.exitcode}), restarting")
+                        self._workers[i] = self._spawn()
+
+    # --- PUBLIC API ---
+
+    @property
+    def is_running(self) -> bool:
+        return self._sock is not None
+
+    def start(self) -> None:
+        with self._lock:
+            if self._sock is not None:
+                return
+            # Workers inherit the environment: share the rate-limit budget, and let
+            # only the supervisor re-queue jobs interrupted by the previous run.
+            os.environ["RATE_LIMIT_SHARED"] = "1"
+            os.environ["JOBS_RESUME_ON_START"] = "0"
+            from jobs import job_store
+            job_store.requeue_interrupted()
+
+            self._config = uvicorn.Config(APP, host=self.host, port=self.port, log_level=self.log_level,
+                                          use_colors=False, proxy_headers=True, forwarded_allow_ips="*",
+                                          timeout_graceful_shutdown=settings.SERVE_GRACEFUL_TIMEOUT)
+            try:
+                self._sock = self._config.bind_socket()
+            except SystemExit:
+                # uvicorn exits the process when the port is taken; we only want an error
+                raise OSError(f"Could not bind {self.host}:{self.port} (port in use?)")
+            self._workers = [self._spawn() for _ in range(self.target_workers)]
+            self._monitor_stop.clear()
+        threading.Thread(target=self._monitor, name="serve-monitor", daemon=True).start()
+        print(f"SERVE: {self.target_workers} worker(s) listening on {self.host}:{self.port}")
+
+    def resize(self, workers: int) -> None:
+        """Adds or gracefully retires workers while serving."""
+        workers = max(1, workers)
+        with self._lock:
+            self.target_workers = workers
+            if self._sock is None:
+                return
+            retired = []
+            while len(self._workers) > workers:
+                retired.append(self._workers.pop())
+            while len(self._workers) < workers:
+                self._workers.append(self._spawn())
+        self._retire(retired, settings.SERVE_GRACEFUL_TIMEOUT + 5)
+        print(f"SERVE: Resized to {workers} worker(s)")
+
+    def stop(self) -> None:
+        """Stops every worker (letting in-flight requests finish) and releases the port."""
+        with self._lock:
+            if self._sock is None:
+                return
+            self._monitor_stop.set()
+            workers, self._workers = self._workers, []
+        self._retire(workers, settings.SERVE_GRACEFUL_TIMEOUT + 5)
+        with self._lock:
+            self._sock.close()
+            self._sock = None
+        print("SERVE: Stopped")
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "running": self._sock is not None,
+                "workers": self.target_workers,
+                "alive": sum(1 for w in self._workers if w.process.is_alive()),
+                "pids": [w.process.pid for w in self._workers],
+            }
+
+    def wait(self) -> None:
+        """Blocks until interrupted (Ctrl+C), then stops cleanly."""
+        try:
+            while self.is_running:
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve the Shorts API with several worker processes.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 7861)))
+    parser.add_argument("--workers", type=int, default=settings.SERVE_WORKERS)
+    parser.add_argument("--log-level", default="warning")
+    args = parser.parse_args()
+
+    supervisor = ServerSupervisor(args.host, args.port, args.workers, log_level=args.log_level)
+    supervisor.start()
+    supervisor.wait()
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    main()
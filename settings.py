@@ -0,0 +1,145 @@
+"""Runtime settings for the Shorts API, read once from the environment."""
+import os
+import sys
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+# --- UPSTREAM ---
+# Origin scraped for search, hashtag and watch pages. Only changed for offline benchmarks.
+YOUTUBE_BASE_URL = os.environ.get("YOUTUBE_BASE_URL", "https://www.youtube.com").rstrip("/")
+
+# --- ENRICHMENT ---
+# Number of videos enriched in parallel by extract_videos.
+ENRICH_WORKERS = max(1, _env_int("ENRICH_WORKERS", 4))
+# Separate pool for jobs and watches, so background harvests don't delay live requests.
+BACKGROUND_WORKERS = max(1, _env_int("BACKGROUND_WORKERS", 2))
+
+# --- UPSTREAM PACING ---
+# Per-host token bucket: sustained requests/second and burst size.
+RATE_LIMIT_RATE = max(0.1, _env_float("RATE_LIMIT_RATE", 8.0))
+RATE_LIMIT_BURST = max(1, _env_int("RATE_LIMIT_BURST", 16))
+# Keep the buckets in SQLite so all worker processes share one budget (set by serve mode).
+RATE_LIMIT_SHARED = os.environ.get("RATE_LIMIT_SHARED", "0").lower() in ("1", "true", "yes")
+
+# --- HTTP CLIENT ---
+# Keep-alive connections kept per upstream host.
+HTTP_POOL_SIZE = max(1, _env_int("HTTP_POOL_SIZE", 16))
+HTTP_CONNECT_TIMEOUT = _env_float("HTTP_CONNECT_TIMEOUT", 5.0)
+HTTP_READ_TIMEOUT = _env_float("HTTP_READ_TIMEOUT", 12.0)
+# HTTP/2 needs the optional 'httpx[http2]' package.
+HTTP2 = os.environ.get("HTTP2", "0").lower() in ("1", "true", "yes")
+
+# --- LOCAL STORAGE ---
+# SQLite stores live here; next to the EXE when frozen so they survive restarts.
+_APP_DIR = os.path.dirname(sys.executable) if getattr(sys, "frozen", False) else os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.environ.get("DATA_DIR", os.path.join(_APP_DIR, "data"))
+
+# --- METADATA CACHE ---
+CACHE_MAX_ENTRIES = max(1, _env_int("CACHE_MAX_ENTRIES", 2000))
+# Title, channel, publish date, thumbnail and description rarely change.
+CACHE_STATIC_TTL = _env_float("CACHE_STATIC_TTL", 7 * 24 * 3600)
+# View counts go stale quickly.
+CACHE_VIEWS_TTL = _env_float("CACHE_VIEWS_TTL", 15 * 60)
+
+# --- TRANSCRIPT STORE ---
+# Found transcripts are kept forever; "no transcript" answers expire after this many seconds.
+TRANSCRIPT_NEGATIVE_TTL = _env_float("TRANSCRIPT_NEGATIVE_TTL", 6 * 3600)
+# Default caption language preference (comma-separated), overridable per request with `lang=`.
+TRANSCRIPT_LANGUAGES = tuple(l.strip() for l in os.environ.get("TRANSCRIPT_LANGUAGES", "ar,en").split(",") if l.strip()) or ("ar", "en")
+
+# --- LOCAL INDEX ---
+# Add every enriched video to the local full-text index behind /local/search.
+LOCAL_INDEX = os.environ.get("LOCAL_INDEX", "1").lower() in ("1", "true", "yes")
+
+# --- THUMBNAILS ---
+# Disk space for cached thumbnails (originals and resized copies), in MB; least recently served go first.
+THUMBNAIL_CACHE_MB = max(1, _env_int("THUMBNAIL_CACHE_MB", 200))
+THUMBNAIL_MAX_WIDTH = max(16, _env_int("THUMBNAIL_MAX_WIDTH", 1280))
+# Thumbnail origin (the benchmark points it at the local stand-in).
+THUMBNAIL_BASE_URL = os.environ.get("THUMBNAIL_BASE_URL", "https://i.ytimg.com/vi").rstrip("/")
+
+# --- PAGING ---
+# Upper bound on result pages (first page + continuations) read per call.
+MAX_SCAN_PAGES = max(1, _env_int("MAX_SCAN_PAGES", 20))
+
+# --- BATCH ---
+BATCH_MAX_IDS = max(1, _env_int("BATCH_MAX_IDS", 500))
+
+# --- JOBS ---
+# Harvest jobs run concurrently; they share the BACKGROUND_WORKERS pool, a few videos in flight each.
+JOB_WORKERS = max(1, _env_int("JOB_WORKERS", 2))
+JOB_MAX_LIMIT = max(1, _env_int("JOB_MAX_LIMIT", 2000))
+JOB_MAX_SCAN_PAGES = max(1, _env_int("JOB_MAX_SCAN_PAGES", 200))
+# Seconds between checks for jobs queued by other worker processes (0 disables).
+JOB_POLL_INTERVAL = _env_float("JOB_POLL_INTERVAL", 5.0)
+# Re-queue "running" jobs at startup. Serve mode turns this off in workers: the supervisor does it once.
+JOBS_RESUME_ON_START = os.environ.get("JOBS_RESUME_ON_START", "1").lower() in ("1", "true", "yes")
+
+# --- WATCHES ---
+# Seconds between scheduler checks for due watches, and the watch runs allowed at once.
+WATCH_TICK = max(0.5, _env_float("WATCH_TICK", 5.0))
+WATCH_WORKERS = max(1, _env_int("WATCH_WORKERS", 1))
+# Poll interval bounds for a watch (seconds) and the newest results it looks at per run.
+WATCH_DEFAULT_INTERVAL = max(1.0, _env_float("WATCH_DEFAULT_INTERVAL", 300.0))
+WATCH_MIN_INTERVAL = max(1.0, _env_float("WATCH_MIN_INTERVAL", 60.0))
+WATCH_MAX_LIMIT = max(1, _env_int("WATCH_MAX_LIMIT", 200))
+# Enriched videos are kept this many seconds for /watches/{id}/new; their IDs stay in the seen index.
+WATCH_RETENTION = max(60.0, _env_float("WATCH_RETENTION", 7 * 24 * 3600))
+
+# --- /ysp RESPONSE CACHE ---
+# Seconds a cached /ysp result is served as fresh, per endpoint family.
+YSP_CACHE_MAX_ENTRIES = max(1, _env_int("YSP_CACHE_MAX_ENTRIES", 1000))
+YSP_SEARCH_TTL = _env_float("YSP_SEARCH_TTL", 5 * 60)
+YSP_SUGGESTIONS_TTL = _env_float("YSP_SUGGESTIONS_TTL", 60 * 60)
+YSP_HASHTAG_TTL = _env_float("YSP_HASHTAG_TTL", 10 * 60)
+# After the TTL, stale results are still served (and refreshed in the background) for this long.
+YSP_CACHE_STALE_TTL = _env_float("YSP_CACHE_STALE_TTL", 24 * 3600)
+
+# --- COMMENTS ---
+# /ysp/comments reads at most this many comments / continuation pages per call.
+COMMENTS_MAX_LIMIT = max(1, _env_int("COMMENTS_MAX_LIMIT", 1000))
+MAX_COMMENT_PAGES = max(1, _env_int("MAX_COMMENT_PAGES", 50))
+
+# --- STREAM URLS ---
+# Signed stream URLs are cached until their expire= timestamp minus this margin (seconds).
+STREAM_URL_EXPIRY_MARGIN = _env_float("STREAM_URL_EXPIRY_MARGIN", 5 * 60)
+# Used when a URL carries no expire= parameter.
+STREAM_URL_DEFAULT_TTL = _env_float("STREAM_URL_DEFAULT_TTL", 60 * 60)
+STREAM_URL_MAX_ENTRIES = max(1, _env_int("STREAM_URL_MAX_ENTRIES", 500))
+
+# --- SERVE MODE ---
+# Worker processes started by `server_control.py --workers N` and the control panel.
+SERVE_WORKERS = max(1, _env_int("WORKERS", 1))
+# Seconds a stopping worker waits for in-flight requests.
+SERVE_GRACEFUL_TIMEOUT = max(1, _env_int("SERVE_GRACEFUL_TIMEOUT", 10))
+# Seconds between the activity snapshots each worker shares for /admin/stats.
+STATS_PUBLISH_INTERVAL = max(0.2, _env_float("STATS_PUBLISH_INTERVAL", 1.0))
+
+# --- RESPONSE ENCODING ---
+# Bodies smaller than this (bytes) are sent uncompressed even if the client accepts br/gzip.
+COMPRESS_MIN_SIZE = max(0, _env_int("COMPRESS_MIN_SIZE", 1024))
+
+# --- RESILIENCE ---
+# Attempts per upstream request (1 = no retries) on 429/5xx and network errors.
+RETRY_ATTEMPTS = max(1, _env_int("RETRY_ATTEMPTS", 3))
+# Exponential backoff (full jitter): base and cap in seconds. A Retry-After header wins if longer.
+RETRY_BASE_DELAY = max(0.0, _env_float("RETRY_BASE_DELAY", 0.5))
+RETRY_MAX_DELAY = max(0.0, _env_float("RETRY_MAX_DELAY", 8.0))
+# Consecutive failures that open a host's circuit, and seconds it stays open before a probe.
+BREAKER_FAILURES = max(1, _env_int("BREAKER_FAILURES", 5))
+BREAKER_RESET = max(1.0, _env_float("BREAKER_RESET", 30.0))
+# Seconds a /fetch, /search or /videos/batch call may spend upstream (0 = no deadline).
+REQUEST_DEADLINE = max(0.0, _env_float("REQUEST_DEADLINE", 45.0))
@@ -1,297 +1,950 @@
-import requests
 import re
-import json
 import os
 import time
-import traceback
-from typing import List, Optional
-from fastapi import FastAPI, Query
+from contextlib import asynccontextmanager
+from concurrent.futures import FIRST_COMPLETED, wait
+from itertools import islice
+from dataclasses import dataclass
+from functools import partial
+from urllib.parse import quote, quote_plus
+from typing import FrozenSet, Iterable, Iterator, List, Literal, Optional, Sequence, Tuple
+from fastapi import FastAPI, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel
 import uvicorn
-from youtube_transcript_api import YouTubeTranscriptApi
 
-app = FastAPI(title="YouTube Shorts Smart Fetcher", version="2.6.3")
+import settings
+from concurrency import ContextThreadPoolExecutor, SingleFlight
+from http_client import client
+from resilience import CircuitOpenError, DeadlineExceeded, breaker, deadline_scope, expired, failure_reason, set_deadline
+from encoding import CompressionMiddleware, NegotiatedResponse
+from metrics import (FALLBACK_REGEX, RECENT_REQUESTS, RECENT_UPSTREAM, REQUEST_SECONDS, REQUESTS_TOTAL, begin_request,
+                     merge_windows, registry, server_timing_header, span)
+from jobs import JobCancelled, JobRunner, JobStore, job_store
+from watches import WatchScheduler, WatchStore, watch_store
+from local_index import local_index
+from thumbnails import ThumbnailNotFound, thumbnail_cache
+from worker_stats import worker_stats
+from metadata_cache import metadata_cache
+from stream_urls import stream_resolver
+from response_cache import ysp_cache
+from streaming import StreamFormat, decode_cursor, encode_cursor, encode_event, event_stream
+from ysp_router import router as ysp_router
+from page_extractor import (ListingPage, choose_caption_track, extract_innertube_config, extract_listing, extract_watch_page,
+                            normalize_video_id, parse_json3, parse_listing)
+from transcript_store import transcript_store, STATUS_OK
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Resume harvest jobs interrupted by the last shutdown
+    job_runner.start()
+    watch_scheduler.start()
+    worker_stats.start(activity_snapshot)
+    yield
+    worker_stats.shutdown()
+    watch_scheduler.shutdown()
+    job_runner.shutdown()
+
+app = FastAPI(title="YouTube Shorts Smart Fetcher", version="2.6.3", lifespan=lifespan,
+              default_response_class=NegotiatedResponse)
+
+@app.middleware("http")
+async def timing_middleware(request: Request, call_next):
+    """Per-request stage timings -> Server-Timing header, plus request metrics."""
+    timings = begin_request()
+    started = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - started
+    route = request.scope.get("route")
+    path = getattr(route, "path", "unmatched")
+    REQUEST_SECONDS.observe(elapsed, route=path)
+    REQUESTS_TOTAL.inc(route=path, status=response.status_code)
+    if not path.startswith(("/admin", "/metrics")):
+        # The dashboard polls /admin/stats; keep that out of the traffic it displays
+        RECENT_REQUESTS.record(elapsed, error=response.status_code >= 500)
+    response.headers["Server-Timing"] = server_timing_header(timings, elapsed)
+    return response
+
+# Outermost: negotiates the body format and compresses whatever the app returns
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESS_MIN_SIZE)
+
+# Built on first use (importing youtube_transcript_api is deferred until a transcript is needed)
+_transcript_api = None
+
+def get_transcript_api():
+    """The shared YouTubeTranscriptApi, bound to our pooled, rate-limited session."""
+    global _transcript_api
+    if _transcript_api is None:
+        from youtube_transcript_api import YouTubeTranscriptApi
+        _transcript_api = YouTubeTranscriptApi(http_client=client.session)
+    return _transcript_api
+
+# Upstream origin for scraping (overridable so benchmarks can point at a local stand-in)
+YOUTUBE = settings.YOUTUBE_BASE_URL
+
+# Bounded pool used to enrich search results in parallel
+enrich_pool = ContextThreadPoolExecutor(max_workers=settings.ENRICH_WORKERS, thread_name_prefix="enrich")
+# Jobs and watches enrich here, so background harvests never queue ahead of live requests
+background_pool = ContextThreadPoolExecutor(max_workers=settings.BACKGROUND_WORKERS, thread_name_prefix="background")
+
+# Coalesces concurrent enrichment of the same video across API requests
+metadata_flight = SingleFlight()
+
+# Fields that only the watch page can provide
+WATCH_PAGE_FIELDS = ("title", "channel_name", "views", "view_count", "publish_date", "full_description", "duration")
+# Built from the video ID alone; `compact` responses leave them to the client
+DERIVED_FIELDS = ("url", "thumbnail")
+ALL_FIELDS = ("video_id",) + DERIVED_FIELDS + WATCH_PAGE_FIELDS + ("transcript",)
 
-# Robust headers
-HEADERS = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
-    "Accept-Language": "en-US,en;q=0.9",
-    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
-    "Connection": "keep-alive"
-}
+# --- INTERNAL HELPERS ---
 
-# Instantiate sekali (Singleton-like) for the whole app
-transcript_api = YouTubeTranscriptApi()
+NO_TRANSCRIPT = "No speech or disabled by owner."
+TRANSCRIPT_LANGUAGES = settings.TRANSCRIPT_LANGUAGES
+
+def _transcript_from_tracks(tracks: List[dict], languages: Sequence[str]) -> dict:
+    """Downloads only the preferred caption track listed in an already-fetched watch page."""
+    track = choose_caption_track(tracks, languages)
+    with span("transcript.captions"):
+        res = client.get(track["url"], params={"fmt": "json3"})
+        segments = parse_json3(res.json())
+    if not segments:
+        raise ValueError("empty caption track")
+    text = " ".join(seg["text"] for seg in segments)
+    return {"language": track["language"], "payload": {"text": text, "segments": segments}}
+
+def _transcript_from_library(v_id: str, languages: Sequence[str]) -> dict:
+    # Use instance-based 'list' method (required by some versions)
+    with span("transcript.list"):
+        t_list = get_transcript_api().list(v_id)
+    # Find and fetch
+    t_found = t_list.find_transcript(languages)
+    with span("transcript.fetch"):
+        t_obj = t_found.fetch()
+
+    # Use to_raw_data() for compatibility with dataclass objects
+    raw_data = t_obj.to_raw_data() if hasattr(t_obj, 'to_raw_data') else t_obj
+
+    text = " ".join([t['text'] for t in raw_data])
+    segments = [{"start": t["start"], "duration": t["duration"], "text": t["text"]} for t in raw_data]
+    return {"language": t_found.language_code, "payload": {"text": text, "segments": segments}}
+
+def get_transcript_safe(v_id: str, languages: Sequence[str] = TRANSCRIPT_LANGUAGES,
+                        tracks: Optional[List[dict]] = None, segments: bool = False) -> dict:
+    """Transcript payload ({"text", "segments"}) in the first available language of `languages`.
+
+    `tracks` are the caption tracks of a watch page we already downloaded: only the chosen
+    track is fetched then. Without them (an empty list counts as none) or if that fails,
+    youtube_transcript_api is used.
+    If the transcript couldn't be fetched (as opposed to not existing), text is None and
+    "error" says why.
+    """
+    with span("transcript.store"):
+        cached = transcript_store.lookup(v_id, languages)
+    if cached and cached["status"] != STATUS_OK:
+        return {"text": NO_TRANSCRIPT}
+    # Entries stored before segments were kept only have the text
+    if cached and (not segments or "segments" in cached["payload"]):
+        return cached["payload"]
+
+    found = None
+    # An empty track list is no proof: consent/age gates and partial player responses list none either
+    if tracks:
+        if choose_caption_track(tracks, languages) is None:
+            # The page lists every track there is: none in these languages
+            transcript_store.put_missing(v_id, languages)
+            return {"text": NO_TRANSCRIPT}
+        try:
+            found = _transcript_from_tracks(tracks, languages)
+        except (DeadlineExceeded, CircuitOpenError) as e:
+            return {"text": None, "error": failure_reason(e)}
+        except Exception as e:
+            print(f"TRANSCRIPT: Caption track failed for {v_id} ({e}), using the library")
+
+    if found is None:
+        from youtube_transcript_api import NoTranscriptFound, TranscriptsDisabled, VideoUnavailable
+        try:
+            found = _transcript_from_library(v_id, languages)
+        except (NoTranscriptFound, TranscriptsDisabled, VideoUnavailable):
+            # Definitive answer from YouTube: remember it for a while
+            transcript_store.put_missing(v_id, languages)
+            return {"text": NO_TRANSCRIPT}
+        except Exception as e:
+            return {"text": None, "error": failure_reason(e)}
+
+    transcript_store.put(v_id, found["language"], found["payload"])
+    if found["language"] in languages:
+        # Both sources take the first available language, so the ones before it don't exist
+        preferred = languages[:languages.index(found["language"])]
+        if preferred:
+            transcript_store.put_missing(v_id, preferred)
+    return found["payload"]
+
+def mark_partial(video: dict, missing: Iterable[str], reason: str) -> None:
+    """Nulls fields that couldn't be fetched and lists them under video["partial"]."""
+    partial = video.setdefault("partial", {"reason": reason, "missing": []})
+    for name in missing:
+        video[name] = None
+        if name not in partial["missing"]:
+            partial["missing"].append(name)
+
+def apply_transcript(video: dict, transcript: dict, segments: bool) -> None:
+    if transcript["text"] is None:
+        mark_partial(video, ["transcript"] + (["transcript_segments"] if segments else []), transcript["error"])
+        return
+    video["transcript"] = transcript["text"]
+    if segments:
+        video["transcript_segments"] = transcript.get("segments", [])
+
+def scrape_watch_page(v_id: str, res_data: dict) -> Optional[List[dict]]:
+    """Downloads the Shorts watch page and fills the page-derived fields of res_data in place.
+
+    Returns the page's caption tracks (None if the player response was missing)."""
+    url = f"{YOUTUBE}/shorts/{v_id}"
+    with span("watch.fetch"):
+        res = client.get(url)
+        # A throttled or failed page has none of the fields: don't parse it as if it did
+        res.raise_for_status()
+        html = res.text
 
-# --- INTERNAL HELPERS ---
+    with span("watch.parse"):
+        page = extract_watch_page(html)
+    res_data.update(page.fields)
+    for name in page.fallbacks:
+        FALLBACK_REGEX.inc(field=name)
 
-def get_transcript_safe(v_id: str) -> str:
-    """Tries to get transcript using high-level methods or raw list access."""
-    try:
-        # Use instance-based 'list' method (required by some versions)
-        t_list = transcript_api.list(v_id)
-        # Find and fetch
-        t_obj = t_list.find_transcript(['ar', 'en']).fetch()
-        
-        # Use to_raw_data() for compatibility with dataclass objects
-        raw_data = t_obj.to_raw_data() if hasattr(t_obj, 'to_raw_data') else t_obj
-        
-        return " ".join([t['text'] for t in raw_data])
-    except Exception as e:
-        return f"No speech or disabled by owner."
+    # Fallback for description
+    if res_data["full_description"] == "N/A":
+        res_data["full_description"] = res_data["title"]
+    return page.caption_tracks
 
-def get_full_metadata(v_id: str) -> dict:
-    url = f"https://www.youtube.com/shorts/{v_id}"
+def get_full_metadata(v_id: str, fields: Iterable[str] = ALL_FIELDS, with_transcript: bool = True,
+                      languages: Sequence[str] = TRANSCRIPT_LANGUAGES, segments: bool = False) -> dict:
     res_data = {
         "title": "Unknown Title",
         "channel_name": "Unknown Channel",
         "views": "N/A",
+        "view_count": "N/A",
         "publish_date": "N/A",
-        "thumbnail": f"https://i.ytimg.com/vi/{v_id}/maxresdefault.jpg",
+        "thumbnail": thumbnail_cache.url(v_id),
         "full_description": "N/A",
+        "duration": "N/A",
         "transcript": "N/A"
     }
     
+    tracks = None
     try:
-        res = requests.get(url, headers=HEADERS, timeout=12)
-        html = res.text
-
-        # 1. Title
-        t_m = re.search(r'<meta name="title" content="(.*?)">', html)
-        if not t_m: t_m = re.search(r'<title>(.*?)</title>', html)
-        if t_m: res_data["title"] = t_m.group(1).replace(" - YouTube", "").strip()
-
-        # 2. Channel
-        c_m = re.search(r'"ownerName":"(.*?)"', html)
-        if not c_m: c_m = re.search(r'"author":"(.*?)"', html)
-        if not c_m: c_m = re.search(r'itemprop="name" content="(.*?)"', html)
-        if c_m: res_data["channel_name"] = c_m.group(1)
-
-        # 3. Views & Date
-        v_m = re.search(r'"shortViewCountText":\{"simpleText":"(.*?)"\}', html)
-        if not v_m: v_m = re.search(r'"viewCount":"(.*?)"', html)
-        if v_m: res_data["views"] = v_m.group(1)
-
-        d_m = re.search(r'"publishDate":"(.*?)"', html)
-        if not d_m: d_m = re.search(r'itemprop="datePublished" content="(.*?)"', html)
-        if d_m: res_data["publish_date"] = d_m.group(1)
-
-        # 4. JSON Content (Description)
-        j_m = re.search(r'ytInitialData\s*=\s*(\{.*?\});', html)
-        if not j_m: j_m = re.search(r'ytInitialData\s*=\s*(\{.*?\})</script>', html)
-        if j_m:
-            try:
-                data = json.loads(j_m.group(1))
-                for panel in data.get("engagementPanels", []):
-                    rend = panel.get("engagementPanelRenderer", {})
-                    if rend.get("targetId") == "engagement-panel-structured-description":
-                        items = rend.get("content", {}).get("structuredDescriptionContentRenderer", {}).get("items", [])
-                        for item in items:
-                            if "videoDescriptionHeaderRenderer" in item:
-                                info = item["videoDescriptionHeaderRenderer"]
-                                res_data["full_description"] = info.get("description", {}).get("runs", [{}])[0].get("text", "N/A")
-            except: pass
-
-        # Fallback for description
-        if res_data["full_description"] == "N/A":
-            res_data["full_description"] = res_data["title"]
-
-        # 5. Transcript
-        res_data["transcript"] = get_transcript_safe(v_id)
-        
-        return res_data
+        # Only the requested fields have to be fresh (e.g. stale views don't matter if views aren't asked for)
+        with span("metadata.cache"):
+            cached = metadata_cache.get(v_id, [f for f in fields if f in WATCH_PAGE_FIELDS])
+        if cached:
+            res_data.update({k: v for k, v in cached.items() if v is not None})
+        else:
+            tracks = scrape_watch_page(v_id, res_data)
+            # Only cache pages that actually parsed
+            if res_data["title"] != "Unknown Title":
+                metadata_cache.put(v_id, res_data)
     except Exception as e:
         print(f"ERROR fetching metadata for {v_id}: {e}")
+        missing = [f for f in WATCH_PAGE_FIELDS if f in fields]
+        if with_transcript:
+            missing += ["transcript", "transcript_segments"] if segments else ["transcript"]
+        # Don't spend a transcript round trip on a video whose page we couldn't get
+        mark_partial(res_data, missing, failure_reason(e))
+        if not with_transcript:
+            del res_data["transcript"]
         return res_data
 
+    if "thumbnail" in fields:
+        # maxresdefault is missing for many Shorts: link the variant that exists
+        try:
+            res_data["thumbnail"] = thumbnail_cache.url(v_id, probe=True)
+        except Exception as e:
+            print(f"THUMBNAIL: Could not resolve {v_id} ({e}), keeping the guess")
+
+    # 5. Transcript
+    if with_transcript:
+        apply_transcript(res_data, get_transcript_safe(v_id, languages, tracks, segments), segments)
+    else:
+        del res_data["transcript"]
+    return res_data
+
+# --- ENRICHMENT DEPTH ---
+
+@dataclass(frozen=True)
+class EnrichOptions:
+    """How much work to do per video.
+
+    depth: "ids" (search page only), "basic" (+ watch page) or "full" (+ transcript).
+    fields: optional projection; stages whose fields aren't requested are skipped.
+    compact: drop DERIVED_FIELDS from the output.
+    languages: caption language preference; segments: also return timed transcript segments.
+    """
+    depth: str = "full"
+    fields: Optional[FrozenSet[str]] = None
+    compact: bool = False
+    languages: Tuple[str, ...] = TRANSCRIPT_LANGUAGES
+    segments: bool = False
+
+    def wants(self, name: str) -> bool:
+        return self.fields is None or name in self.fields
+
+    def needs_page(self, listing_item: dict) -> bool:
+        if self.depth == "ids":
+            return False
+        wanted = [f for f in WATCH_PAGE_FIELDS if self.wants(f)]
+        # The listing already gave us a title: no need for the watch page just for that
+        return any(f != "title" or "title" not in listing_item for f in wanted)
+
+    def needs_transcript(self) -> bool:
+        return self.depth == "full" and self.wants("transcript")
+
+    def project(self, video: dict) -> dict:
+        if self.compact:
+            video = {k: v for k, v in video.items() if k not in DERIVED_FIELDS}
+        if self.fields is None:
+            return video
+        keep = self.fields | {"video_id", "partial"}
+        if "transcript" in self.fields:
+            keep |= {"transcript_segments"}
+        return {k: v for k, v in video.items() if k in keep}
+
+DEFAULT_OPTIONS = EnrichOptions()
+
+LANGUAGE_RE = re.compile(r"^[A-Za-z]{2,3}(-[A-Za-z0-9]{1,8})*$")
+
+def parse_options(depth: str, fields: Optional[str], compact: bool = False, lang: Optional[str] = None,
+                  segments: bool = False) -> EnrichOptions:
+    """Builds EnrichOptions from query params. Raises ValueError on unknown field names or language codes."""
+    languages = tuple(l.strip() for l in (lang or "").split(",") if l.strip()) or TRANSCRIPT_LANGUAGES
+    bad = [l for l in languages if not LANGUAGE_RE.match(l)]
+    if bad:
+        raise ValueError(f"Invalid language codes: {', '.join(bad)}")
+    if not fields:
+        return EnrichOptions(depth=depth, compact=compact, languages=languages, segments=segments)
+    wanted = frozenset(f.strip() for f in fields.split(",") if f.strip())
+    unknown = wanted - set(ALL_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}. Allowed: {', '.join(ALL_FIELDS)}")
+    return EnrichOptions(depth=depth, fields=wanted, compact=compact, languages=languages, segments=segments)
+
+def options_from_body(body: dict) -> EnrichOptions:
+    """parse_options for JSON bodies (batch requests, stored job params), where fields and lang are lists."""
+    join = lambda values: ",".join(values) if values else None
+    return parse_options(body["depth"], join(body.get("fields")), body.get("compact", False),
+                         join(body.get("lang")), body.get("segments", False))
+
+def enrich_video(item: dict, opts: EnrichOptions = DEFAULT_OPTIONS) -> dict:
+    with span("enrich.video"):
+        video = _enrich_video(item, opts)
+    if local_index is not None:
+        with span("index.add"):
+            index_video(video)
+    return video
+
+# Defaults get_full_metadata fills in when a field isn't on the page: not worth indexing
+PLACEHOLDERS = {"Unknown Title", "Unknown Channel", "N/A", NO_TRANSCRIPT}
+INDEX_COLUMNS = {"title": "title", "channel_name": "channel_name", "full_description": "description",
+                 "transcript": "transcript", "publish_date": "publish_date", "view_count": "views", "duration": "duration"}
+
+def index_video(video: dict) -> None:
+    """Adds the real (non-placeholder) values of an enriched video to the local index."""
+    record = {"video_id": video["video_id"]}
+    for field, column in INDEX_COLUMNS.items():
+        value = video.get(field)
+        if value is not None and value not in PLACEHOLDERS:
+            record[column] = value
+    try:
+        local_index.add(record)
+    except Exception as e:
+        print(f"INDEX ERROR ({video['video_id']}): {e}")
+
+def _enrich_video(item: dict, opts: EnrichOptions) -> dict:
+    v_id = item["video_id"]
+    video = {
+        "video_id": v_id,
+        "url": f"https://www.youtube.com/shorts/{v_id}",
+        "thumbnail": thumbnail_cache.url(v_id),
+        **{k: v for k, v in item.items() if k != "video_id"},
+    }
+    if opts.needs_page(item):
+        print(f"ENRICH: Getting rich data for {v_id}...")
+        # compact drops the derived fields anyway: don't probe a thumbnail nobody sees
+        wanted = tuple(f for f in ALL_FIELDS if opts.wants(f) and not (opts.compact and f in DERIVED_FIELDS))
+        with_transcript = opts.needs_transcript()
+        # Identical fetches already in flight (from any request) are shared, not repeated
+        key = (v_id, wanted, with_transcript, opts.languages, opts.segments)
+        video.update(metadata_flight.do(key, get_full_metadata, v_id, wanted, with_transcript, opts.languages, opts.segments))
+    elif opts.needs_transcript():
+        transcript = metadata_flight.do((v_id, "transcript", opts.languages, opts.segments),
+                                        get_transcript_safe, v_id, opts.languages, None, opts.segments)
+        apply_transcript(video, transcript, opts.segments)
+    return opts.project(video)
+
+# --- PAGING ---
+
+INNERTUBE_FALLBACK_VERSION = "2.20240726.00.00"
+
+def fetch_continuation(state: dict) -> ListingPage:
+    """Fetches the next results page through the innertube search/browse endpoint."""
+    url = f"{YOUTUBE}/youtubei/v1/{state['k']}?prettyPrint=false"
+    if state.get("api_key"):
+        url += f"&key={state['api_key']}"
+    payload = {
+        "context": {"client": {
+            "clientName": "WEB",
+            "clientVersion": state.get("client_version") or INNERTUBE_FALLBACK_VERSION,
+            "hl": "en", "gl": "US",
+        }},
+        "continuation": state["t"],
+    }
+    print(f"SCRAPE: Continuation page ({state['k']})")
+    with span("scan.continuation"):
+        res = client.post_json(url, payload, timeout=15)
+        res.raise_for_status()
+        data = res.json()
+    with span("scan.parse"):
+        return parse_listing(data)
+
+def decode_scan_cursor(cursor: str, query_or_hashtag: str, is_hashtag: bool) -> dict:
+    """Decodes a /fetch or /search cursor, rejecting one issued for the other endpoint or another term."""
+    state = decode_cursor(cursor, kinds=("browse",) if is_hashtag else ("search",))
+    if state.get("q") != query_or_hashtag:
+        raise ValueError("Cursor belongs to a different hashtag." if is_hashtag else "Cursor belongs to a different query.")
+    return state
+
+def scan_videos(query_or_hashtag: str, is_hashtag: bool, limit: int, cursor: Optional[str] = None,
+                max_pages: int = settings.MAX_SCAN_PAGES) -> Tuple[List[dict], Optional[str]]:
+    """Returns up to `limit` listing items ({"video_id", "title"?}) and a cursor to resume from.
+
+    Follows continuation tokens only as far as the limit needs. The cursor
+    records the token of the page we stopped in and how many of its items
+    were consumed, so nothing is skipped or repeated on resume.
+    """
+    state = (decode_scan_cursor(cursor, query_or_hashtag, is_hashtag) if cursor else
+             {"k": "browse" if is_hashtag else "search", "q": query_or_hashtag, "t": None, "s": 0})
+    items, seen = [], set()
+    for _ in range(max_pages):
+        if items and expired():
+            # Out of time: hand back what we have, resumable from here
+            return items, encode_cursor(state)
+        try:
+            if state["t"] is None:
+                url = f"{YOUTUBE}/hashtag/{quote(query_or_hashtag)}/shorts" if is_hashtag else f"{YOUTUBE}/results?search_query={quote_plus(query_or_hashtag)}&sp=EgIQCQ=="
+                print(f"SCRAPE: Visiting {url}")
+                with span("scan.page"):
+                    res = client.get(url, timeout=15)
+                    res.raise_for_status()
+                    html = res.text
+                with span("scan.parse"):
+                    page = extract_listing(html)
+                    state.update(extract_innertube_config(html))
+            else:
+                page = fetch_continuation(state)
+        except Exception as e:
+            if not items:
+                raise
+            print(f"SCAN: Stopping early after {len(items)} items ({e})")
+            return items, encode_cursor(state)
+
+        pos = state["s"]
+        while pos < len(page.items) and len(items) < limit:
+            item = page.items[pos]
+            pos += 1
+            if item["video_id"] not in seen:
+                seen.add(item["video_id"])
+                items.append(item)
+
+        if pos < len(page.items):
+            # Limit reached mid-page: resume inside this page next time
+            state["s"] = pos
+            return items, encode_cursor(state)
+        if not page.continuation:
+            return items, None
+        state["t"], state["s"] = page.continuation, 0
+        if len(items) >= limit:
+            break
+    return items, encode_cursor(state)
+
 # --- EXTRACTORS ---
 
-def extract_videos(query_or_hashtag: str, is_hashtag: bool, limit: int) -> List[dict]:
-    url = f"https://www.youtube.com/hashtag/{query_or_hashtag}/shorts" if is_hashtag else f"https://www.youtube.com/results?search_query={query_or_hashtag}&sp=EgIQCQ=="
+def iter_enriched(items: List[dict], opts: EnrichOptions = DEFAULT_OPTIONS, pool=None,
+                  window: Optional[int] = None) -> Iterator[Tuple[int, dict]]:
+    """Yields (search position, video) pairs as soon as each video is enriched.
+
+    At most `window` videos are in flight at once (all of them when None), so
+    a long harvest takes turns with other work on the same pool.
+    """
+    pool = pool or enrich_pool
+    pending = enumerate(items)
+    futures = {}
+
+    def fill():
+        for pos, item in islice(pending, (window or len(items)) - len(futures)):
+            futures[pool.submit(enrich_video, item, opts)] = pos
+
+    try:
+        fill()
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for fut in done:
+                yield futures.pop(fut), fut.result()
+            fill()
+    finally:
+        # Client went away mid-stream: don't keep scraping for nobody
+        for fut in futures:
+            fut.cancel()
+
+def extract_videos(query_or_hashtag: str, is_hashtag: bool, limit: int, opts: EnrichOptions = DEFAULT_OPTIONS,
+                   cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+    """Returns (videos in search order, cursor for the next batch)."""
     try:
-        print(f"SCRAPE: Visiting {url}")
-        res = requests.get(url, headers=HEADERS, timeout=15)
-        video_ids = re.findall(r'"videoId":"([^"]{11})"', res.text)
-        seen = set()
-        unique_ids = [vid for vid in video_ids if not (vid in seen or seen.add(vid))][:limit]
-        
-        results = []
-        for v_id in unique_ids:
-            print(f"ENRICH: Getting rich data for {v_id}...")
-            results.append({
-                "video_id": v_id,
-                "url": f"https://www.youtube.com/shorts/{v_id}",
-                **get_full_metadata(v_id)
-            })
-            time.sleep(0.3)
-        return results
+        items, next_cursor = scan_videos(query_or_hashtag, is_hashtag, limit, cursor)
+        # map() keeps the original search order regardless of completion order
+        return list(enrich_pool.map(partial(enrich_video, opts=opts), items)), next_cursor
     except Exception as e:
         print(f"SCAN ERROR: {e}")
-        return []
+        return [], None
+
+def count_partial(videos: Iterable[dict]) -> int:
+    return sum(1 for v in videos if "partial" in v)
+
+def stream_videos(query_or_hashtag: str, is_hashtag: bool, limit: int, fmt: str, opts: EnrichOptions = DEFAULT_OPTIONS,
+                  cursor: Optional[str] = None, budget: Optional[float] = None) -> StreamingResponse:
+    """Streams each enriched video as NDJSON lines or SSE events, then a summary record."""
+    encode = partial(encode_event, fmt)
+
+    def events():
+        started = time.time()
+        # Scanning and submitting the enrichment all happen in this first step of
+        # the generator, so the deadline reaches every pool task
+        set_deadline(budget)
+        try:
+            items, next_cursor = scan_videos(query_or_hashtag, is_hashtag, limit, cursor)
+        except Exception as e:
+            print(f"SCAN ERROR: {e}")
+            items, next_cursor = [], None
+        count = partial_count = 0
+        for pos, video in iter_enriched(items, opts):
+            count += 1
+            partial_count += "partial" in video
+            yield encode("video", {"position": pos, "video": video})
+        yield encode("summary", {"status": "success", "count": count, "partial": partial_count,
+                                 "next_cursor": next_cursor, "elapsed": round(time.time() - started, 3)})
+
+    return event_stream(events(), fmt)
 
 # --- API ENDPOINTS ---
 
-@app.get("/fetch", tags=["Core"])
-def fetch(hashtag: str, limit: int = 10):
-    videos = extract_videos(hashtag, True, limit)
-    return {"status": "success", "count": len(videos), "videos": videos}
-
-@app.get("/search", tags=["Core"])
-def search(query: str, limit: int = 10):
-    videos = extract_videos(query, False, limit)
-    return {"status": "success", "count": len(videos), "videos": videos}
+Depth = Literal["ids", "basic", "full"]
 
-# ==========================================
-#   YOUTUBE-SEARCH-PYTHON LIBRARY INTEGRATION
-# ==========================================
-# [MONKEY PATCH] Fix for unmaintained library crash (NoneType concatenation)
-from youtubesearchpython.handlers.componenthandler import ComponentHandler
-from youtubesearchpython.core.constants import videoElementKey
-
-def _getVideoComponent_safe(self, element: dict, shelfTitle: str = None) -> dict:
-    video = element[videoElementKey]
-    component = {
-        'type':                           'video',
-        'id':                              self._getValue(video, ['videoId']),
-        'title':                           self._getValue(video, ['title', 'runs', 0, 'text']),
-        'publishedTime':                   self._getValue(video, ['publishedTimeText', 'simpleText']),
-        'duration':                        self._getValue(video, ['lengthText', 'simpleText']),
-        'viewCount': {
-            'text':                        self._getValue(video, ['viewCountText', 'simpleText']),
-            'short':                       self._getValue(video, ['shortViewCountText', 'simpleText']),
-        },
-        'thumbnails':                      self._getValue(video, ['thumbnail', 'thumbnails']),
-        'richThumbnail':                   self._getValue(video, ['richThumbnail', 'movingThumbnailRenderer', 'movingThumbnailDetails', 'thumbnails', 0]),
-        'descriptionSnippet':              self._getValue(video, ['detailedMetadataSnippets', 0, 'snippetText', 'runs']),
-        'channel': {
-            'name':                        self._getValue(video, ['ownerText', 'runs', 0, 'text']),
-            'id':                          self._getValue(video, ['ownerText', 'runs', 0, 'navigationEndpoint', 'browseEndpoint', 'browseId']),
-            'thumbnails':                  self._getValue(video, ['channelThumbnailSupportedRenderers', 'channelThumbnailWithLinkRenderer', 'thumbnail', 'thumbnails']),
-        },
-        'accessibility': {
-            'title':                       self._getValue(video, ['title', 'accessibility', 'accessibilityData', 'label']),
-            'duration':                    self._getValue(video, ['lengthText', 'accessibility', 'accessibilityData', 'label']),
-        },
-    }
-    # SAFELY handle IDs
-    v_id = component['id']
-    component['link'] = ('https://www.youtube.com/watch?v=' + v_id) if v_id else None
-    
-    c_id = component['channel']['id']
-    component['channel']['link'] = ('https://www.youtube.com/channel/' + c_id) if c_id else None
-    
-    component['shelfTitle'] = shelfTitle
-    return component
-
-ComponentHandler._getVideoComponent = _getVideoComponent_safe
-
-from youtubesearchpython import (
-    VideosSearch, ChannelsSearch, PlaylistsSearch, Search, CustomSearch, 
-    VideoSortOrder, Suggestions, Hashtag, Video, Playlist, Channel, 
-    Comments, Transcript, StreamURLFetcher
-)
-
-@app.get("/ysp/search/videos", tags=["YouTube Search Python Lib"])
-def ysp_search_videos(query: str, limit: int = 5):
-    """Search for videos only."""
-    s = VideosSearch(query, limit=limit)
-    return s.result()
-
-@app.get("/ysp/search/channels", tags=["YouTube Search Python Lib"])
-def ysp_search_channels(query: str, limit: int = 5):
-    """Search for channels only."""
-    s = ChannelsSearch(query, limit=limit)
-    return s.result()
-
-@app.get("/ysp/search/playlists", tags=["YouTube Search Python Lib"])
-def ysp_search_playlists(query: str, limit: int = 5):
-    """Search for playlists only."""
-    s = PlaylistsSearch(query, limit=limit)
-    return s.result()
-
-@app.get("/ysp/search/all", tags=["YouTube Search Python Lib"])
-def ysp_search_all(query: str, limit: int = 5):
-    """Search for everything (mixed)."""
-    s = Search(query, limit=limit)
-    return s.result()
-
-@app.get("/ysp/search/custom", tags=["YouTube Search Python Lib"])
-def ysp_search_custom(query: str, limit: int = 5, upload_date: bool = False):
-    """Custom search example (Upload Date sort)."""
-    s = CustomSearch(query, VideoSortOrder.uploadDate, limit=limit)
-    return s.result()
-
-@app.get("/ysp/video/info", tags=["YouTube Search Python Lib"])
-def ysp_video_info(url_or_id: str):
-    """Get video info."""
+def run_core(term: str, is_hashtag: bool, limit: int, stream: StreamFormat, depth: str, fields: Optional[str],
+             cursor: Optional[str], compact: bool = False, lang: Optional[str] = None, segments: bool = False,
+             deadline: Optional[float] = None):
     try:
-        return Video.get(url_or_id, mode=0, get_upload_date=True)
-    except Exception as e:
-        return {"error": str(e)}
+        opts = parse_options(depth, fields, compact, lang, segments)
+        if cursor:
+            decode_scan_cursor(cursor, term, is_hashtag)
+    except ValueError as e:
+        return {"status": "error", "error": str(e)}
+    budget = settings.REQUEST_DEADLINE if deadline is None else deadline
+    if stream:
+        return stream_videos(term, is_hashtag, limit, stream, opts, cursor, budget)
+    with deadline_scope(budget):
+        videos, next_cursor = extract_videos(term, is_hashtag, limit, opts, cursor)
+    return {"status": "success", "count": len(videos), "partial": count_partial(videos), "videos": videos,
+            "next_cursor": next_cursor}
+
+FIELDS_QUERY = Query(None, description="Comma-separated projection, e.g. video_id,title")
+CURSOR_QUERY = Query(None, description="next_cursor from a previous response (same hashtag/query) to continue paging")
+COMPACT_QUERY = Query(False, description="Omit url and thumbnail (both derivable from video_id)")
+LANG_QUERY = Query(None, description="Caption language preference, e.g. en,ar (first available wins)")
+SEGMENTS_QUERY = Query(False, description="Also return timed transcript segments (transcript_segments)")
+DEADLINE_QUERY = Query(None, ge=0, description="Seconds this call may spend upstream (default REQUEST_DEADLINE, 0 = none); "
+                                               "videos not finished in time are marked partial")
 
-@app.get("/ysp/playlist/info", tags=["YouTube Search Python Lib"])
-def ysp_playlist_info(url_or_id: str):
-    """Get playlist info."""
+@app.get("/fetch", tags=["Core"])
+def fetch(hashtag: str, limit: int = 10, stream: StreamFormat = None, depth: Depth = "full",
+          fields: Optional[str] = FIELDS_QUERY, cursor: Optional[str] = CURSOR_QUERY, compact: bool = COMPACT_QUERY,
+          lang: Optional[str] = LANG_QUERY, segments: bool = SEGMENTS_QUERY, deadline: Optional[float] = DEADLINE_QUERY):
+    return run_core(hashtag, True, limit, stream, depth, fields, cursor, compact, lang, segments, deadline)
+
+@app.get("/search", tags=["Core"])
+def search(query: str, limit: int = 10, stream: StreamFormat = None, depth: Depth = "full",
+           fields: Optional[str] = FIELDS_QUERY, cursor: Optional[str] = CURSOR_QUERY, compact: bool = COMPACT_QUERY,
+           lang: Optional[str] = LANG_QUERY, segments: bool = SEGMENTS_QUERY, deadline: Optional[float] = DEADLINE_QUERY):
+    return run_core(query, False, limit, stream, depth, fields, cursor, compact, lang, segments, deadline)
+
+# --- BATCH ---
+
+class BatchRequest(BaseModel):
+    ids: List[str]
+    depth: Depth = "full"
+    fields: Optional[List[str]] = None
+    compact: bool = False
+    lang: Optional[List[str]] = None
+    segments: bool = False
+    deadline: Optional[float] = None
+
+@app.post("/videos/batch", tags=["Core"])
+def videos_batch(req: BatchRequest):
+    """Enrich a list of known video IDs (deduplicated, fetched with bounded concurrency)."""
+    if len(req.ids) > settings.BATCH_MAX_IDS:
+        return {"status": "error", "error": f"Too many ids ({len(req.ids)}), max is {settings.BATCH_MAX_IDS}."}
     try:
-        return Playlist.get(url_or_id, mode=0)
-    except Exception as e:
-        return {"error": str(e)}
+        opts = options_from_body(req.model_dump())
+    except ValueError as e:
+        return {"status": "error", "error": str(e)}
+
+    seen, invalid, unique_ids = set(), [], []
+    for raw in req.ids:
+        v_id = normalize_video_id(raw)
+        if not v_id:
+            invalid.append(raw)
+        elif v_id not in seen:
+            seen.add(v_id)
+            unique_ids.append(v_id)
+
+    items = [{"video_id": v_id} for v_id in unique_ids]
+    with deadline_scope(settings.REQUEST_DEADLINE if req.deadline is None else req.deadline):
+        videos = list(enrich_pool.map(partial(enrich_video, opts=opts), items))
+    return {
+        "status": "success",
+        "count": len(videos),
+        "partial": count_partial(videos),
+        "duplicates": len(req.ids) - len(invalid) - len(unique_ids),
+        "invalid": invalid,
+        "videos": videos,
+    }
 
-@app.get("/ysp/channel/info", tags=["YouTube Search Python Lib"])
-def ysp_channel_info(channel_id: str):
-    """Get channel info."""
+# --- JOBS ---
+
+class JobRequest(BaseModel):
+    hashtag: Optional[str] = None
+    query: Optional[str] = None
+    ids: Optional[List[str]] = None
+    limit: int = 100
+    depth: Depth = "full"
+    fields: Optional[List[str]] = None
+    compact: bool = False
+    lang: Optional[List[str]] = None
+    segments: bool = False
+
+def run_job(job: dict, store: JobStore) -> None:
+    """Harvests one job, saving each video as soon as it is enriched."""
+    params = job["params"]
+    opts = options_from_body(params)
+    if job["kind"] == "ids":
+        items = [{"video_id": v_id} for v_id in params["ids"]]
+    else:
+        items, _ = scan_videos(params["term"], job["kind"] == "hashtag", params["limit"],
+                               max_pages=settings.JOB_MAX_SCAN_PAGES)
+    store.set_total(job["id"], len(items))
+
+    # Resumed job: skip what was already saved before the restart
+    saved = store.result_ids(job["id"])
+    todo = [(seq, item) for seq, item in enumerate(items) if item["video_id"] not in saved]
+    for pos, video in iter_enriched([item for _, item in todo], opts, background_pool, settings.BACKGROUND_WORKERS):
+        if job_runner.should_stop(job["id"]):
+            raise JobCancelled()
+        store.add_result(job["id"], todo[pos][0], video)
+
+job_runner = JobRunner(job_store, settings.JOB_WORKERS, run_job,
+                       resume=settings.JOBS_RESUME_ON_START, poll_interval=settings.JOB_POLL_INTERVAL)
+
+@app.post("/jobs", tags=["Jobs"])
+def create_job(req: JobRequest):
+    """Queue a background harvest (exactly one of hashtag, query or ids)."""
+    sources = [name for name in ("hashtag", "query", "ids") if getattr(req, name)]
+    if len(sources) != 1:
+        return {"status": "error", "error": "Provide exactly one of hashtag, query or ids."}
+    if not 0 < req.limit <= settings.JOB_MAX_LIMIT:
+        return {"status": "error", "error": f"limit must be between 1 and {settings.JOB_MAX_LIMIT}."}
     try:
-        return Channel.get(channel_id)
-    except Exception as e:
-        return {"error": str(e)}
-
-@app.get("/ysp/suggestions", tags=["YouTube Search Python Lib"])
-def ysp_suggestions(query: str):
-    """Get search suggestions."""
-    return Suggestions(language='en', region='US').get(query, mode=0)
-
-@app.get("/ysp/hashtag", tags=["YouTube Search Python Lib"])
-def ysp_hashtag(tag: str, limit: int = 5):
-    """Get videos by hashtag."""
-    return Hashtag(tag, limit=limit).result()
-
-@app.get("/ysp/comments", tags=["YouTube Search Python Lib"])
-def ysp_comments(video_id: str, limit: int = 20):
-    """Get video comments."""
-    # Note: Library may not support 'limit' directly in constructor for all versions, 
-    # but has .get() method. Using simplest approach.
+        options_from_body(req.model_dump())
+    except ValueError as e:
+        return {"status": "error", "error": str(e)}
+
+    params = {"limit": req.limit, "depth": req.depth, "fields": req.fields, "compact": req.compact,
+              "lang": req.lang, "segments": req.segments}
+    if req.ids:
+        unique_ids = []
+        for raw in req.ids:
+            v_id = normalize_video_id(raw)
+            if v_id and v_id not in unique_ids:
+                unique_ids.append(v_id)
+        params["ids"] = unique_ids[:req.limit]
+    else:
+        params["term"] = req.hashtag or req.query
+
+    job = job_store.create(sources[0], params)
+    job_runner.submit(job["id"])
+    return {"status": "success", "job": job}
+
+@app.get("/jobs", tags=["Jobs"])
+def list_jobs(limit: int = 50):
+    """Most recent jobs first."""
+    return {"status": "success", "jobs": job_store.list(limit)}
+
+@app.get("/jobs/{job_id}", tags=["Jobs"])
+def get_job(job_id: str):
+    """Job status and progress (done/total)."""
+    job = job_store.get(job_id)
+    if not job:
+        return {"status": "error", "error": "Job not found."}
+    return {"status": "success", "job": job}
+
+@app.get("/jobs/{job_id}/results", tags=["Jobs"])
+def get_job_results(job_id: str, offset: int = 0, limit: int = 100):
+    """Page through a job's saved videos (available while it is still running)."""
+    job = job_store.get(job_id)
+    if not job:
+        return {"status": "error", "error": "Job not found."}
+    videos = job_store.results(job_id, offset, limit)
+    next_offset = offset + len(videos) if len(videos) == limit else None
+    return {"status": "success", "job_status": job["status"], "count": len(videos), "videos": videos, "next_offset": next_offset}
+
+@app.delete("/jobs/{job_id}", tags=["Jobs"])
+def cancel_job(job_id: str):
+    """Cancel a queued or running job (results saved so far are kept)."""
+    return {"status": "success", "cancelled": job_store.cancel(job_id)}
+
+# --- WATCHES ---
+
+class WatchRequest(BaseModel):
+    hashtag: Optional[str] = None
+    query: Optional[str] = None
+    interval: float = settings.WATCH_DEFAULT_INTERVAL
+    limit: int = 30
+    depth: Depth = "full"
+    fields: Optional[List[str]] = None
+    compact: bool = False
+    lang: Optional[List[str]] = None
+    segments: bool = False
+    backfill: bool = True
+
+def run_watch(watch: dict, store: WatchStore) -> int:
+    """One poll: scan the newest results and enrich only the IDs this watch hasn't seen."""
+    params = watch["params"]
+    opts = options_from_body(params)
+    items, _ = scan_videos(watch["term"], watch["kind"] == "hashtag", params["limit"])
+    fresh_ids = set(store.unseen(watch["id"], [item["video_id"] for item in items]))
+    if not params.get("backfill", True) and not watch["seen"]:
+        # First run without backfill: what's there now is the baseline, not news
+        store.mark_seen(watch["id"], fresh_ids)
+        return 0
+    new = 0
+    fresh = [item for item in items if item["video_id"] in fresh_ids]
+    for _, video in iter_enriched(fresh, opts, background_pool, settings.BACKGROUND_WORKERS):
+        # Partially fetched videos stay unseen, so the next run retries them
+        if "partial" not in video:
+            store.add_video(watch["id"], video)
+            new += 1
+    return new
+
+watch_scheduler = WatchScheduler(watch_store, settings.WATCH_WORKERS, run_watch, tick=settings.WATCH_TICK)
+
+@app.post("/watches", tags=["Watches"])
+def create_watch(req: WatchRequest):
+    """Subscribe to a hashtag or query (exactly one); it is polled every `interval` seconds."""
+    sources = [name for name in ("hashtag", "query") if getattr(req, name)]
+    if len(sources) != 1:
+        return {"status": "error", "error": "Provide exactly one of hashtag or query."}
+    if req.interval < settings.WATCH_MIN_INTERVAL:
+        return {"status": "error", "error": f"interval must be at least {settings.WATCH_MIN_INTERVAL:g} seconds."}
+    if not 0 < req.limit <= settings.WATCH_MAX_LIMIT:
+        return {"status": "error", "error": f"limit must be between 1 and {settings.WATCH_MAX_LIMIT}."}
     try:
-        c = Comments.get(video_id)
-        return c
-    except Exception as e:
-        return {"error": str(e)}
+        options_from_body(req.model_dump())
+    except ValueError as e:
+        return {"status": "error", "error": str(e)}
+
+    params = {"limit": req.limit, "depth": req.depth, "fields": req.fields, "compact": req.compact,
+              "lang": req.lang, "segments": req.segments, "backfill": req.backfill}
+    watch = watch_store.create(sources[0], req.hashtag or req.query, params, req.interval)
+    watch_scheduler.wake()
+    return {"status": "success", "watch": watch}
+
+@app.get("/watches", tags=["Watches"])
+def list_watches():
+    return {"status": "success", "watches": watch_store.list()}
+
+@app.get("/watches/{watch_id}", tags=["Watches"])
+def get_watch(watch_id: str):
+    """Watch settings, last run outcome and seen-index size."""
+    watch = watch_store.get(watch_id)
+    if not watch:
+        return {"status": "error", "error": "Watch not found."}
+    return {"status": "success", "watch": watch}
+
+@app.get("/watches/{watch_id}/new", tags=["Watches"])
+def get_watch_new(watch_id: str, since: int = 0, limit: int = Query(100, ge=1, le=1000)):
+    """Videos first seen after `since` (the next_since of your previous call; 0 = everything kept)."""
+    watch = watch_store.get(watch_id)
+    if not watch:
+        return {"status": "error", "error": "Watch not found."}
+    rows = watch_store.new_since(watch_id, since, limit)
+    return {
+        "status": "success",
+        "count": len(rows),
+        "videos": [r["video"] for r in rows],
+        "next_since": rows[-1]["seq"] if rows else max(since, 0),
+        "more": len(rows) == limit,
+        "last_run_at": watch["last_run_at"],
+        "next_run_at": watch["next_run_at"],
+    }
 
-@app.get("/ysp/transcript", tags=["YouTube Search Python Lib"])
-def ysp_transcript(video_url: str):
-    """Get video transcript using this library."""
+@app.post("/watches/{watch_id}/run", tags=["Watches"])
+def run_watch_now(watch_id: str):
+    """Poll now instead of waiting for the next scheduled run."""
+    if not watch_store.schedule_now(watch_id):
+        return {"status": "error", "error": "Watch not found."}
+    watch_scheduler.wake()
+    return {"status": "success"}
+
+@app.delete("/watches/{watch_id}", tags=["Watches"])
+def delete_watch(watch_id: str):
+    """Unsubscribe and drop the watch's seen index."""
+    return {"status": "success", "deleted": watch_store.delete(watch_id)}
+
+# --- THUMBNAILS ---
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match check: `*` or any listed tag equal to `etag` (weak comparison, W/ ignored)."""
+    tags = [t.strip() for t in if_none_match.split(",") if t.strip()]
+    if "*" in tags:
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    return any((t[2:] if t.startswith("W/") else t) == opaque for t in tags)
+
+@app.get("/thumbnails/{video_id}", tags=["Core"], response_class=Response)
+def thumbnail(video_id: str, request: Request,
+              w: Optional[int] = Query(None, ge=16, le=settings.THUMBNAIL_MAX_WIDTH, description="Resize to this width")):
+    """Best available thumbnail (JPEG), cached on disk; `w` serves a resized copy. Supports If-None-Match."""
+    v_id = normalize_video_id(video_id)
+    if not v_id:
+        return JSONResponse({"status": "error", "error": "Invalid video id."}, status_code=400)
     try:
-        return Transcript.get(video_url)
+        thumb = thumbnail_cache.get(v_id, w)
+    except ThumbnailNotFound:
+        return JSONResponse({"status": "error", "error": "No thumbnail found."}, status_code=404)
     except Exception as e:
-        return {"error": str(e)}
+        return JSONResponse({"status": "error", "error": str(e)}, status_code=502)
+
+    headers = {"ETag": thumb.etag, "Cache-Control": "public, max-age=86400", "X-Thumbnail-Variant": thumb.variant}
+    if etag_matches(request.headers.get("if-none-match", ""), thumb.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(thumb.data, media_type="image/jpeg", headers=headers)
+
+# --- LOCAL SEARCH ---
+
+DATE_QUERY_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+@app.get("/local/search", tags=["Local"])
+def local_search(q: str = "", mode: Literal["all", "any", "phrase"] = "all", channel: Optional[str] = None,
+                 published_after: Optional[str] = Query(None, description="YYYY-MM-DD"),
+                 published_before: Optional[str] = Query(None, description="YYYY-MM-DD"),
+                 sort: Literal["relevance", "date", "views"] = "relevance",
+                 limit: int = Query(20, ge=1, le=200), offset: int = Query(0, ge=0), full: bool = False):
+    """Search every video enriched so far (titles, channels, descriptions, transcripts) without scraping."""
+    if local_index is None:
+        return {"status": "error", "error": "Local index is disabled (LOCAL_INDEX=0)."}
+    for value in (published_after, published_before):
+        if value and not DATE_QUERY_RE.match(value):
+            return {"status": "error", "error": f"Invalid date '{value}', expected YYYY-MM-DD."}
+    started = time.perf_counter()
+    with span("local.search"):
+        results = local_index.search(q, mode, channel, published_after, published_before, sort, limit, offset, full)
+    return {
+        "status": "success",
+        "count": len(results),
+        "results": results,
+        "next_offset": offset + len(results) if len(results) == limit else None,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
 
-@app.get("/ysp/stream_url", tags=["YouTube Search Python Lib"])
-def ysp_stream_url(video_url: str):
-    """Get direct stream URL (requires yt-dlp installed)."""
-    try:
-        fetcher = StreamURLFetcher()
-        video = Video.get(video_url)
-        # Attempt to get stream for itag 22 (720p) or 18 (360p) or similar if specific extraction needed
-        # Or just return all via the fetcher helper if library supports generic 'get all'
-        # The user example: fetcher.get(video, 251) -> audio
-        # We will try to get a common video format, e.g., 22 (720p mp4) or 18 (360p mp4)
-        # However, listing all formats is safer.
-        # But user asked for "get(video, 251)" example style.
-        # Let's try to get a standard MP4 URL.
-        url = fetcher.get(video, 22) # 720p
-        if not url:
-            url = fetcher.get(video, 18) # 360p fallback
-        return {"stream_url": url, "itag": "22/18"}
-    except Exception as e:
-        return {"error": str(e)}
+# --- ADMIN ---
+
+def _cache_metrics():
+    for name, store in (("metadata", metadata_cache), ("transcript", transcript_store), ("ysp", ysp_cache)):
+        yield (f"shorts_{name}_cache_events_total", "counter", f"{name.capitalize()} cache lookups by outcome.",
+               [({"event": k}, v) for k, v in dict(store.counters).items()])
+    flight = metadata_flight.stats()
+    yield ("shorts_single_flight_total", "counter", "Per-video fetches executed vs coalesced.",
+           [({"outcome": "executed"}, flight["executed"]), ({"outcome": "coalesced"}, flight["coalesced"])])
+    http = client.stats()
+    yield ("shorts_upstream_pool_connections", "gauge", "Upstream keep-alive connections.",
+           [({"state": "idle"}, http["idle_connections"]), ({"state": "in_flight"}, http["in_flight"])])
+    yield ("shorts_upstream_new_connections_total", "counter", "Upstream connections opened (pool misses).",
+           [({}, http["new_connections"])])
+
+registry.register_collector(_cache_metrics)
+
+@app.get("/metrics", tags=["Admin"], response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text exposition: stage histograms, upstream status/bytes, cache counters."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+def activity_snapshot() -> dict:
+    """This worker's share of the dashboard figures (see worker_stats)."""
+    return {
+        "requests": RECENT_REQUESTS.snapshot(),
+        "upstream": RECENT_UPSTREAM.snapshot(),
+        "metadata_cache": dict(metadata_cache.counters),
+    }
+
+def server_activity() -> dict:
+    """Recent activity and metadata-cache counters summed over every live worker process."""
+    snapshots = worker_stats.snapshots(activity_snapshot())
+    counters = {}
+    for snap in snapshots:
+        for name, value in snap["metadata_cache"].items():
+            counters[name] = counters.get(name, 0) + value
+    hits = counters.get("memory_hits", 0) + counters.get("disk_hits", 0)
+    lookups = hits + counters.get("misses", 0) + counters.get("stale", 0)
+    return {
+        "workers": len(snapshots),
+        "requests": merge_windows([snap["requests"] for snap in snapshots]),
+        "upstream": merge_windows([snap["upstream"] for snap in snapshots]),
+        "metadata_cache": {**counters, "hit_rate": round(hits / lookups, 3) if lookups else None},
+    }
+
+@app.get("/admin/stats", tags=["Admin"])
+def admin_stats():
+    """Recent activity across all workers, plus connection pool and cache statistics of the worker that answered."""
+    return {
+        "activity": server_activity(),
+        "http": client.stats(),
+        "metadata_cache": metadata_cache.stats(),
+        "transcript_store": transcript_store.stats(),
+        "single_flight": metadata_flight.stats(),
+        "ysp_cache": ysp_cache.stats(),
+        "stream_urls": stream_resolver.stats(),
+        "circuits": breaker.stats(),
+        "local_index": local_index.stats() if local_index is not None else None,
+        "thumbnails": thumbnail_cache.stats(),
+    }
+
+@app.delete("/admin/cache", tags=["Admin"])
+def admin_clear_cache(transcripts: bool = False):
+    """Drops every cached video and /ysp response (and stored transcripts if asked)."""
+    removed = {"metadata": metadata_cache.invalidate(), "ysp": ysp_cache.invalidate()}
+    if transcripts:
+        removed["transcripts"] = transcript_store.invalidate()
+    return {"status": "success", "removed": removed}
+
+@app.delete("/admin/cache/{video_id}", tags=["Admin"])
+def admin_invalidate_video(video_id: str, transcripts: bool = True):
+    """Drops one video from the metadata cache and transcript store."""
+    removed = {"metadata": metadata_cache.invalidate(video_id)}
+    if transcripts:
+        removed["transcripts"] = transcript_store.invalidate(video_id)
+    return {"status": "success", "removed": removed}
+
+# ==========================================
+#   YOUTUBE-SEARCH-PYTHON LIBRARY INTEGRATION
+# ==========================================
+# Imported on first use of a /ysp endpoint (see ysp_router.py)
+app.include_router(ysp_router)
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 7861))
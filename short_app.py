@@ -1,25 +1,27 @@
 import customtkinter as ctk
+import multiprocessing
+import queue
 import threading
-import uvicorn
 import sys
 import os
 import webbrowser
-from PIL import Image
-from pyngrok import ngrok, conf
 
-# Import the API app from our existing file
 sys.path.append(os.getcwd())
-try:
-    from short_api import app
-except ImportError:
-    app = None
+import settings
+from loadgen import DEFAULT_MIX, LoadGenerator, parse_mix
+from server_control import ServerSupervisor
+
+MAX_WORKERS = 8
+MAX_LOAD_CONCURRENCY = 32
+EVENT_POLL_MS = 100      # How often the UI thread drains the event queue
+STATS_INTERVAL = 1.0     # Seconds between /admin/stats polls while the server runs
 
 # --- CONFIG ---
 ctk.set_appearance_mode("Dark")
 ctk.set_default_color_theme("blue")
 
 # --- NGROK SETUP (BUNDLED) ---
-def setup_ngrok_path():
+def setup_ngrok_path(conf):
     """Sets the ngrok path to the bundled executable if available."""
     if getattr(sys, 'frozen', False):
         # If running as EXE, look in _MEIPASS
@@ -35,22 +37,40 @@ def setup_ngrok_path():
             return True
     return False
 
-# Attempt to set path immediately
-setup_ngrok_path()
+_ngrok = None
+
+def get_ngrok():
+    """Imports pyngrok (and points it at the bundled binary) the first time a tunnel feature is used."""
+    global _ngrok
+    if _ngrok is None:
+        from pyngrok import ngrok, conf
+        setup_ngrok_path(conf)
+        _ngrok = ngrok
+    return _ngrok
 
 class APIApp(ctk.CTk):
     def __init__(self):
         super().__init__()
 
         self.title("YouTube Shorts Smart Fetcher")
-        self.geometry("650x550")
+        self.geometry("650x800")
         self.resizable(False, False)
         
-        # Server Thread
-        self.server_thread = None
+        # Server worker processes
         self.is_running = False
         self.port = 7861
         self.public_url = None
+        self.supervisor = ServerSupervisor(port=self.port, workers=min(settings.SERVE_WORKERS, MAX_WORKERS))
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # Tk widgets may only be touched from this thread: background threads
+        # post (callable, args, kwargs) here and _drain_events runs them via after()
+        self.events = queue.Queue()
+        self.stats_stop = threading.Event()
+        self.loadgen = None
+        # Set once the window is closing / destroyed
+        self.closing = False
+        self.closed = False
 
         # --- UI LAYOUT ---
         self.grid_columnconfigure(0, weight=1)
@@ -75,6 +95,15 @@ class APIApp(ctk.CTk):
         self.lbl_status = ctk.CTkLabel(self.main_frame, text="Status: STOPPED", font=("Roboto", 16), text_color="red")
         self.lbl_status.pack(pady=(20, 10))
 
+        # Worker count (applied live while running)
+        self.workers_frame = ctk.CTkFrame(self.main_frame, fg_color="transparent")
+        self.workers_frame.pack()
+        ctk.CTkLabel(self.workers_frame, text="Workers:", font=("Roboto", 14)).pack(side="left", padx=5)
+        self.opt_workers = ctk.CTkOptionMenu(self.workers_frame, width=70, command=self.resize_workers,
+                                             values=[str(n) for n in range(1, MAX_WORKERS + 1)])
+        self.opt_workers.set(str(self.supervisor.target_workers))
+        self.opt_workers.pack(side="left", padx=5)
+
         # Buttons Row
         self.buttons_frame = ctk.CTkFrame(self.main_frame, fg_color="transparent")
         self.buttons_frame.pack(pady=10)
@@ -120,13 +149,65 @@ class APIApp(ctk.CTk):
         self.btn_test = ctk.CTkButton(self.actions_frame, text="Test Search (Cats)", command=self.open_test, state="disabled")
         self.btn_test.pack(side="right", expand=True, padx=5)
 
+        # Live Dashboard (fed from /admin/stats while the server runs)
+        self.dash_frame = ctk.CTkFrame(self.main_frame)
+        self.dash_frame.pack(pady=(0, 10), fill="x", padx=20)
+        ctk.CTkLabel(self.dash_frame, text="Live Dashboard", font=("Roboto", 14, "bold")).grid(
+            row=0, column=0, columnspan=4, pady=(8, 2))
+        self.dash_values = {}
+        for col, (key, title) in enumerate([("rps", "Requests/s"), ("p95", "p95 Latency"),
+                                            ("hit_rate", "Cache Hit Rate"), ("upstream", "Upstream Errors")]):
+            self.dash_frame.grid_columnconfigure(col, weight=1)
+            ctk.CTkLabel(self.dash_frame, text=title, font=("Roboto", 12), text_color="gray").grid(row=1, column=col)
+            self.dash_values[key] = ctk.CTkLabel(self.dash_frame, text="-", font=("Consolas", 18, "bold"))
+            self.dash_values[key].grid(row=2, column=col, pady=(0, 8))
+
+        # Load Generator (replays a /fetch, /search, /ysp mix against the local server)
+        self.load_frame = ctk.CTkFrame(self.dash_frame, fg_color="transparent")
+        self.load_frame.grid(row=3, column=0, columnspan=4, pady=(0, 5))
+        self.entry_mix = ctk.CTkEntry(self.load_frame, width=190)
+        self.entry_mix.insert(0, ",".join(f"{k}={w}" for k, w in DEFAULT_MIX.items()))
+        self.entry_mix.pack(side="left", padx=5)
+        ctk.CTkLabel(self.load_frame, text="Concurrency:", font=("Roboto", 12)).pack(side="left", padx=5)
+        self.opt_load = ctk.CTkOptionMenu(self.load_frame, width=70,
+                                          values=[str(n) for n in (1, 2, 4, 8, 16, MAX_LOAD_CONCURRENCY)])
+        self.opt_load.set("4")
+        self.opt_load.pack(side="left", padx=5)
+        self.btn_load = ctk.CTkButton(self.load_frame, text="Run Load Test", width=120, command=self.toggle_load,
+                                      state="disabled")
+        self.btn_load.pack(side="left", padx=5)
+        self.lbl_load = ctk.CTkLabel(self.dash_frame, text="Load test: idle", font=("Consolas", 12), text_color="gray")
+        self.lbl_load.grid(row=4, column=0, columnspan=4, pady=(0, 8))
+
         # 4. Footer
         self.footer_frame = ctk.CTkFrame(self, height=40, corner_radius=0)
         self.footer_frame.grid(row=2, column=0, sticky="ew")
         
         self.lbl_info = ctk.CTkLabel(self.footer_frame, text="Ready to extract rich metadata...", font=("Roboto", 12))
         self.lbl_info.pack(pady=10)
+
+        self.after(EVENT_POLL_MS, self._drain_events)
         
+    # --- UI EVENT QUEUE ---
+
+    def post(self, fn, *args, **kwargs):
+        """Schedules fn(*args, **kwargs) on the UI thread. Safe to call from any thread."""
+        self.events.put((fn, args, kwargs))
+
+    def _drain_events(self):
+        while True:
+            try:
+                fn, args, kwargs = self.events.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                fn(*args, **kwargs)
+            except Exception as e:
+                print(f"UI Event Error: {e}")
+            if self.closed:
+                return
+        self.after(EVENT_POLL_MS, self._drain_events)
+
     # --- LOGIC ---
 
     def save_token(self):
@@ -134,6 +215,7 @@ class APIApp(ctk.CTk):
         if token:
             try:
                 # Force kill any existing process to be safe
+                ngrok = get_ngrok()
                 ngrok.kill()
                 ngrok.set_auth_token(token)
                 self.lbl_info.configure(text="Ngrok Token Saved!", text_color="green")
@@ -146,23 +228,152 @@ class APIApp(ctk.CTk):
         if not self.is_running:
             self.start_server()
         else:
-            self.lbl_info.configure(text="To stop fully, close the window.")
-            self.btn_toggle.configure(state="disabled")
+            self.stop_server()
 
     def start_server(self):
+        self.btn_toggle.configure(text="Starting...", state="disabled")
+        threading.Thread(target=self._start_workers, daemon=True).start()
+
+    def _start_workers(self):
+        try:
+            self.supervisor.start()
+        except Exception as e:
+            self.post(self._on_server_error, e)
+            return
+        self.post(self._on_server_started)
+
+    def _on_server_started(self):
         self.is_running = True
         self.lbl_status.configure(text="Status: RUNNING (Local)", text_color="green")
-        self.btn_toggle.configure(text="Running...", fg_color="gray", state="disabled") 
+        self.btn_toggle.configure(text="Stop Server", fg_color="#C0392B", hover_color="#922B21", state="normal")
         self.btn_online.configure(state="normal")
-        
         self.btn_docs.configure(state="normal")
         self.btn_test.configure(state="normal")
-        
-        self.server_thread = threading.Thread(target=self.run_uvicorn, daemon=True)
-        self.server_thread.start()
+        self.btn_load.configure(state="normal")
+        self.lbl_info.configure(text=f"Serving with {self.supervisor.target_workers} worker(s).", text_color="white")
+        self.stats_stop.clear()
+        threading.Thread(target=self._poll_stats, daemon=True).start()
+
+    def _on_server_error(self, error):
+        self.btn_toggle.configure(text="Start Local Server", state="normal")
+        self.lbl_info.configure(text=f"Server Error: {str(error)[:60]}", text_color="red")
 
-    def run_uvicorn(self):
-        uvicorn.run(app, host="0.0.0.0", port=self.port, log_level="error", use_colors=False)
+    def stop_server(self):
+        self.btn_toggle.configure(text="Stopping...", state="disabled")
+        self.stats_stop.set()
+        if self.loadgen:
+            self.loadgen.stop()
+        self.lbl_info.configure(text="Finishing in-flight requests...")
+        threading.Thread(target=self._stop_workers, daemon=True).start()
+
+    def _stop_workers(self):
+        if self.public_url:
+            try:
+                get_ngrok().disconnect(self.public_url)
+            except Exception as e:
+                print(f"Ngrok Disconnect Error: {e}")
+        self.supervisor.stop()
+        self.post(self._on_server_stopped)
+
+    def _on_server_stopped(self):
+        self.is_running = False
+        self.public_url = None
+        self.lbl_status.configure(text="Status: STOPPED", text_color="red")
+        self.btn_toggle.configure(text="Start Local Server", fg_color="green", hover_color="darkgreen", state="normal")
+        self.btn_online.configure(text="Go Online (ngrok)", fg_color="#3B8ED0", state="disabled")
+        self.lbl_public.configure(text="Public URL: (Not Connected)", text_color="gray")
+        self.btn_docs.configure(state="disabled")
+        self.btn_test.configure(state="disabled")
+        self.btn_load.configure(text="Run Load Test", state="disabled")
+        for label in self.dash_values.values():
+            label.configure(text="-", text_color="white")
+        self.lbl_info.configure(text="Server stopped.", text_color="white")
+
+    def resize_workers(self, value):
+        workers = int(value)
+        if not self.is_running:
+            self.supervisor.target_workers = workers
+            return
+        self.lbl_info.configure(text=f"Resizing to {workers} worker(s)...")
+        threading.Thread(target=self._resize_workers, args=(workers,), daemon=True).start()
+
+    def _resize_workers(self, workers):
+        self.supervisor.resize(workers)
+        self.post(self.lbl_info.configure, text=f"Serving with {workers} worker(s).")
+
+    # --- DASHBOARD ---
+
+    def _poll_stats(self):
+        import requests
+        session = requests.Session()
+        while not self.stats_stop.is_set():
+            try:
+                stats = session.get(f"http://localhost:{self.port}/admin/stats", timeout=2).json()
+                self.post(self._show_stats, stats)
+            except Exception as e:
+                print(f"Dashboard Poll Error: {e}")
+            self.stats_stop.wait(STATS_INTERVAL)
+        session.close()
+
+    def _show_stats(self, stats):
+        if not self.is_running:
+            return
+        requests_now = stats["activity"]["requests"]
+        upstream = stats["activity"]["upstream"]
+        hit_rate = stats["activity"]["metadata_cache"]["hit_rate"]
+        self.dash_values["rps"].configure(text=f"{requests_now['per_s']:.1f}")
+        self.dash_values["p95"].configure(text=f"{requests_now['p95_ms']:.0f} ms" if requests_now["count"] else "-")
+        self.dash_values["hit_rate"].configure(text=f"{hit_rate:.0%}" if hit_rate is not None else "-")
+        error_rate = upstream["error_rate"]
+        self.dash_values["upstream"].configure(
+            text=f"{error_rate:.0%}" if error_rate is not None else "-",
+            text_color="red" if error_rate and error_rate >= 0.1 else "orange" if error_rate else "white")
+
+    def toggle_load(self):
+        if self.loadgen and self.loadgen.running:
+            self.loadgen.stop()
+            self.btn_load.configure(text="Stopping...", state="disabled")
+            return
+        try:
+            mix = parse_mix(self.entry_mix.get())
+        except ValueError as e:
+            self.lbl_info.configure(text=f"Load mix: {e}", text_color="orange")
+            return
+        self.loadgen = LoadGenerator(f"http://localhost:{self.port}", mix, int(self.opt_load.get()),
+                                     on_update=lambda summary: self.post(self._show_load, summary))
+        self.loadgen.start()
+        self.btn_load.configure(text="Stop Load Test")
+        self.lbl_load.configure(text="Load test: starting...", text_color="white")
+
+    def _show_load(self, summary):
+        recent = summary["recent"]
+        state = "done" if summary["finished"] else f"{summary['elapsed_s']:.0f}s"
+        self.lbl_load.configure(
+            text=f"Load test ({state}, x{summary['concurrency']}): {recent['per_s']:.1f} req/s, "
+                 f"p95 {recent['p95_ms']:.0f} ms, {summary['errors']}/{summary['sent']} errors",
+            text_color="red" if summary["errors"] else "white")
+        if summary["finished"]:
+            self.btn_load.configure(text="Run Load Test", state="normal" if self.is_running else "disabled")
+
+    def on_close(self):
+        if self.closing:
+            return
+        self.closing = True
+        self.stats_stop.set()
+        if self.loadgen:
+            self.loadgen.stop()
+        # Stopping workers waits for their in-flight requests: keep the window responsive meanwhile
+        self.btn_toggle.configure(state="disabled")
+        self.lbl_info.configure(text="Finishing in-flight requests before closing...", text_color="white")
+        threading.Thread(target=self._close_workers, daemon=True).start()
+
+    def _close_workers(self):
+        self.supervisor.stop()
+        self.post(self._on_closed)
+
+    def _on_closed(self):
+        self.closed = True
+        self.destroy()
 
     def toggle_online(self):
         if not self.public_url:
@@ -177,15 +388,23 @@ class APIApp(ctk.CTk):
 
     def _connect_ngrok(self):
         try:
-            self.public_url = ngrok.connect(self.port).public_url
-            self.lbl_status.configure(text=f"Status: ONLINE (Globally Accessible)", text_color="#3B8ED0")
-            self.lbl_public.configure(text=f"Public URL: {self.public_url}", text_color="#3B8ED0", cursor="hand2")
-            self.btn_online.configure(text="Online Active", fg_color="green")
-            self.lbl_info.configure(text="Tunnel established! Use Public URL for n8n.")
+            public_url = get_ngrok().connect(self.port).public_url
         except Exception as e:
-            self.lbl_info.configure(text=f"Ngrok Error: {str(e)[:50]}...", text_color="red")
-            self.btn_online.configure(text="Go Online (ngrok)", state="normal", fg_color="#3B8ED0")
             print(f"Ngrok Detail Error: {e}")
+            self.post(self._on_online_error, e)
+            return
+        self.post(self._on_online, public_url)
+
+    def _on_online(self, public_url):
+        self.public_url = public_url
+        self.lbl_status.configure(text="Status: ONLINE (Globally Accessible)", text_color="#3B8ED0")
+        self.lbl_public.configure(text=f"Public URL: {self.public_url}", text_color="#3B8ED0", cursor="hand2")
+        self.btn_online.configure(text="Online Active", fg_color="green")
+        self.lbl_info.configure(text="Tunnel established! Use Public URL for n8n.")
+
+    def _on_online_error(self, error):
+        self.lbl_info.configure(text=f"Ngrok Error: {str(error)[:50]}...", text_color="red")
+        self.btn_online.configure(text="Go Online (ngrok)", state="normal", fg_color="#3B8ED0")
 
     def open_browser(self, url):
         target = url if url else f"http://localhost:{self.port}"
@@ -203,5 +422,7 @@ class APIApp(ctk.CTk):
         webbrowser.open("https://github.com/expher510/YouTube_Shorts_API-and-Control_Panel")
 
 if __name__ == "__main__":
+    # Worker processes of the bundled EXE start through here
+    multiprocessing.freeze_support()
     app_gui = APIApp()
     app_gui.mainloop()
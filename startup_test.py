@@ -0,0 +1,63 @@
+"""Import-time budget check for the API and the control panel.
+
+Fails (exit code 1) if importing a module takes longer than its budget, or
+if it pulls in a dependency that is supposed to load lazily on first use.
+Each import runs in a fresh interpreter; the best of a few runs is used.
+
+    python startup_test.py
+    STARTUP_BUDGET_SCALE=2 python startup_test.py   # slower machine / CI
+"""
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+
+RUNS = 3
+SCALE = float(os.environ.get("STARTUP_BUDGET_SCALE", 1))
+
+# module -> (budget in ms, modules that must not be imported at startup)
+CHECKS = {
+    "short_api": (1200, ["youtubesearchpython", "youtube_transcript_api", "httpx", "yt_dlp", "PIL", "pyngrok"]),
+    "short_app": (1200, ["short_api", "fastapi", "youtubesearchpython", "youtube_transcript_api", "PIL", "pyngrok"]),
+}
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = (time.perf_counter() - started) * 1000
+print(json.dumps({{"ms": elapsed, "modules": sorted(sys.modules)}}))
+"""
+
+
+def measure(module: str) -> dict:
+    best = None
+    for _ in range(RUNS):
+        out = subprocess.run([sys.executable, "-c", PROBE.format(module=module)], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        if best is None or result["ms"] < best["ms"]:
+            best = result
+    return best
+
+
+def main() -> int:
+    failures = 0
+    for module, (budget, forbidden) in CHECKS.items():
+        if module == "short_app" and importlib.util.find_spec("customtkinter") is None:
+            print(f"SKIP  {module}: customtkinter not installed")
+            continue
+        result = measure(module)
+        budget *= SCALE
+        loaded = [m for m in forbidden if m in result["modules"]]
+        ok = result["ms"] <= budget and not loaded
+        failures += not ok
+        print(f"{'OK  ' if ok else 'FAIL'}  {module}: {result['ms']:.0f} ms (budget {budget:.0f} ms)")
+        for m in loaded:
+            print(f"      eagerly imports {m}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
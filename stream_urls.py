@@ -0,0 +1,95 @@
+"""Direct stream URL resolution for /ysp/stream_url.
+
+One StreamURLFetcher (and its yt-dlp extractor) is built on first use and
+reused. Each video's formats are deciphered in a single pass and the signed
+URLs are cached until the `expire=` timestamp they carry.
+"""
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import settings
+from concurrency import SingleFlight
+from metrics import span
+
+
+def url_expiry(url: str) -> Optional[float]:
+    """The `expire=` unix timestamp signed into a googlevideo URL, if any."""
+    try:
+        return float(parse_qs(urlsplit(url).query)["expire"][0])
+    except (KeyError, ValueError, IndexError):
+        return None
+
+
+class StreamResolver:
+    def __init__(self, default_ttl: float, expiry_margin: float, max_entries: int):
+        self.default_ttl = default_ttl
+        self.expiry_margin = expiry_margin
+        self.max_entries = max_entries
+        self._fetcher = None
+        # StreamURLFetcher keeps per-call state on the instance: one decipher at a time
+        self._fetcher_lock = threading.Lock()
+        self._cache: Dict[str, Tuple[float, List[dict]]] = {}
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self.counters = {"hits": 0, "misses": 0, "expired": 0}
+
+    def _get_fetcher(self):
+        # Built lazily: construction fails without yt-dlp, and the rest of the API doesn't need it
+        if self._fetcher is None:
+            from youtubesearchpython import StreamURLFetcher
+            self._fetcher = StreamURLFetcher()
+        return self._fetcher
+
+    def _resolve(self, video_id: str) -> Tuple[float, List[dict]]:
+        from youtubesearchpython import Video
+        with span("ysp.stream_formats"):
+            formats = Video.getFormats(video_id)
+        with self._fetcher_lock, span("ysp.stream_decipher"):
+            streams = list(self._get_fetcher().getAll(formats)["streams"])
+
+        expiries = [e for e in (url_expiry(s.get("url") or "") for s in streams) if e]
+        expires_at = min(expiries) if expiries else time.time() + self.default_ttl
+        with self._lock:
+            if len(self._cache) >= self.max_entries:
+                self._purge(time.time())
+            self._cache[video_id] = (expires_at, streams)
+        return expires_at, streams
+
+    def _purge(self, now: float) -> None:
+        for key in [k for k, (exp, _) in self._cache.items() if exp - self.expiry_margin <= now]:
+            del self._cache[key]
+        while len(self._cache) >= self.max_entries:
+            # Still full: drop whatever expires soonest
+            del self._cache[min(self._cache, key=lambda k: self._cache[k][0])]
+
+    def streams(self, video_id: str) -> Tuple[float, List[dict]]:
+        """(expires_at, all deciphered streams) for a video, from cache while the URLs are valid."""
+        now = time.time()
+        with self._lock:
+            entry = self._cache.get(video_id)
+            if entry and entry[0] - self.expiry_margin > now:
+                self.counters["hits"] += 1
+                return entry
+            self.counters["expired" if entry else "misses"] += 1
+        return self._flight.do(video_id, self._resolve, video_id)
+
+    def select(self, video_id: str, itags: Optional[Sequence[int]]) -> Tuple[float, List[dict]]:
+        """Streams restricted to `itags` (in the caller's preference order); all of them if None."""
+        expires_at, streams = self.streams(video_id)
+        if itags is None:
+            return expires_at, streams
+        by_itag = {s.get("itag"): s for s in streams}
+        return expires_at, [by_itag[i] for i in itags if i in by_itag]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self.counters, "entries": len(self._cache), "fetcher_ready": self._fetcher is not None}
+
+
+stream_resolver = StreamResolver(
+    default_ttl=settings.STREAM_URL_DEFAULT_TTL,
+    expiry_margin=settings.STREAM_URL_EXPIRY_MARGIN,
+    max_entries=settings.STREAM_URL_MAX_ENTRIES,
+)
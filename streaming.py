@@ -0,0 +1,42 @@
+"""Paging cursors and NDJSON/SSE encoding shared by the core and /ysp endpoints."""
+import base64
+import json
+from typing import Iterable, Literal, Optional, Sequence
+
+from fastapi.responses import StreamingResponse
+
+from encoding import dumps
+
+StreamFormat = Optional[Literal["ndjson", "sse"]]
+
+
+# --- CURSORS ---
+
+def encode_cursor(state: dict) -> str:
+    raw = json.dumps(state, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, kinds: Sequence[str]) -> dict:
+    """Raises ValueError on anything that isn't a cursor we issued (for one of `kinds`)."""
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError("Invalid cursor.")
+    if not isinstance(state, dict) or state.get("k") not in kinds:
+        raise ValueError("Invalid cursor.")
+    return state
+
+
+# --- STREAMING ---
+
+def encode_event(fmt: str, kind: str, payload: dict) -> str:
+    """One NDJSON line or SSE event."""
+    if fmt == "sse":
+        return f"event: {kind}\ndata: {dumps(payload)}\n\n"
+    return dumps({"type": kind, **payload}) + "\n"
+
+
+def event_stream(events: Iterable[str], fmt: str) -> StreamingResponse:
+    media_type = "text/event-stream" if fmt == "sse" else "application/x-ndjson"
+    return StreamingResponse(events, media_type=media_type, headers={"Cache-Control": "no-cache"})
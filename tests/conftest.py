@@ -0,0 +1,11 @@
+"""Shared test setup: the app modules are imported from the repo root, with every SQLite store in a throwaway DATA_DIR."""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Settings are read at import time: configure before any test imports the app
+os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="shorts-tests-")
+os.environ["RATE_LIMIT_RATE"] = "1000"
+os.environ["RATE_LIMIT_BURST"] = "1000"
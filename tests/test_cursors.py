@@ -0,0 +1,65 @@
+import pytest
+
+import short_api
+from bench import fixtures
+from bench.stand_in import StandInServer
+from streaming import decode_cursor, encode_cursor
+
+
+@pytest.fixture(scope="module")
+def youtube():
+    """The offline stand-in, serving a 2-page hashtag feed and search (fixtures.PAGE_SIZE items per page)."""
+    stand_in = StandInServer(latency_ms=0, jitter_ms=0, pages=2).start()
+    original = short_api.YOUTUBE
+    short_api.YOUTUBE = stand_in.base_url
+    yield stand_in
+    short_api.YOUTUBE = original
+    stand_in.stop()
+
+
+def test_cursor_round_trip():
+    state = {"k": "search", "q": "cats", "t": "page-1", "s": 3}
+    assert decode_cursor(encode_cursor(state), kinds=("search",)) == state
+
+
+@pytest.mark.parametrize("cursor", ["", "not a cursor", encode_cursor(["search"]), encode_cursor({"q": "cats"})])
+def test_decode_rejects_garbage(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, kinds=("search",))
+
+
+def test_decode_rejects_other_kind():
+    cursor = encode_cursor({"k": "comments", "v": "abcdefghijk", "t": None, "s": 0})
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, kinds=("search", "browse"))
+
+
+def test_scan_cursor_rejects_other_endpoint_and_term():
+    search = encode_cursor({"k": "search", "q": "cats", "t": None, "s": 5})
+    assert short_api.decode_scan_cursor(search, "cats", is_hashtag=False)["s"] == 5
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        short_api.decode_scan_cursor(search, "cats", is_hashtag=True)
+    with pytest.raises(ValueError, match="different query"):
+        short_api.decode_scan_cursor(search, "dogs", is_hashtag=False)
+
+
+@pytest.mark.parametrize("is_hashtag", [False, True])
+def test_scan_pages_resume_without_gaps_or_repeats(youtube, is_hashtag):
+    everything, end = short_api.scan_videos("cats", is_hashtag, limit=100)
+    assert end is None
+    assert len(everything) == 2 * fixtures.PAGE_SIZE
+
+    paged, cursor = [], None
+    for _ in range(10):
+        # 7 doesn't divide the page size, so some calls stop mid-page and others span two pages
+        items, cursor = short_api.scan_videos("cats", is_hashtag, limit=7, cursor=cursor)
+        paged += items
+        if cursor is None:
+            break
+    assert [it["video_id"] for it in paged] == [it["video_id"] for it in everything]
+
+
+def test_scan_rejects_cursor_from_other_endpoint(youtube):
+    _, cursor = short_api.scan_videos("cats", is_hashtag=False, limit=5)
+    with pytest.raises(ValueError):
+        short_api.scan_videos("cats", is_hashtag=True, limit=5, cursor=cursor)
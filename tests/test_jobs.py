@@ -0,0 +1,88 @@
+import threading
+
+import pytest
+
+from jobs import CANCELLED, DONE, QUEUED, RUNNING, JobCancelled, JobRunner, JobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite3"))
+
+
+def test_claim_is_exclusive(store):
+    job = store.create("ids", {"ids": ["a"]})
+    assert store.claim(job["id"])
+    assert not store.claim(job["id"])
+    assert store.get(job["id"])["status"] == RUNNING
+
+
+def test_claim_is_exclusive_across_connections(store, tmp_path):
+    # Two worker processes each open their own connection to the same file
+    other = JobStore(str(tmp_path / "jobs.sqlite3"))
+    job = store.create("ids", {"ids": ["a"]})
+    results = []
+    threads = [threading.Thread(target=lambda s=s: results.append(s.claim(job["id"]))) for s in (store, other)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(results) == [False, True]
+
+
+def test_release_requeues_only_running_jobs(store):
+    running = store.create("ids", {})
+    done = store.create("ids", {})
+    cancelled = store.create("ids", {})
+    for job in (running, done, cancelled):
+        store.claim(job["id"])
+    store.finish(done["id"], DONE)
+    store.cancel(cancelled["id"])
+
+    store.release([running["id"], done["id"], cancelled["id"]])
+    assert store.get(running["id"])["status"] == QUEUED
+    assert store.get(done["id"])["status"] == DONE
+    assert store.get(cancelled["id"])["status"] == CANCELLED
+    assert store.claim(running["id"])
+
+
+def test_results_are_deduplicated_and_counted(store):
+    job = store.create("ids", {})
+    store.add_result(job["id"], 0, {"video_id": "a"})
+    store.add_result(job["id"], 1, {"video_id": "b"})
+    store.add_result(job["id"], 1, {"video_id": "b"})
+    assert store.get(job["id"])["done"] == 2
+    assert store.result_ids(job["id"]) == {"a", "b"}
+    assert [v["video_id"] for v in store.results(job["id"], 0, 10)] == ["a", "b"]
+
+
+def test_shutdown_releases_a_job_only_after_its_runner_stops(store):
+    started, proceed = threading.Event(), threading.Event()
+    seen_status = []
+
+    def execute(job, st):
+        st.add_result(job["id"], 0, {"video_id": "a"})
+        started.set()
+        proceed.wait(5)
+        # Still ours while this runner can write to it
+        seen_status.append(st.get(job["id"])["status"])
+        if runner.should_stop(job["id"]):
+            raise JobCancelled()
+
+    runner = JobRunner(store, 1, execute, resume=False)
+    job = store.create("ids", {})
+    runner.submit(job["id"])
+    assert started.wait(5)
+
+    runner.shutdown()
+    assert store.get(job["id"])["status"] == RUNNING
+    assert not store.claim(job["id"])
+
+    proceed.set()
+    for _ in range(100):
+        if store.get(job["id"])["status"] == QUEUED:
+            break
+        threading.Event().wait(0.02)
+    assert seen_status == [RUNNING]
+    assert store.get(job["id"])["status"] == QUEUED
+    assert store.result_ids(job["id"]) == {"a"}
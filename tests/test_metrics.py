@@ -0,0 +1,53 @@
+import pytest
+
+from metrics import RecentWindow, merge_windows, percentile
+
+
+@pytest.mark.parametrize("values, pct, expected", [
+    ([], 95, 0.0),
+    ([7], 95, 7),
+    ([1, 2, 3, 4], 50, 2),
+    ([4, 3, 2, 1], 100, 4),
+    ([1, 2, 3, 4], 0, 1),
+    (list(range(1, 21)), 95, 19),
+    (list(range(1, 101)), 95, 95),
+    (list(range(1, 101)), 99, 99),
+])
+def test_percentile_is_nearest_rank(values, pct, expected):
+    assert percentile(values, pct) == expected
+
+
+def snapshot(latencies, errors=0, span=10.0, window=30.0):
+    return {"window_s": window, "span_s": span, "latencies_ms": latencies, "errors": errors}
+
+
+def test_merge_windows_sums_rates_and_pools_samples():
+    merged = merge_windows([
+        snapshot([10.0] * 19, errors=1, span=10.0),
+        snapshot([500.0], errors=1, span=2.0, window=60.0),
+    ])
+    assert merged == {"window_s": 60.0, "count": 20, "per_s": 2.4, "p95_ms": 10.0, "error_rate": 0.1}
+
+    merged = merge_windows([snapshot([10.0] * 18), snapshot([500.0, 500.0])])
+    assert merged["p95_ms"] == 500.0
+
+
+def test_merge_windows_short_span_counts_as_one_second():
+    assert merge_windows([snapshot([1.0, 2.0], span=0.0)])["per_s"] == 2.0
+
+
+def test_merge_windows_empty():
+    assert merge_windows([]) == {"window_s": 0.0, "count": 0, "per_s": 0, "p95_ms": 0.0, "error_rate": None}
+    merged = merge_windows([snapshot([], span=0.0)])
+    assert merged["count"] == 0 and merged["error_rate"] is None
+
+
+def test_recent_window_summary_matches_its_snapshot():
+    window = RecentWindow(window=30)
+    for ms in (10, 20, 30):
+        window.record(ms / 1000)
+    window.record(0.04, error=True)
+    snap = window.snapshot()
+    assert snap["latencies_ms"] == [10.0, 20.0, 30.0, 40.0] and snap["errors"] == 1
+    summary = window.summary()
+    assert summary["count"] == 4 and summary["p95_ms"] == 40.0 and summary["error_rate"] == 0.25
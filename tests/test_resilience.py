@@ -0,0 +1,200 @@
+import time
+
+import pytest
+
+import resilience
+from concurrency import TokenBucket
+from resilience import CircuitBreaker, CircuitOpenError, DeadlineExceeded, UpstreamGuard, deadline_scope
+
+URL = "https://upstream.test/watch"
+HOST = "upstream.test"
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def replay(*outcomes):
+    """A send() that returns (or raises) the given outcomes in order and records the time_left it got."""
+    queue = list(outcomes)
+    calls = []
+
+    def send(left):
+        calls.append(left)
+        outcome = queue.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+    send.calls = calls
+    return send
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(resilience.time, "sleep", slept.append)
+    return slept
+
+
+def make_guard(attempts=3, failures=10, reset=60.0, base=0.01, max_delay=1.0):
+    return UpstreamGuard(CircuitBreaker(failures, reset), attempts, base, max_delay)
+
+
+# --- RETRIES ---
+
+@pytest.mark.parametrize("status", sorted(resilience.RETRY_STATUSES))
+def test_retries_retryable_status_then_succeeds(sleeps, status):
+    first = FakeResponse(status)
+    guard = make_guard()
+    res = guard.call(URL, replay(first, FakeResponse(200)), (OSError,))
+    assert res.status_code == 200
+    assert first.closed
+    assert len(sleeps) == 1 and 0 <= sleeps[0] <= 0.01
+    assert guard.breaker.stats()[HOST] == {"state": "closed", "failures": 0}
+
+
+def test_does_not_retry_other_errors(sleeps):
+    send = replay(FakeResponse(404))
+    assert make_guard().call(URL, send, (OSError,)).status_code == 404
+    assert len(send.calls) == 1 and not sleeps
+
+
+def test_returns_last_failed_response_when_attempts_run_out(sleeps):
+    last = FakeResponse(503)
+    send = replay(FakeResponse(503), FakeResponse(503), last)
+    assert make_guard(attempts=3).call(URL, send, (OSError,)) is last
+    assert not last.closed
+    assert len(sleeps) == 2
+
+
+def test_honours_retry_after(sleeps):
+    send = replay(FakeResponse(429, {"Retry-After": "0.5"}), FakeResponse(200))
+    make_guard(max_delay=1.0).call(URL, send, (OSError,))
+    assert sleeps == [0.5]
+
+
+def test_ignores_unparseable_retry_after(sleeps):
+    send = replay(FakeResponse(429, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}), FakeResponse(200))
+    make_guard().call(URL, send, (OSError,))
+    assert len(sleeps) == 1 and sleeps[0] <= 0.01
+
+
+def test_retry_after_beyond_max_delay_returns_immediately(sleeps):
+    limited = FakeResponse(429, {"Retry-After": "120"})
+    send = replay(limited, FakeResponse(200))
+    assert make_guard(max_delay=1.0).call(URL, send, (OSError,)) is limited
+    assert len(send.calls) == 1 and not sleeps
+
+
+def test_retries_network_errors_and_reraises_the_last(sleeps):
+    send = replay(OSError("reset"), OSError("refused"))
+    with pytest.raises(OSError, match="refused"):
+        make_guard(attempts=2).call(URL, send, (OSError,))
+    assert len(sleeps) == 1
+
+
+def test_passes_time_left_to_send(sleeps):
+    send = replay(FakeResponse(200))
+    with deadline_scope(5):
+        make_guard().call(URL, send, (OSError,))
+    assert 0 < send.calls[0] <= 5
+    send = replay(FakeResponse(200))
+    make_guard().call(URL, send, (OSError,))
+    assert send.calls == [None]
+
+
+def test_expired_deadline_raises_before_sending():
+    send = replay(FakeResponse(200))
+    with deadline_scope(0.001):
+        time.sleep(0.01)
+        with pytest.raises(DeadlineExceeded):
+            make_guard().call(URL, send, (OSError,))
+    assert not send.calls
+
+
+def test_backoff_past_deadline_raises(sleeps):
+    send = replay(FakeResponse(503, {"Retry-After": "0.9"}), FakeResponse(200))
+    with deadline_scope(0.5):
+        with pytest.raises(DeadlineExceeded):
+            make_guard(max_delay=1.0).call(URL, send, (OSError,))
+    assert len(send.calls) == 1 and not sleeps
+
+
+def test_rate_limit_wait_past_deadline_raises():
+    bucket = TokenBucket(rate=1, burst=1)
+    assert bucket.acquire(max_wait=0.1) == 0.0
+    with pytest.raises(DeadlineExceeded):
+        bucket.acquire(max_wait=0.1)
+
+
+# --- CIRCUIT BREAKER ---
+
+def test_breaker_opens_after_threshold_and_rejects():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    for _ in range(2):
+        breaker.failure(HOST)
+        breaker.before(HOST)
+    assert breaker.stats()[HOST] == {"state": "closed", "failures": 2}
+    breaker.failure(HOST)
+    assert breaker.stats()[HOST]["state"] == "open"
+    with pytest.raises(CircuitOpenError) as err:
+        breaker.before(HOST)
+    assert err.value.host == HOST and 0 < err.value.retry_in <= 60
+    breaker.before("other.test")
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.failure(HOST)
+    breaker.success(HOST)
+    breaker.failure(HOST)
+    breaker.before(HOST)
+    assert breaker.stats()[HOST] == {"state": "closed", "failures": 1}
+
+
+def test_half_open_lets_one_probe_through_and_closes_on_success():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.failure(HOST)
+    time.sleep(0.06)
+    assert breaker.stats()[HOST]["state"] == "half_open"
+    breaker.before(HOST)
+    with pytest.raises(CircuitOpenError):
+        breaker.before(HOST)
+    breaker.success(HOST)
+    assert breaker.stats()[HOST]["state"] == "closed"
+    breaker.before(HOST)
+
+
+def test_failed_probe_reopens_the_circuit():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.failure(HOST)
+    time.sleep(0.06)
+    breaker.before(HOST)
+    breaker.failure(HOST)
+    assert breaker.stats()[HOST]["state"] == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before(HOST)
+
+
+def test_abandoned_probe_allows_another():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.failure(HOST)
+    time.sleep(0.06)
+    breaker.before(HOST)
+    breaker.abandon(HOST)
+    breaker.before(HOST)
+
+
+def test_guard_fails_fast_while_open(sleeps):
+    guard = make_guard(attempts=2, failures=2)
+    send = replay(FakeResponse(500), FakeResponse(500), FakeResponse(200))
+    assert guard.call(URL, send, (OSError,)).status_code == 500
+    with pytest.raises(CircuitOpenError):
+        guard.call(URL, send, (OSError,))
+    assert len(send.calls) == 2
@@ -0,0 +1,83 @@
+import time
+
+import pytest
+
+from watches import WatchStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return WatchStore(str(tmp_path / "watches.sqlite3"), retention=3600)
+
+
+@pytest.fixture
+def watch(store):
+    return store.create("hashtag", "cats", {}, interval=60)
+
+
+def video(video_id):
+    return {"video_id": video_id, "title": f"Video {video_id}"}
+
+
+def test_unseen_drops_ids_already_seen(store, watch):
+    assert store.unseen(watch["id"], ["a", "b"]) == ["a", "b"]
+    store.mark_seen(watch["id"], ["a"])
+    store.add_video(watch["id"], video("b"))
+    assert store.unseen(watch["id"], ["c", "a", "b", "d"]) == ["c", "d"]
+    assert store.unseen(watch["id"], []) == []
+
+
+def test_seen_index_is_per_watch(store, watch):
+    other = store.create("search", "dogs", {}, interval=60)
+    store.add_video(watch["id"], video("a"))
+    assert store.unseen(other["id"], ["a"]) == ["a"]
+
+
+def test_baseline_is_remembered_but_not_reported(store, watch):
+    store.mark_seen(watch["id"], ["a", "b"])
+    store.add_video(watch["id"], video("c"))
+    assert [e["video"]["video_id"] for e in store.new_since(watch["id"], 0, 10)] == ["c"]
+    assert store.get(watch["id"])["seen"] == 3
+
+
+def test_duplicates_are_recorded_once(store, watch):
+    store.add_video(watch["id"], video("a"))
+    store.add_video(watch["id"], {**video("a"), "title": "changed"})
+    store.mark_seen(watch["id"], ["a", "a"])
+    entries = store.new_since(watch["id"], 0, 10)
+    assert len(entries) == 1 and entries[0]["video"]["title"] == "Video a"
+    assert store.get(watch["id"])["seen"] == 1
+
+
+def test_new_since_pages_by_seq(store, watch):
+    for v in "abc":
+        store.add_video(watch["id"], video(v))
+    first = store.new_since(watch["id"], 0, 2)
+    assert [e["video"]["video_id"] for e in first] == ["a", "b"]
+    rest = store.new_since(watch["id"], first[-1]["seq"], 2)
+    assert [e["video"]["video_id"] for e in rest] == ["c"]
+    assert store.get(watch["id"])["latest_seq"] == rest[-1]["seq"]
+
+
+def test_prune_keeps_ids_in_the_seen_index(tmp_path):
+    store = WatchStore(str(tmp_path / "watches.sqlite3"), retention=0)
+    watch = store.create("hashtag", "cats", {}, interval=60)
+    store.add_video(watch["id"], video("a"))
+    time.sleep(0.01)
+    assert store.prune() == 1
+    assert store.new_since(watch["id"], 0, 10) == []
+    assert store.unseen(watch["id"], ["a", "b"]) == ["b"]
+
+
+def test_delete_forgets_the_seen_index(store, watch):
+    store.add_video(watch["id"], video("a"))
+    assert store.delete(watch["id"])
+    assert store.unseen(watch["id"], ["a"]) == ["a"]
+
+
+def test_claim_runs_a_due_watch_once(store, watch):
+    now = time.time()
+    assert store.due_ids(now) == [watch["id"]]
+    assert store.claim(watch["id"], now)
+    assert not store.claim(watch["id"], now)
+    assert store.due_ids(now) == []
@@ -0,0 +1,205 @@
+"""Thumbnail resolution and an on-disk cache with an LRU size cap.
+
+`maxresdefault.jpg` is missing for many Shorts, so the first request for
+a video probes the variants from largest to smallest, keeps the first one
+that exists, and caches its bytes. Resized copies (Pillow, optional and
+imported on first use) are cached the same way. Files live in
+DATA_DIR/thumbnails; a small SQLite index tracks size and last access so
+the least recently served files are evicted past the size cap.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Optional
+
+import settings
+from concurrency import SingleFlight
+from http_client import client
+from metrics import span
+
+# Largest first; hqdefault exists for practically every video
+VARIANTS = ("maxresdefault", "sddefault", "hqdefault", "mqdefault", "default")
+
+
+class ThumbnailNotFound(Exception):
+    pass
+
+
+@dataclass
+class Thumbnail:
+    data: bytes
+    etag: str
+    variant: str
+
+
+# Built on first resize (PIL is optional and slow to import)
+_pillow = None
+
+
+def get_pillow():
+    """PIL.Image, or None if Pillow isn't installed."""
+    global _pillow
+    if _pillow is None:
+        try:
+            from PIL import Image
+            _pillow = Image
+        except ImportError:
+            _pillow = False
+    return _pillow or None
+
+
+class ThumbnailCache:
+    def __init__(self, directory: str, max_bytes: int, base_url: str = settings.THUMBNAIL_BASE_URL):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.base_url = base_url
+        self._flight = SingleFlight()
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "resized": 0, "evictions": 0}
+
+        os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(directory, "index.sqlite3"), check_same_thread=False, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS files (key TEXT PRIMARY KEY, variant TEXT, size INTEGER, etag TEXT, last_access REAL)"
+        )
+        self._db.commit()
+
+    # --- INTERNAL HELPERS ---
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".jpg")
+
+    def _read(self, key: str) -> Optional[Thumbnail]:
+        with self._lock:
+            row = self._db.execute("SELECT variant, etag FROM files WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            try:
+                with open(self._path(key), "rb") as f:
+                    data = f.read()
+            except OSError:
+                # File removed behind our back: forget it and fetch again
+                self._db.execute("DELETE FROM files WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+            self._db.execute("UPDATE files SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+        return Thumbnail(data, row[1], row[0])
+
+    def _write(self, key: str, variant: str, data: bytes) -> Thumbnail:
+        etag = '"%s"' % hashlib.sha1(data).hexdigest()[:20]
+        path = self._path(key)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)", (key, variant, len(data), etag, time.time()))
+            self._evict()
+            self._db.commit()
+        return Thumbnail(data, etag, variant)
+
+    def _evict(self) -> None:
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM files").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._db.execute("SELECT key, size FROM files ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM files WHERE key = ?", (key,))
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            total -= size
+            self.counters["evictions"] += 1
+
+    def _resolve(self, video_id: str) -> Thumbnail:
+        for variant in VARIANTS:
+            with span("thumbnail.fetch"):
+                res = client.get(f"{self.base_url}/{video_id}/{variant}.jpg")
+            if res.status_code == 404:
+                continue
+            res.raise_for_status()
+            return self._write(video_id, variant, res.content)
+        raise ThumbnailNotFound(video_id)
+
+    def _resize(self, key: str, original: Thumbnail, width: int) -> Thumbnail:
+        Image = get_pillow()
+        with span("thumbnail.resize"):
+            image = Image.open(BytesIO(original.data))
+            if image.width <= width:
+                # Never upscale: the original is already small enough
+                return original
+            height = max(1, round(image.height * width / image.width))
+            out = BytesIO()
+            image.convert("RGB").resize((width, height), Image.LANCZOS).save(out, "JPEG", quality=85, optimize=True)
+        self._count("resized")
+        return self._write(key, original.variant, out.getvalue())
+
+    # --- PUBLIC API ---
+
+    def original(self, video_id: str) -> Thumbnail:
+        cached = self._read(video_id)
+        if cached:
+            self._count("hits")
+            return cached
+        self._count("misses")
+        return self._flight.do(video_id, self._resolve, video_id)
+
+    def url(self, video_id: str, probe: bool = False) -> str:
+        """Upstream URL of the variant that exists for the video.
+
+        Without `probe` only an already resolved variant is used (else the
+        maxresdefault guess); with it, the variants are probed like /thumbnails does.
+        """
+        if probe:
+            variant = self.original(video_id).variant
+        else:
+            with self._lock:
+                row = self._db.execute("SELECT variant FROM files WHERE key = ?", (video_id,)).fetchone()
+            variant = row[0] if row else VARIANTS[0]
+        return f"{self.base_url}/{video_id}/{variant}.jpg"
+
+    def get(self, video_id: str, width: Optional[int] = None) -> Thumbnail:
+        """Best available thumbnail, resized to `width` when asked (and Pillow is installed)."""
+        if not width or get_pillow() is None:
+            return self.original(video_id)
+        key = f"{video_id}_w{width}"
+        cached = self._read(key)
+        if cached:
+            self._count("hits")
+            return cached
+        return self._flight.do(key, self._resize, key, self.original(video_id), width)
+
+    def invalidate(self) -> int:
+        """Drops every cached file. Returns files removed."""
+        with self._lock:
+            keys = [r[0] for r in self._db.execute("SELECT key FROM files").fetchall()]
+            self._db.execute("DELETE FROM files")
+            self._db.commit()
+        for key in keys:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+        return len(keys)
+
+    def stats(self) -> dict:
+        with self._lock:
+            files, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM files").fetchone()
+            counters = dict(self.counters)
+        return {**counters, "files": files, "bytes": size, "max_bytes": self.max_bytes,
+                "resize_available": get_pillow() is not None}
+
+
+thumbnail_cache = ThumbnailCache(os.path.join(settings.DATA_DIR, "thumbnails"), settings.THUMBNAIL_CACHE_MB * 1024 * 1024)
@@ -0,0 +1,109 @@
+"""Persistent, compressed transcript store keyed by (video_id, language).
+
+A published transcript practically never changes, so positive entries
+never expire. "No transcript" answers are cached per requested language
+with their own expiry, so repeated harvests skip the round trips too.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Iterable, Optional
+
+import settings
+
+STATUS_OK = "ok"
+STATUS_NONE = "none"
+
+
+class TranscriptStore:
+    def __init__(self, path: str, negative_ttl: float):
+        self.path = path
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "negative_hits": 0, "misses": 0}
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS transcripts ("
+            " video_id TEXT, language TEXT, status TEXT, payload BLOB, fetched_at REAL, expires_at REAL,"
+            " PRIMARY KEY (video_id, language))"
+        )
+        self._db.commit()
+
+    def lookup(self, v_id: str, languages: Iterable[str]) -> Optional[dict]:
+        """Returns {"status": "ok", "language", "payload"} for the first language in preference
+        order that isn't known to be missing, {"status": "none"} when every language is known to
+        be missing, or None on a miss (including a preferred language we haven't checked yet)."""
+        languages = list(languages)
+        now = time.time()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT language, status, payload, expires_at FROM transcripts WHERE video_id = ? AND language IN (%s)"
+                % ",".join("?" * len(languages)),
+                (v_id, *languages),
+            ).fetchall()
+            by_lang = {r[0]: r for r in rows}
+
+            for lang in languages:
+                row = by_lang.get(lang)
+                if row and row[1] == STATUS_OK:
+                    self.counters["hits"] += 1
+                    return {"status": STATUS_OK, "language": lang, "payload": json.loads(zlib.decompress(row[2]))}
+                if not row or (row[3] or 0) <= now:
+                    # A preferred language not (or no longer) known to be missing: fetch rather than fall back
+                    self.counters["misses"] += 1
+                    return None
+
+            if not languages:
+                self.counters["misses"] += 1
+                return None
+            self.counters["negative_hits"] += 1
+            return {"status": STATUS_NONE}
+
+    def put(self, v_id: str, language: str, payload: dict) -> None:
+        blob = zlib.compress(json.dumps(payload, ensure_ascii=False).encode("utf-8"), 6)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO transcripts VALUES (?, ?, ?, ?, ?, NULL)",
+                (v_id, language, STATUS_OK, blob, time.time()),
+            )
+            self._db.commit()
+
+    def put_missing(self, v_id: str, languages: Iterable[str]) -> None:
+        now = time.time()
+        with self._lock:
+            # Never overwrite a real transcript with a negative entry
+            self._db.executemany(
+                "INSERT OR IGNORE INTO transcripts VALUES (?, ?, ?, NULL, ?, ?)",
+                [(v_id, lang, STATUS_NONE, now, now + self.negative_ttl) for lang in languages],
+            )
+            self._db.executemany(
+                "UPDATE transcripts SET fetched_at = ?, expires_at = ? WHERE video_id = ? AND language = ? AND status = ?",
+                [(now, now + self.negative_ttl, v_id, lang, STATUS_NONE) for lang in languages],
+            )
+            self._db.commit()
+
+    def invalidate(self, v_id: Optional[str] = None) -> int:
+        with self._lock:
+            if v_id is None:
+                cur = self._db.execute("DELETE FROM transcripts")
+            else:
+                cur = self._db.execute("DELETE FROM transcripts WHERE video_id = ?", (v_id,))
+            self._db.commit()
+            return cur.rowcount
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._db.execute("SELECT status, COUNT(*) FROM transcripts GROUP BY status").fetchall())
+            return {**self.counters, "stored": counts.get(STATUS_OK, 0), "negative": counts.get(STATUS_NONE, 0)}
+
+
+transcript_store = TranscriptStore(
+    os.path.join(settings.DATA_DIR, "transcripts.sqlite3"),
+    negative_ttl=settings.TRANSCRIPT_NEGATIVE_TTL,
+)
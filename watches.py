@@ -0,0 +1,215 @@
+"""Watch subscriptions: hashtags/queries polled on a schedule, keeping only new Shorts.
+
+Each watch keeps a persistent seen-ID index in SQLite. A run scans the
+newest results, drops every ID the watch has already seen, and enriches
+only the rest, so repeated polls of a busy hashtag cost one listing page
+instead of a full re-scrape. New videos get an increasing `seq`, which
+clients pass back as `since` to read only what arrived after their last
+call.
+
+Runs are claimed atomically (next_run_at is moved forward only by the
+process that wins the UPDATE), so several worker processes can run the
+scheduler against the same database without running a watch twice.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, Optional
+
+import settings
+
+
+class WatchStore:
+    def __init__(self, path: str, retention: float):
+        self.retention = retention
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._db.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS watches ("
+            " id TEXT PRIMARY KEY, kind TEXT, term TEXT, params TEXT, interval REAL, created_at REAL,"
+            " next_run_at REAL, last_run_at REAL, last_new INTEGER, last_error TEXT, runs INTEGER DEFAULT 0);"
+            # payload is NULL for IDs that are only remembered as seen (baseline, or past retention)
+            "CREATE TABLE IF NOT EXISTS watch_videos ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT, watch_id TEXT, video_id TEXT, seen_at REAL, payload TEXT,"
+            " UNIQUE (watch_id, video_id));"
+            "CREATE INDEX IF NOT EXISTS watch_videos_seq ON watch_videos (watch_id, seq);"
+        )
+        self._db.commit()
+
+    def _exec(self, sql: str, args=()) -> sqlite3.Cursor:
+        with self._lock:
+            cur = self._db.execute(sql, args)
+            self._db.commit()
+            return cur
+
+    def _query(self, sql: str, args=()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._db.execute(sql, args).fetchall()
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> dict:
+        watch = dict(row)
+        watch["params"] = json.loads(watch["params"])
+        return watch
+
+    # --- WATCHES ---
+
+    def create(self, kind: str, term: str, params: dict, interval: float) -> dict:
+        watch_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        self._exec(
+            "INSERT INTO watches (id, kind, term, params, interval, created_at, next_run_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (watch_id, kind, term, json.dumps(params), interval, now, now),
+        )
+        return self.get(watch_id)
+
+    def get(self, watch_id: str) -> Optional[dict]:
+        rows = self._query(
+            "SELECT w.*, (SELECT COUNT(*) FROM watch_videos v WHERE v.watch_id = w.id) AS seen,"
+            " (SELECT MAX(seq) FROM watch_videos v WHERE v.watch_id = w.id) AS latest_seq"
+            " FROM watches w WHERE w.id = ?", (watch_id,))
+        return self._to_dict(rows[0]) if rows else None
+
+    def list(self) -> List[dict]:
+        return [self._to_dict(r) for r in self._query("SELECT * FROM watches ORDER BY created_at DESC")]
+
+    def delete(self, watch_id: str) -> bool:
+        with self._lock:
+            cur = self._db.execute("DELETE FROM watches WHERE id = ?", (watch_id,))
+            self._db.execute("DELETE FROM watch_videos WHERE watch_id = ?", (watch_id,))
+            self._db.commit()
+            return cur.rowcount == 1
+
+    def schedule_now(self, watch_id: str) -> bool:
+        return self._exec("UPDATE watches SET next_run_at = ? WHERE id = ?", (time.time(), watch_id)).rowcount == 1
+
+    # --- SCHEDULING ---
+
+    def due_ids(self, now: float) -> List[str]:
+        return [r["id"] for r in self._query("SELECT id FROM watches WHERE next_run_at <= ? ORDER BY next_run_at", (now,))]
+
+    def claim(self, watch_id: str, now: float) -> bool:
+        """Moves a due watch's next run forward. False if another process claimed it first."""
+        cur = self._exec("UPDATE watches SET next_run_at = ? + interval WHERE id = ? AND next_run_at <= ?",
+                         (now, watch_id, now))
+        return cur.rowcount == 1
+
+    def finish_run(self, watch_id: str, new: int, error: Optional[str] = None) -> None:
+        self._exec("UPDATE watches SET last_run_at = ?, last_new = ?, last_error = ?, runs = runs + 1 WHERE id = ?",
+                   (time.time(), new, error, watch_id))
+
+    # --- SEEN INDEX ---
+
+    def unseen(self, watch_id: str, video_ids: Iterable[str]) -> List[str]:
+        video_ids = list(video_ids)
+        if not video_ids:
+            return []
+        rows = self._query("SELECT video_id FROM watch_videos WHERE watch_id = ? AND video_id IN (%s)"
+                           % ",".join("?" * len(video_ids)), (watch_id, *video_ids))
+        seen = {r["video_id"] for r in rows}
+        return [v for v in video_ids if v not in seen]
+
+    def mark_seen(self, watch_id: str, video_ids: Iterable[str]) -> None:
+        """Remembers IDs without a payload (the baseline of a watch created with backfill=False)."""
+        now = time.time()
+        with self._lock:
+            self._db.executemany("INSERT OR IGNORE INTO watch_videos (watch_id, video_id, seen_at) VALUES (?, ?, ?)",
+                                 [(watch_id, v, now) for v in video_ids])
+            self._db.commit()
+
+    def add_video(self, watch_id: str, video: dict) -> None:
+        self._exec("INSERT OR IGNORE INTO watch_videos (watch_id, video_id, seen_at, payload) VALUES (?, ?, ?, ?)",
+                   (watch_id, video["video_id"], time.time(), json.dumps(video, ensure_ascii=False)))
+
+    def new_since(self, watch_id: str, since: int, limit: int) -> List[dict]:
+        """[{"seq", "seen_at", "video"}] for videos recorded after `since`, oldest first."""
+        rows = self._query(
+            "SELECT seq, seen_at, payload FROM watch_videos WHERE watch_id = ? AND seq > ? AND payload IS NOT NULL"
+            " ORDER BY seq LIMIT ?", (watch_id, since, limit))
+        return [{"seq": r["seq"], "seen_at": r["seen_at"], "video": json.loads(r["payload"])} for r in rows]
+
+    def prune(self) -> int:
+        """Drops payloads past retention; their IDs stay in the seen index."""
+        cur = self._exec("UPDATE watch_videos SET payload = NULL WHERE payload IS NOT NULL AND seen_at < ?",
+                         (time.time() - self.retention,))
+        return cur.rowcount
+
+
+class WatchScheduler:
+    """Runs due watches on a small pool. `execute(watch, store)` returns the number of new videos."""
+
+    def __init__(self, store: WatchStore, workers: int, execute: Callable[[dict, WatchStore], int], tick: float):
+        self.store = store
+        self.workers = workers
+        self.execute = execute
+        self.tick = tick
+        self._pool = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._wake = threading.Event()
+        self._running = set()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                return
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="watch")
+            self._stopping.clear()
+        threading.Thread(target=self._loop, name="watch-scheduler", daemon=True).start()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+            self._stopping.set()
+            self._wake.set()
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def wake(self) -> None:
+        """Checks for due watches now instead of at the next tick."""
+        self._wake.set()
+
+    def _loop(self) -> None:
+        last_prune = 0.0
+        while not self._stopping.is_set():
+            now = time.time()
+            for watch_id in self.store.due_ids(now):
+                with self._lock:
+                    if self._pool is None or watch_id in self._running:
+                        continue
+                    if not self.store.claim(watch_id, now):
+                        continue
+                    self._running.add(watch_id)
+                    self._pool.submit(self._run, watch_id)
+            if now - last_prune > 3600:
+                self.store.prune()
+                last_prune = now
+            self._wake.wait(self.tick)
+            self._wake.clear()
+
+    def _run(self, watch_id: str) -> None:
+        try:
+            watch = self.store.get(watch_id)
+            if watch is None:
+                return
+            try:
+                new = self.execute(watch, self.store)
+                self.store.finish_run(watch_id, new)
+                if new:
+                    print(f"WATCH: {watch['kind']} '{watch['term']}' -> {new} new")
+            except Exception as e:
+                print(f"WATCH ERROR ({watch_id}): {e}")
+                self.store.finish_run(watch_id, 0, str(e))
+        finally:
+            with self._lock:
+                self._running.discard(watch_id)
+
+
+watch_store = WatchStore(os.path.join(settings.DATA_DIR, "watches.sqlite3"), settings.WATCH_RETENTION)
@@ -0,0 +1,76 @@
+"""Per-worker activity snapshots, shared through SQLite so any worker can report for all of them.
+
+Every worker process writes a snapshot (its RecentWindow contents and
+cache counters) to DATA_DIR/worker_stats.sqlite3 every
+STATS_PUBLISH_INTERVAL seconds. Whichever worker answers /admin/stats
+reads the snapshots that are still fresh and merges them, so the
+dashboard sees the whole server rather than one process.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, List, Optional
+
+import settings
+
+
+class WorkerStats:
+    def __init__(self, path: str, interval: float):
+        self.interval = interval
+        # Snapshots older than this belong to workers that stopped or hung
+        self.max_age = max(3 * interval, 5.0)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS snapshots (pid INTEGER PRIMARY KEY, updated_at REAL, payload TEXT)")
+        self._db.commit()
+
+    def publish(self, snapshot: dict) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?)", (os.getpid(), now, json.dumps(snapshot)))
+            self._db.execute("DELETE FROM snapshots WHERE updated_at < ?", (now - 10 * self.max_age,))
+            self._db.commit()
+
+    def snapshots(self, local: dict) -> List[dict]:
+        """This process's live `local` snapshot plus the fresh ones published by the other workers."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT payload FROM snapshots WHERE pid != ? AND updated_at >= ?",
+                (os.getpid(), time.time() - self.max_age),
+            ).fetchall()
+        return [local] + [json.loads(r[0]) for r in rows]
+
+    def start(self, collect: Callable[[], dict]) -> None:
+        """Publishes collect() every `interval` seconds until shutdown()."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, args=(collect,), name="worker-stats", daemon=True)
+        self._thread.start()
+
+    def shutdown(self) -> None:
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=self.interval)
+        with self._lock:
+            self._db.execute("DELETE FROM snapshots WHERE pid = ?", (os.getpid(),))
+            self._db.commit()
+
+    def _loop(self, collect: Callable[[], dict]) -> None:
+        while not self._stop.is_set():
+            try:
+                self.publish(collect())
+            except sqlite3.Error as e:
+                print(f"STATS ERROR: {e}")
+            self._stop.wait(self.interval)
+
+
+worker_stats = WorkerStats(os.path.join(settings.DATA_DIR, "worker_stats.sqlite3"), settings.STATS_PUBLISH_INTERVAL)
@@ -0,0 +1,293 @@
+"""The /ysp endpoints: thin wrappers over youtube-search-python.
+
+The library (and the patch it needs) is only imported when a /ysp endpoint
+is first called, so it costs nothing at startup.
+"""
+import threading
+from functools import partial
+from typing import Iterator, List, Optional, Tuple
+
+from fastapi import APIRouter, Query, Response
+
+import settings
+from metrics import span
+from page_extractor import normalize_video_id
+from response_cache import normalize_query, ysp_cache
+from stream_urls import stream_resolver
+from streaming import StreamFormat, decode_cursor, encode_cursor, encode_event, event_stream
+
+router = APIRouter(prefix="/ysp", tags=["YouTube Search Python Lib"])
+
+# --- LAZY LIBRARY LOADING ---
+
+_lib = None
+_lib_lock = threading.Lock()
+
+# [MONKEY PATCH] Fix for unmaintained library crash (NoneType concatenation)
+def _getVideoComponent_safe(self, element: dict, shelfTitle: str = None) -> dict:
+    from youtubesearchpython.core.constants import videoElementKey
+    video = element[videoElementKey]
+    component = {
+        'type':                           'video',
+        'id':                              self._getValue(video, ['videoId']),
+        'title':                           self._getValue(video, ['title', 'runs', 0, 'text']),
+        'publishedTime':                   self._getValue(video, ['publishedTimeText', 'simpleText']),
+        'duration':                        self._getValue(video, ['lengthText', 'simpleText']),
+        'viewCount': {
+            'text':                        self._getValue(video, ['viewCountText', 'simpleText']),
+            'short':                       self._getValue(video, ['shortViewCountText', 'simpleText']),
+        },
+        'thumbnails':                      self._getValue(video, ['thumbnail', 'thumbnails']),
+        'richThumbnail':                   self._getValue(video, ['richThumbnail', 'movingThumbnailRenderer', 'movingThumbnailDetails', 'thumbnails', 0]),
+        'descriptionSnippet':              self._getValue(video, ['detailedMetadataSnippets', 0, 'snippetText', 'runs']),
+        'channel': {
+            'name':                        self._getValue(video, ['ownerText', 'runs', 0, 'text']),
+            'id':                          self._getValue(video, ['ownerText', 'runs', 0, 'navigationEndpoint', 'browseEndpoint', 'browseId']),
+            'thumbnails':                  self._getValue(video, ['channelThumbnailSupportedRenderers', 'channelThumbnailWithLinkRenderer', 'thumbnail', 'thumbnails']),
+        },
+        'accessibility': {
+            'title':                       self._getValue(video, ['title', 'accessibility', 'accessibilityData', 'label']),
+            'duration':                    self._getValue(video, ['lengthText', 'accessibility', 'accessibilityData', 'label']),
+        },
+    }
+    # SAFELY handle IDs
+    v_id = component['id']
+    component['link'] = ('https://www.youtube.com/watch?v=' + v_id) if v_id else None
+    
+    c_id = component['channel']['id']
+    component['channel']['link'] = ('https://www.youtube.com/channel/' + c_id) if c_id else None
+    
+    component['shelfTitle'] = shelfTitle
+    return component
+
+def load_library():
+    """Imports youtubesearchpython and applies the patch above, once."""
+    global _lib
+    if _lib is None:
+        with _lib_lock:
+            if _lib is None:
+                import youtubesearchpython
+                from youtubesearchpython.handlers.componenthandler import ComponentHandler
+                ComponentHandler._getVideoComponent = _getVideoComponent_safe
+                _lib = youtubesearchpython
+    return _lib
+
+# --- CACHED SEARCH ENDPOINTS ---
+
+def cached_ysp(response: Response, endpoint: str, ttl: float, fn, **params):
+    """Serves a /ysp result through the stale-while-revalidate cache; X-Cache reports HIT/STALE/MISS."""
+    key = (endpoint,) + tuple(sorted(params.items()))
+    value, state = ysp_cache.get_or_fetch(key, ttl, fn)
+    response.headers["X-Cache"] = state
+    return value
+
+def _ysp_search(name: str, cls_name: str, query: str, limit: int, upload_date_sort: bool = False):
+    lib = load_library()
+    args = (lib.VideoSortOrder.uploadDate,) if upload_date_sort else ()
+    with span(f"ysp.{name}"):
+        return getattr(lib, cls_name)(query, *args, limit=limit).result()
+
+@router.get("/search/videos")
+def ysp_search_videos(response: Response, query: str, limit: int = 5):
+    """Search for videos only."""
+    query = normalize_query(query)
+    return cached_ysp(response, "search_videos", settings.YSP_SEARCH_TTL,
+                      partial(_ysp_search, "search_videos", "VideosSearch", query, limit), query=query, limit=limit)
+
+@router.get("/search/channels")
+def ysp_search_channels(response: Response, query: str, limit: int = 5):
+    """Search for channels only."""
+    query = normalize_query(query)
+    return cached_ysp(response, "search_channels", settings.YSP_SEARCH_TTL,
+                      partial(_ysp_search, "search_channels", "ChannelsSearch", query, limit), query=query, limit=limit)
+
+@router.get("/search/playlists")
+def ysp_search_playlists(response: Response, query: str, limit: int = 5):
+    """Search for playlists only."""
+    query = normalize_query(query)
+    return cached_ysp(response, "search_playlists", settings.YSP_SEARCH_TTL,
+                      partial(_ysp_search, "search_playlists", "PlaylistsSearch", query, limit), query=query, limit=limit)
+
+@router.get("/search/all")
+def ysp_search_all(response: Response, query: str, limit: int = 5):
+    """Search for everything (mixed)."""
+    query = normalize_query(query)
+    return cached_ysp(response, "search_all", settings.YSP_SEARCH_TTL,
+                      partial(_ysp_search, "search_all", "Search", query, limit), query=query, limit=limit)
+
+@router.get("/search/custom")
+def ysp_search_custom(response: Response, query: str, limit: int = 5, upload_date: bool = False):
+    """Custom search example (Upload Date sort)."""
+    query = normalize_query(query)
+    return cached_ysp(response, "search_custom", settings.YSP_SEARCH_TTL,
+                      partial(_ysp_search, "search_custom", "CustomSearch", query, limit, True),
+                      query=query, limit=limit)
+
+@router.get("/suggestions")
+def ysp_suggestions(response: Response, query: str):
+    """Get search suggestions."""
+    query = normalize_query(query)
+
+    def fetch():
+        lib = load_library()
+        with span("ysp.suggestions"):
+            return lib.Suggestions(language='en', region='US').get(query, mode=0)
+    return cached_ysp(response, "suggestions", settings.YSP_SUGGESTIONS_TTL, fetch, query=query)
+
+@router.get("/hashtag")
+def ysp_hashtag(response: Response, tag: str, limit: int = 5):
+    """Get videos by hashtag."""
+    tag = normalize_query(tag).lstrip("#")
+
+    def fetch():
+        lib = load_library()
+        with span("ysp.hashtag"):
+            return lib.Hashtag(tag, limit=limit).result()
+    return cached_ysp(response, "hashtag", settings.YSP_HASHTAG_TTL, fetch, tag=tag, limit=limit)
+
+# --- INFO ENDPOINTS ---
+
+@router.get("/video/info")
+def ysp_video_info(url_or_id: str):
+    """Get video info."""
+    try:
+        lib = load_library()
+        with span("ysp.video_info"):
+            return lib.Video.get(url_or_id, mode=0, get_upload_date=True)
+    except Exception as e:
+        return {"error": str(e)}
+
+@router.get("/playlist/info")
+def ysp_playlist_info(url_or_id: str):
+    """Get playlist info."""
+    try:
+        lib = load_library()
+        with span("ysp.playlist_info"):
+            return lib.Playlist.get(url_or_id, mode=0)
+    except Exception as e:
+        return {"error": str(e)}
+
+@router.get("/channel/info")
+def ysp_channel_info(channel_id: str):
+    """Get channel info."""
+    try:
+        lib = load_library()
+        with span("ysp.channel_info"):
+            return lib.Channel.get(channel_id)
+    except Exception as e:
+        return {"error": str(e)}
+
+# --- COMMENTS ---
+
+def fetch_comment_page(video_id: str, token: Optional[str]) -> Tuple[List[dict], Optional[str]]:
+    """One page of top-level comments and the continuation token for the next page."""
+    load_library()
+    from youtubesearchpython.core.comments import CommentsCore
+    core = CommentsCore(video_id)
+    with span("ysp.comments"):
+        try:
+            if token is None:
+                core.sync_create()
+            else:
+                core.continuationKey = token
+                core.sync_create_next()
+        except TypeError:
+            if core.responseSource is not None:
+                raise
+            # The library also leaves the item list missing when the request failed (429, 5xx, ...)
+            status = getattr(core.response, "status_code", None)
+            if status != 200:
+                raise RuntimeError(f"Comments request failed with status {status}") from None
+            # Empty page: the library can't iterate a missing item list
+            return [], None
+    return core.commentsComponent["result"], core.continuationKey
+
+def iter_comment_pages(video_id: str, limit: int, cursor: Optional[str] = None,
+                       max_pages: int = settings.MAX_COMMENT_PAGES) -> Iterator[Tuple[List[dict], Optional[str]]]:
+    """Yields (comments, cursor after them) page by page until `limit` comments have been produced.
+
+    Like scan_videos, the cursor keeps the token of the page we stopped in
+    plus an offset into it, so a limit that ends mid-page loses nothing.
+    """
+    state = decode_cursor(cursor, kinds=("comments",)) if cursor else {"k": "comments", "v": video_id, "t": None, "s": 0}
+    if state.get("v") != video_id:
+        raise ValueError("Cursor belongs to a different video.")
+    taken = 0
+    for _ in range(max_pages):
+        comments, next_token = fetch_comment_page(video_id, state["t"])
+        start = state["s"]
+        chunk = comments[start:start + limit - taken]
+        taken += len(chunk)
+        if start + len(chunk) < len(comments):
+            state["s"] = start + len(chunk)
+            yield chunk, encode_cursor(state)
+            return
+        if not next_token:
+            yield chunk, None
+            return
+        state["t"], state["s"] = next_token, 0
+        yield chunk, encode_cursor(state)
+        if taken >= limit:
+            return
+
+@router.get("/comments")
+def ysp_comments(video_id: str, limit: int = 20, cursor: Optional[str] = None, stream: StreamFormat = None):
+    """Get video comments, paging only as far as `limit` needs. Pass next_cursor back to continue."""
+    limit = max(1, min(limit, settings.COMMENTS_MAX_LIMIT))
+    try:
+        if cursor and decode_cursor(cursor, kinds=("comments",)).get("v") != video_id:
+            raise ValueError("Cursor belongs to a different video.")
+    except ValueError as e:
+        return {"error": str(e)}
+    pages = iter_comment_pages(video_id, limit, cursor)
+    if stream:
+        def events():
+            count, next_cursor, status = 0, cursor, "success"
+            try:
+                for chunk, next_cursor in pages:
+                    for comment in chunk:
+                        count += 1
+                        yield encode_event(stream, "comment", {"comment": comment})
+            except Exception as e:
+                # Resume from the last page that arrived intact
+                status = "error"
+                yield encode_event(stream, "error", {"error": str(e)})
+            yield encode_event(stream, "summary", {"status": status, "count": count, "next_cursor": next_cursor})
+        return event_stream(events(), stream)
+
+    comments, next_cursor = [], None
+    try:
+        for chunk, next_cursor in pages:
+            comments.extend(chunk)
+    except Exception as e:
+        return {"error": str(e)}
+    return {"result": comments, "count": len(comments), "next_cursor": next_cursor}
+
+# --- TRANSCRIPT & STREAMS ---
+
+@router.get("/transcript")
+def ysp_transcript(video_url: str):
+    """Get video transcript using this library."""
+    try:
+        lib = load_library()
+        with span("ysp.transcript"):
+            return lib.Transcript.get(video_url)
+    except Exception as e:
+        return {"error": str(e)}
+
+@router.get("/stream_url")
+def ysp_stream_url(video_url: str, formats: str = Query("22,18", description='Comma-separated itags in preference order, or "all"')):
+    """Get direct stream URLs (requires yt-dlp installed). Resolved once per video and cached until they expire."""
+    v_id = normalize_video_id(video_url)
+    if not v_id:
+        return {"error": "Invalid video URL or ID."}
+    try:
+        itags = None if formats.strip().lower() == "all" else [int(f) for f in formats.split(",") if f.strip()]
+    except ValueError:
+        return {"error": 'formats must be comma-separated itags or "all".'}
+    try:
+        expires_at, streams = stream_resolver.select(v_id, itags)
+    except Exception as e:
+        return {"error": str(e)}
+    first = streams[0] if streams else {}
+    return {"stream_url": first.get("url"), "itag": first.get("itag"), "streams": streams, "expires_at": int(expires_at)}